@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'garbage_management.settings')
+# Use the native async read endpoints (see waste.async_views)
+os.environ.setdefault('ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,220 @@
+"""
+Negotiated response compression.
+
+``CompressionMiddleware`` compresses textual responses (JSON, text, XML,
+JavaScript) with the best encoding the client accepts: zstd and brotli when
+their packages are installed (``compression.zstd`` on Python 3.14+ or
+``zstandard``; ``brotli`` or ``brotlicffi``), gzip otherwise. Bodies smaller
+than ``COMPRESSION_MIN_BYTES`` are sent as they are. Streamed responses are
+compressed chunk by chunk, each chunk flushed so clients can decode it as it
+arrives.
+
+Compressing changes the bytes, so a strong ``ETag`` is made weak, as Django's
+``GZipMiddleware`` does. The API authenticates with bearer tokens rather than
+cookies, so compressed responses do not expose secrets to BREACH-style
+attacks the way cookie-authenticated pages do.
+"""
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+try:
+    import brotli
+except ImportError:  # optional dependency
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Levels for dynamic responses: most of the ratio of the higher levels at a
+# fraction of their CPU time
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/xml',
+                      'application/javascript', 'application/problem+json')
+
+
+class GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self):
+        if zstd is not None:
+            self._compressor = zstd.ZstdCompressor(level=ZSTD_LEVEL)
+            self._flush_block = zstd.ZstdCompressor.FLUSH_BLOCK
+        else:
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(self._flush_block)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+ENCODERS = {'gzip': GzipEncoder}
+if brotli is not None:
+    ENCODERS['br'] = BrotliEncoder
+if zstd is not None or zstandard is not None:
+    ENCODERS['zstd'] = ZstdEncoder
+
+
+def available_encodings():
+    """``COMPRESSION_ENCODINGS`` in preference order, limited to the installed ones."""
+    return [name for name in settings.COMPRESSION_ENCODINGS if name in ENCODERS]
+
+
+def negotiate(accept_encoding):
+    """The encoding to use for an ``Accept-Encoding`` header, or ``None``.
+
+    Picks the highest ``q`` value; ties go to the earlier entry of
+    ``COMPRESSION_ENCODINGS``. ``*`` covers encodings not listed explicitly.
+    """
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for name in available_encodings():
+        weight = weights.get(name, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+def compress(encoding, data):
+    encoder = ENCODERS[encoding]()
+    return encoder.compress(data) + encoder.finish()
+
+
+def compress_stream(encoding, chunks):
+    encoder = ENCODERS[encoding]()
+    for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+async def acompress_stream(encoding, chunks):
+    encoder = ENCODERS[encoding]()
+    async for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+def _compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith(('+json', '+xml'))
+
+
+class CompressionMiddleware:
+    """Compresses responses per ``Accept-Encoding``; goes right after ``MetricsMiddleware``."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if (
+            response.status_code == 206 or response.has_header('Content-Encoding')
+            or not _compressible(response)
+        ):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(
+                    encoding, response.streaming_content
+                )
+            else:
+                response.streaming_content = compress_stream(encoding, response.streaming_content)
+            # The compressed length is not known up front
+            del response['Content-Length']
+        else:
+            body = compress(encoding, response.content)
+            if len(body) >= len(response.content):
+                return response
+            response.content = body
+            response['Content-Length'] = str(len(body))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,335 @@
+"""
+Per-route request metrics, exposed in the Prometheus text format at ``/metrics``.
+
+``MetricsMiddleware`` records, for every request, its latency in a histogram,
+the number and time of its database queries, the size of its response body
+and the time spent in ``serializing()`` blocks, which views put around
+building serializer data, keyed by route pattern and method. Each thread writes to its own
+buckets without locking; a scrape merges them, folding the buckets of threads
+that have exited into one. Counters are per process, so every worker is
+scraped separately.
+
+Requests slower than ``METRICS_SLOW_REQUEST_MS`` are logged with their
+slowest ``METRICS_SLOW_SQL_SAMPLES`` queries. Queries run while a streamed
+body is being sent happen after the request is recorded and are not counted.
+"""
+import bisect
+import contextvars
+import heapq
+import hmac
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED = '<unmatched>'
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestStats:
+    """What one request has done so far; shared with the threads it hands work to."""
+    __slots__ = ('queries', 'query_seconds', 'serializer_seconds', 'serializing', 'slowest')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+        self.slowest = []
+
+    def add_query(self, sql, seconds):
+        self.queries += 1
+        self.query_seconds += seconds
+        samples = settings.METRICS_SLOW_SQL_SAMPLES
+        if samples <= 0:
+            return
+        if len(self.slowest) < samples:
+            heapq.heappush(self.slowest, (seconds, sql))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, sql))
+
+
+class RouteStats:
+    __slots__ = (
+        'buckets', 'requests', 'seconds', 'queries', 'query_seconds',
+        'serializer_seconds', 'response_bytes', 'statuses'
+    )
+
+    def __init__(self):
+        # One count per bucket plus an overflow (+Inf) count, not cumulative
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.requests = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+    def merge(self, other):
+        for i, count in enumerate(other.buckets):
+            self.buckets[i] += count
+        self.requests += other.requests
+        self.seconds += other.seconds
+        self.queries += other.queries
+        self.query_seconds += other.query_seconds
+        self.serializer_seconds += other.serializer_seconds
+        self.response_bytes += other.response_bytes
+        for status, count in list(other.statuses.items()):
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+
+class _ThreadBucket:
+    # Held only by the thread-local, so it is finalized when its thread exits
+    __slots__ = ('stats', '__weakref__')
+
+    def __init__(self):
+        self.stats = {}
+
+
+class Registry:
+    """Per-thread ``{(route, method): RouteStats}`` buckets, merged on ``collect``.
+
+    Only the owning thread writes to a bucket, so recording takes no lock; the
+    lock guards the list of buckets, which grows once per thread. When a thread
+    exits, its bucket is queued (without locking: the finalizer may run inside
+    ``collect``) and the next ``collect`` folds it into ``_retired``.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._buckets = []
+        self._exited = deque()
+        self._retired = {}
+
+    def _bucket(self):
+        holder = getattr(self._local, 'bucket', None)
+        if holder is None:
+            holder = self._local.bucket = _ThreadBucket()
+            weakref.finalize(holder, self._exited.append, holder.stats)
+            with self._lock:
+                self._buckets.append(holder.stats)
+        return holder.stats
+
+    def _retire_exited(self):
+        exited = []
+        while self._exited:
+            exited.append(self._exited.popleft())
+        if not exited:
+            return
+        exited_ids = {id(bucket) for bucket in exited}
+        self._buckets = [bucket for bucket in self._buckets if id(bucket) not in exited_ids]
+        for bucket in exited:
+            for key, route_stats in bucket.items():
+                self._retired.setdefault(key, RouteStats()).merge(route_stats)
+
+    def record(self, route, method, status, seconds, stats, response_bytes):
+        bucket = self._bucket()
+        route_stats = bucket.get((route, method))
+        if route_stats is None:
+            route_stats = bucket[(route, method)] = RouteStats()
+        route_stats.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        route_stats.requests += 1
+        route_stats.seconds += seconds
+        route_stats.queries += stats.queries
+        route_stats.query_seconds += stats.query_seconds
+        route_stats.serializer_seconds += stats.serializer_seconds
+        route_stats.response_bytes += response_bytes
+        route_stats.statuses[status] = route_stats.statuses.get(status, 0) + 1
+
+    def collect(self):
+        with self._lock:
+            self._retire_exited()
+            buckets = [dict(self._retired), *self._buckets]
+        merged = {}
+        for bucket in buckets:
+            # Another thread may add a route while this one copies its keys
+            for key, route_stats in list(bucket.items()):
+                merged.setdefault(key, RouteStats()).merge(route_stats)
+        return merged
+
+    def clear(self):
+        with self._lock:
+            self._retire_exited()
+            self._retired.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+
+registry = Registry()
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - started)
+
+
+def _install_query_wrapper(connection, **kwargs):
+    # execute_wrappers lives on the connection wrapper and survives reconnects
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install_query_wrapper)
+
+
+@contextmanager
+def serializing():
+    """Count the enclosed block as serializer time of the current request."""
+    stats = _current.get()
+    # Blocks may nest, e.g. a fast read plan represented inside a timed view
+    if stats is None or stats.serializing:
+        yield
+        return
+    stats.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_seconds += time.perf_counter() - started
+        stats.serializing = False
+
+
+class MetricsMiddleware:
+    """Records every request in ``registry``; goes first in ``MIDDLEWARE``."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        # Connections opened before this module was imported have no wrapper yet
+        for connection in connections.all(initialized_only=True):
+            _install_query_wrapper(connection)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    def record(self, request, response, seconds, stats):
+        match = request.resolver_match
+        route = match.route if match is not None else UNMATCHED
+        if response.streaming:
+            size = int(response.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+        registry.record(route, request.method, response.status_code, seconds, stats, size)
+
+        if seconds * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+            queries = ''.join(
+                f'\n  {sql_seconds * 1000:.1f} ms: {sql}'
+                for sql_seconds, sql in sorted(stats.slowest, reverse=True)
+            )
+            logger.warning(
+                'Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms%s',
+                request.method, request.path, route, seconds * 1000,
+                stats.queries, stats.query_seconds * 1000, queries
+            )
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(collected):
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    def labels(route, method, **extra):
+        pairs = [('route', route), ('method', method), *extra.items()]
+        return ','.join(f'{key}="{_label(value)}"' for key, value in pairs)
+
+    rows = sorted(collected.items())
+
+    family('http_request_duration_seconds', 'histogram', 'Request latency by route.')
+    for (route, method), stats in rows:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+            cumulative += count
+            lines.append(
+                f'http_request_duration_seconds_bucket{{{labels(route, method, le=bound)}}} {cumulative}'
+            )
+        lines.append(
+            f'http_request_duration_seconds_bucket{{{labels(route, method, le="+Inf")}}} {stats.requests}'
+        )
+        lines.append(f'http_request_duration_seconds_sum{{{labels(route, method)}}} {stats.seconds:.6f}')
+        lines.append(f'http_request_duration_seconds_count{{{labels(route, method)}}} {stats.requests}')
+
+    family('http_requests_total', 'counter', 'Requests by route and status code.')
+    for (route, method), stats in rows:
+        for status, count in sorted(stats.statuses.items()):
+            lines.append(f'http_requests_total{{{labels(route, method, status=status)}}} {count}')
+
+    totals = (
+        ('http_db_queries_total', 'Database queries run by requests.', 'queries', '{}'),
+        ('http_db_query_seconds_total', 'Time requests spent in database queries.',
+         'query_seconds', '{:.6f}'),
+        ('http_serializer_seconds_total', 'Time requests spent producing serializer data.',
+         'serializer_seconds', '{:.6f}'),
+        ('http_response_bytes_total', 'Response body bytes (Content-Length for streams).',
+         'response_bytes', '{}'),
+    )
+    for name, help_text, attribute, number in totals:
+        family(name, 'counter', help_text)
+        for (route, method), stats in rows:
+            value = number.format(getattr(stats, attribute))
+            lines.append(f'{name}{{{labels(route, method)}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; requires ``Bearer METRICS_TOKEN`` when one is set."""
+    if settings.METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get('Authorization', '').encode(),
+        f'Bearer {settings.METRICS_TOKEN}'.encode()
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_prometheus(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
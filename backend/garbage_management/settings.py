@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
 from pathlib import Path
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'garbage_management.metrics.MetricsMiddleware',
+    'garbage_management.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -111,10 +114,50 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing. New passwords use PASSWORD_HASHER ("scrypt", "argon2" with
+# argon2-cffi installed, or "pbkdf2"); hashes made with another hasher or older
+# cost parameters are upgraded on the next successful login.
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "scrypt")
+SCRYPT_WORK_FACTOR = int(os.getenv("SCRYPT_WORK_FACTOR", 2 ** 14))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 2))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 102400))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 8))
+
+_PASSWORD_HASHERS = {
+    "scrypt": "users.hashers.ScryptPasswordHasher",
+    "argon2": "users.hashers.Argon2PasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + ["django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher"]
+
+# Login password checks run on a dedicated pool of PASSWORD_HASH_WORKERS threads.
+# At most PASSWORD_HASH_QUEUE more may wait, each for up to PASSWORD_HASH_WAIT
+# seconds, before logins are answered with 503.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 32))
+PASSWORD_HASH_WAIT = float(os.getenv("PASSWORD_HASH_WAIT", 5))
+
+# Failed logins allowed per account from one client IP, and per client IP, within
+# LOGIN_FAILURE_WINDOW seconds before further attempts get 429 without checking
+# the password. Counters live in the default cache, so they are per process
+# unless that cache is shared.
+LOGIN_MAX_FAILURES_PER_ACCOUNT = int(os.getenv("LOGIN_MAX_FAILURES_PER_ACCOUNT", 5))
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", 50))
+LOGIN_FAILURE_WINDOW = int(os.getenv("LOGIN_FAILURE_WINDOW", 900))
+
+# Behind reverse proxies: the header they append the client address to (e.g.
+# X-Forwarded-For) and how many of them are in front of the app. Left empty,
+# the client IP is REMOTE_ADDR. Only set it when every request passes through
+# the proxies, or clients can pick their own address.
+CLIENT_IP_HEADER = os.getenv("CLIENT_IP_HEADER", "")
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", 1))
+
 #REST_FRAMEWORK & JWT
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES":(
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         'rest_framework.permissions.IsAuthenticated',
@@ -129,6 +172,12 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
 }
 
+# Users resolved from JWTs are cached per process for USER_CACHE_TTL seconds
+# (0 disables the cache). Saves drop the entry in the saving process only, so
+# this bounds how long other processes may see a deactivated or edited user.
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 30))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -142,6 +191,7 @@ USE_I18N = True
 USE_TZ = True
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 AUTH_USER_MODEL = 'users.User'
 
@@ -155,6 +205,76 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Booking image processing (waste.imaging): stored originals are re-encoded to at
+# most IMAGE_MAX_DIMENSION pixels and get an IMAGE_THUMBNAIL_SIZE thumbnail.
+# IMAGE_WORKER_THREADS > 0 also processes jobs in the web process; with 0 only
+# `manage.py process_image_jobs` does.
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", 1600))
+IMAGE_THUMBNAIL_SIZE = int(os.getenv("IMAGE_THUMBNAIL_SIZE", 320))
+IMAGE_WORKER_THREADS = int(os.getenv("IMAGE_WORKER_THREADS", 2))
+IMAGE_JOB_MAX_ATTEMPTS = int(os.getenv("IMAGE_JOB_MAX_ATTEMPTS", 3))
+
+# Chunked image uploads (/api/waste/uploads/)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 20 * 1024 * 1024))
+UPLOAD_CHUNK_MAX_BYTES = int(os.getenv("UPLOAD_CHUNK_MAX_BYTES", 5 * 1024 * 1024))
+# Unfinished uploads idle for UPLOAD_STALE_HOURS are removed by
+# `manage.py purge_stale_uploads`; each user may have UPLOAD_MAX_IN_PROGRESS
+# uploads in progress (stale ones do not count)
+UPLOAD_STALE_HOURS = int(os.getenv("UPLOAD_STALE_HOURS", 24))
+UPLOAD_MAX_IN_PROGRESS = int(os.getenv("UPLOAD_MAX_IN_PROGRESS", 5))
+
+# Nearest-center spatial index: seconds before a worker rebuilds its in-process
+# index, so centers changed by other workers are picked up (0 disables expiry)
+CENTER_INDEX_TTL = int(os.getenv("CENTER_INDEX_TTL", 300))
+
+# Upper bound on bookings accepted by /api/waste/booking/bulk_create/
+BOOKING_BULK_MAX_ITEMS = int(os.getenv("BOOKING_BULK_MAX_ITEMS", 200))
+
+# Pickup places per center, date and time for slots not configured in the admin
+PICKUP_SLOT_DEFAULT_CAPACITY = int(os.getenv("PICKUP_SLOT_DEFAULT_CAPACITY", 10))
+
+# Lifetime of cached catalog response bodies (waste types, centers). Their
+# version tokens never expire; saves replace them, across workers with a shared
+# cache.
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", 300))
+
+# Upper bound on points accepted by /api/waste/centers/nearest/batch/
+NEAREST_BATCH_MAX_POINTS = int(os.getenv("NEAREST_BATCH_MAX_POINTS", 1000))
+
+# Secret configured for the Razorpay webhook; deliveries are rejected without it
+RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
+
+# Hours a stored Idempotency-Key response is replayed before the key can be reused
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+# Seconds a request holds its key before a retry may take over, in case the
+# worker running it died; keep it above the slowest payment request
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", 60))
+
+# Serve the catalog, nearest-center and booking-history endpoints with native async
+# views (waste.async_views). garbage_management.asgi turns this on by default.
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "0") == "1"
+
+# Build booking history pages and catalog bodies from value rows with compiled
+# converters (waste.fastread) instead of DRF serializers; the output is identical
+FAST_READ_PATH = os.getenv("FAST_READ_PATH", "1") == "1"
+
+# Per-route request metrics (garbage_management.metrics), scraped from /metrics.
+# With METRICS_TOKEN set, scrapes must send "Authorization: Bearer <token>".
+# Requests taking METRICS_SLOW_REQUEST_MS or longer are logged as warnings with
+# their METRICS_SLOW_SQL_SAMPLES slowest queries.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_SLOW_REQUEST_MS = float(os.getenv("METRICS_SLOW_REQUEST_MS", 500))
+METRICS_SLOW_SQL_SAMPLES = int(os.getenv("METRICS_SLOW_SQL_SAMPLES", 3))
+
+# Response compression (garbage_management.compression): encodings in order of
+# preference, skipping any whose package is not installed, and the smallest
+# body worth compressing. Streamed responses are always compressed.
+COMPRESSION_ENCODINGS = [
+    name.strip() for name in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",")
+    if name.strip()
+]
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
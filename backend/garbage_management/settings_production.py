@@ -0,0 +1,125 @@
+"""
+Production settings: select with DJANGO_SETTINGS_MODULE=garbage_management.settings_production.
+
+Starts from ``settings`` and trims it for a JWT-only API: DEBUG off (so queries
+are not kept in memory per request), persistent health-checked database
+connections, cached template loaders, JSON-only rendering and a middleware
+stack without sessions, CSRF, messages or clickjacking protection, none of
+which token-authenticated API requests use.
+
+The admin and the apps only it needs (sessions, messages) are left out unless
+ADMIN_ENABLED=1, e.g. on a separate admin-only process; the full middleware
+stack comes back with them.
+
+Catalog versions and bodies and the login throttle counters live in the
+default cache and are only correct if every worker sees the same one, so
+CACHE_URL must name a Redis (``redis://``, needs ``redis``) or Memcached
+(``memcached://``, needs ``pymemcache``) server. ``locmem://`` explicitly opts
+into a per-process cache, for a single worker or a benchmark.
+"""
+import os
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, INSTALLED_APPS, REST_FRAMEWORK, TEMPLATES
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host for host in os.getenv("ALLOWED_HOSTS", "").split(",") if host]
+if not ALLOWED_HOSTS:
+    raise ImproperlyConfigured("Set ALLOWED_HOSTS (comma-separated) for production")
+
+# Shared by all workers: redis://[:password@]host:6379/0 or memcached://host:11211[,host2:11211]
+# (locmem:// for a single process only)
+CACHE_URL = os.getenv("CACHE_URL", "")
+_cache_scheme = urlsplit(CACHE_URL).scheme
+if _cache_scheme in ("redis", "rediss"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+elif _cache_scheme == "locmem":
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+elif _cache_scheme == "memcached":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+            "LOCATION": urlsplit(CACHE_URL).netloc.split(","),
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        "Set CACHE_URL to a redis:// or memcached:// server shared by all workers for production"
+    )
+
+# /metrics exposes every route's traffic, so scrapes must authenticate
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+if not METRICS_TOKEN:
+    raise ImproperlyConfigured("Set METRICS_TOKEN for production")
+
+# Keep connections open between requests and check them before reuse
+DATABASES = {
+    alias: {
+        **database,
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+    }
+    for alias, database in DATABASES.items()
+}
+
+ADMIN_ENABLED = os.getenv("ADMIN_ENABLED", "0") == "1"
+
+ADMIN_APPS = ('django.contrib.admin', 'django.contrib.sessions', 'django.contrib.messages')
+
+if ADMIN_ENABLED:
+    MIDDLEWARE = [
+        'garbage_management.metrics.MetricsMiddleware',
+        'garbage_management.compression.CompressionMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'corsheaders.middleware.CorsMiddleware',
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    ]
+else:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ADMIN_APPS]
+    MIDDLEWARE = [
+        'garbage_management.metrics.MetricsMiddleware',
+        'garbage_management.compression.CompressionMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'corsheaders.middleware.CorsMiddleware',
+        'django.middleware.common.CommonMiddleware',
+    ]
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'context_processors': [
+                processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+                if ADMIN_ENABLED or 'messages' not in processor
+            ],
+            'loaders': [(
+                'django.template.loaders.cached.Loader',
+                [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ],
+            )],
+        },
+    },
+]
+
+# The browsable API renderer builds an HTML page (with forms) per request
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
+}
@@ -0,0 +1,29 @@
+"""
+Django's scrypt and Argon2 hashers with their cost parameters read from settings.
+
+The algorithm names are unchanged, so existing hashes keep verifying. When a
+cost setting changes, ``must_update`` reports older hashes and they are
+rehashed on the next successful login.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.SCRYPT_WORK_FACTOR
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
@@ -0,0 +1,77 @@
+"""
+Password verification on a bounded thread pool.
+
+Hashing is deliberately slow, so a login storm could otherwise occupy every
+request thread with it. Checks run on ``PASSWORD_HASH_WORKERS`` dedicated
+threads and at most ``PASSWORD_HASH_QUEUE`` more may wait for them; other
+callers get ``HashingBusy`` (503) after ``PASSWORD_HASH_WAIT`` seconds instead
+of piling up.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password, verify_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .authentication import user_cache
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many logins in progress, please try again shortly.'
+    default_code = 'hashing_busy'
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash'
+            )
+        return _executor
+
+
+def _get_slots():
+    global _slots
+    with _lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(
+                settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE
+            )
+        return _slots
+
+
+def run(func, *args):
+    """Run ``func(*args)`` on the hashing pool and return its result."""
+    slots = _get_slots()
+    if not slots.acquire(timeout=settings.PASSWORD_HASH_WAIT):
+        raise HashingBusy()
+    try:
+        return _get_executor().submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def check_user_password(user, password):
+    """Return whether ``password`` is correct for ``user``.
+
+    ``user`` may be ``None`` for an unknown email; one hash still runs so the
+    response takes as long as for a wrong password. A correct password stored
+    with an outdated hasher or cost is rehashed and saved.
+    """
+    encoded = user.password if user is not None else UNUSABLE_PASSWORD_PREFIX
+    is_correct, must_update = run(verify_password, password, encoded)
+    if user is None or not is_correct:
+        return False
+    if must_update:
+        user.password = run(make_password, password)
+        type(user).objects.filter(pk=user.pk).update(password=user.password)
+        user_cache.invalidate(user.pk)
+    return True
@@ -3,6 +3,9 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
+from .passwords import check_user_password
+from .throttling import LoginThrottle, client_ip
+
 User = get_user_model()
 
 
@@ -23,16 +26,17 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         if not email:
             raise serializers.ValidationError('Email is required.')
         
-        # Try to get user by email
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            raise serializers.ValidationError('Invalid email or password.')
-        
-        # Check password
-        if not user.check_password(password):
+        throttle = LoginThrottle(email, client_ip(self.context.get('request')))
+        throttle.check()
+
+        # Unknown emails still go through a password check so they are not
+        # answered faster than wrong passwords
+        user = User.objects.filter(email=email).first()
+        if not check_user_password(user, password):
+            throttle.failure()
             raise serializers.ValidationError('Invalid email or password.')
-        
+        throttle.success()
+
         if not user.is_active:
             raise serializers.ValidationError('User account is disabled.')
         
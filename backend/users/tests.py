@@ -1,3 +1,145 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password, verify_password
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import passwords
+from .authentication import user_cache
+
+User = get_user_model()
+
+
+@override_settings(SCRYPT_WORK_FACTOR=2 ** 12)
+class LoginTests(APITestCase):
+    url = '/api/auth/token/'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(email='user@example.com', password='pass12345')
+
+    def login(self, email='user@example.com', password='pass12345', ip='10.0.0.1'):
+        return self.client.post(
+            self.url, {'email': email, 'password': password}, format='json', REMOTE_ADDR=ip
+        )
+
+    def test_login(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        self.assertEqual(self.login(password='wrong').status_code, 400)
+
+    def test_legacy_hash_is_upgraded(self):
+        self.user.password = make_password('pass12345', hasher='pbkdf2_sha256')
+        self.user.save()
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).algorithm, 'scrypt')
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_tuned_cost_is_upgraded(self):
+        with override_settings(SCRYPT_WORK_FACTOR=2 ** 11):
+            self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$2048$'))
+
+    def test_unknown_email_still_hashes(self):
+        with mock.patch('users.passwords.verify_password', wraps=verify_password) as verify:
+            response = self.login(email='nobody@example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, self.login(password='wrong').data)
+        verify.assert_called_once()
+
+    @override_settings(LOGIN_MAX_FAILURES_PER_ACCOUNT=3)
+    def test_account_throttle(self):
+        for _ in range(3):
+            self.assertEqual(self.login(password='wrong', ip='10.0.0.2').status_code, 400)
+        with mock.patch('users.passwords.verify_password') as verify:
+            response = self.login(ip='10.0.0.2')
+        self.assertEqual(response.status_code, 429)
+        verify.assert_not_called()
+        # Failures from another address do not lock the owner out
+        self.assertEqual(self.login(ip='10.0.0.3').status_code, 200)
+
+    @override_settings(
+        LOGIN_MAX_FAILURES_PER_IP=2, CLIENT_IP_HEADER='X-Forwarded-For', TRUSTED_PROXY_COUNT=1
+    )
+    def test_client_ip_from_proxy_header(self):
+        def login(forwarded):
+            return self.client.post(
+                self.url, {'email': 'a@example.com', 'password': 'wrong'}, format='json',
+                REMOTE_ADDR='10.0.0.254', HTTP_X_FORWARDED_FOR=forwarded
+            )
+
+        # A client-supplied entry left of the proxy's does not change the address
+        login('1.1.1.1, 203.0.113.7')
+        login('2.2.2.2, 203.0.113.7')
+        self.assertEqual(login('203.0.113.7').status_code, 429)
+        self.assertEqual(login('203.0.113.8').status_code, 400)
+
+    @override_settings(LOGIN_MAX_FAILURES_PER_IP=2)
+    def test_ip_throttle(self):
+        self.login(email='a@example.com')
+        self.login(email='b@example.com')
+        self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login(ip='10.0.0.9').status_code, 200)
+
+    def test_success_resets_account_failures(self):
+        with override_settings(LOGIN_MAX_FAILURES_PER_ACCOUNT=2):
+            self.login(password='wrong')
+            self.login()
+            self.login(password='wrong')
+            self.assertEqual(self.login().status_code, 200)
+
+    def test_busy_pool(self):
+        with mock.patch.object(passwords, '_get_slots', return_value=threading.BoundedSemaphore(1)) as slots:
+            slots.return_value.acquire()
+            with override_settings(PASSWORD_HASH_WAIT=0):
+                self.assertEqual(self.login().status_code, 503)
+
+
+class CachedAuthenticationTests(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.user = User.objects.create_user(email='user@example.com', password='pass12345', name='Asha')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_cache_hit_needs_no_auth_query(self):
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/me/')
+        self.assertEqual(response.data['email'], 'user@example.com')
+
+    def test_profile_update_invalidates(self):
+        self.client.get('/api/auth/me/')
+        response = self.client.patch('/api/auth/me/update/', {'name': 'Ravi'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/auth/me/').data['name'], 'Ravi')
+
+    def test_change_password_invalidates(self):
+        self.client.get('/api/auth/me/')
+        response = self.client.post('/api/auth/change_password/', {
+            'old_password': 'pass12345', 'new_password': 'a-much-better-one-42'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(user_cache.get(self.user.pk))
+        self.client.get('/api/auth/me/')
+        self.assertTrue(user_cache.get(self.user.pk).check_password('a-much-better-one-42'))
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get('/api/auth/me/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 401)
+
+    def test_hits_are_copies(self):
+        self.client.get('/api/auth/me/')
+        user_cache.get(self.user.pk).name = 'Changed'
+        self.assertEqual(user_cache.get(self.user.pk).name, 'Asha')
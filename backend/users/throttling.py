@@ -0,0 +1,67 @@
+"""
+Failed-login throttling per account and client IP pair, and per client IP.
+
+Failures are counted in the default cache for ``LOGIN_FAILURE_WINDOW`` seconds.
+Once either counter reaches its limit, further attempts are rejected before any
+password hashing happens. The account counter is kept per client IP, so
+failures from one address cannot lock the owner out from another.
+
+Behind a reverse proxy ``REMOTE_ADDR`` is the proxy's address; set
+``CLIENT_IP_HEADER`` to the header the proxies append the client address to
+and ``TRUSTED_PROXY_COUNT`` to the number of proxies in front of the app.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+
+
+def client_ip(request):
+    """The client address, read from ``CLIENT_IP_HEADER`` when one is configured.
+
+    Each trusted proxy appends the address it received the request from, so
+    the client is the ``TRUSTED_PROXY_COUNT``-th entry from the right; entries
+    further left are whatever the client chose to send.
+    """
+    if request is None:
+        return ''
+    header = settings.CLIENT_IP_HEADER
+    if header:
+        forwarded = [
+            address.strip()
+            for address in request.headers.get(header, '').split(',') if address.strip()
+        ]
+        if forwarded:
+            return forwarded[-min(settings.TRUSTED_PROXY_COUNT, len(forwarded))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+class LoginThrottle:
+    def __init__(self, email, ip):
+        account = hashlib.sha256(f'{email.strip().lower()}\0{ip}'.encode()).hexdigest()
+        self.account_key = f'login-failures:account:{account}'
+        self.ip_key = f'login-failures:ip:{ip}'
+
+    def check(self):
+        counts = cache.get_many([self.account_key, self.ip_key])
+        if (
+            counts.get(self.account_key, 0) >= settings.LOGIN_MAX_FAILURES_PER_ACCOUNT
+            or counts.get(self.ip_key, 0) >= settings.LOGIN_MAX_FAILURES_PER_IP
+        ):
+            raise Throttled(
+                wait=settings.LOGIN_FAILURE_WINDOW,
+                detail='Too many failed login attempts, please try again later.'
+            )
+
+    def failure(self):
+        for key in (self.account_key, self.ip_key):
+            # add() starts the window; incr() keeps its original expiry
+            if not cache.add(key, 1, settings.LOGIN_FAILURE_WINDOW):
+                try:
+                    cache.incr(key)
+                except ValueError:
+                    cache.set(key, 1, settings.LOGIN_FAILURE_WINDOW)
+
+    def success(self):
+        cache.delete(self.account_key)
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import WasteType, Center, Booking, Payment
+from .models import (
+    WasteType, Center, PickupSlot, Booking, BookingDailyRollup, ImageJob, Payment, PaymentEvent
+)
 
 
 @admin.register(WasteType)
@@ -14,21 +16,30 @@ class CenterAdmin(admin.ModelAdmin):
     search_fields = ('name', 'address')
 
 
+@admin.register(PickupSlot)
+class PickupSlotAdmin(admin.ModelAdmin):
+    list_display = ('center', 'date', 'time', 'capacity', 'reserved')
+    list_filter = ('date', 'center')
+    list_select_related = ('center',)
+    readonly_fields = ('reserved',)
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'waste_type', 'quantity_kg', 'total_price', 'status', 'payment_status', 'pickup_date', 'created_at')
+    list_select_related = ('user', 'waste_type')
     list_filter = ('status', 'payment_status', 'pickup_date', 'created_at')
     search_fields = ('user__email', 'user__name', 'waste_type__name')
-    readonly_fields = ('created_at', 'updated_at', 'total_price')
+    readonly_fields = ('created_at', 'updated_at', 'unit_price', 'total_price')
     fieldsets = (
         ('User Information', {
             'fields': ('user',)
         }),
         ('Booking Details', {
-            'fields': ('waste_type', 'quantity_kg', 'pickup_date', 'pickup_time', 'address', 'selected_center', 'waste_image')
+            'fields': ('waste_type', 'quantity_kg', 'pickup_date', 'pickup_time', 'address', 'selected_center', 'waste_image', 'waste_image_thumbnail')
         }),
         ('Status', {
-            'fields': ('status', 'payment_status', 'total_price')
+            'fields': ('status', 'payment_status', 'unit_price', 'total_price')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at')
@@ -36,9 +47,41 @@ class BookingAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(BookingDailyRollup)
+class BookingDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'center', 'waste_type', 'status', 'booking_count', 'quantity_kg', 'total_price')
+    list_filter = ('status', 'waste_type', 'day')
+    list_select_related = ('center', 'waste_type')
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'booking', 'status', 'attempts', 'created_at', 'updated_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('id', 'booking', 'amount', 'status', 'razorpay_order_id', 'created_at', 'paid_at')
     list_filter = ('status', 'created_at', 'paid_at')
     search_fields = ('booking__user__email', 'razorpay_order_id', 'razorpay_payment_id')
     readonly_fields = ('created_at', 'paid_at')
+
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event_id', 'status', 'error', 'received_at', 'processed_at')
+    list_filter = ('status',)
+    search_fields = ('event_id', 'body')
+    readonly_fields = ('event_id', 'body', 'received_at', 'processed_at')
@@ -0,0 +1,537 @@
+"""
+In-process benchmark of every API route (``manage.py benchmark_api``).
+
+Each scenario drives one route for a fixed time from concurrent clients, each
+a thread with its own Django test client and database connection, against the
+dataset from ``waste.benchdata``. It records latency and database queries per
+request; a short single-threaded pass under ``tracemalloc`` then measures the
+memory allocated per request.
+
+Scenarios that write run each request in a transaction that is rolled back,
+so every run sees the same data. Their views' own transaction blocks become
+savepoints, which are counted as queries.
+
+``benchmark_api`` points ``MEDIA_ROOT`` at a temporary directory for the run,
+so files written by the upload scenarios (which a rollback does not undo)
+never reach the real media directory.
+"""
+import base64
+import io
+import json
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import nullcontext, suppress
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .benchdata import BENCH_EMAIL, BENCH_PASSWORD, BENCH_PREFIX, ORIGIN
+from .models import Booking, Center, ImageUpload, Payment, WasteType
+from .stub_gateway import StubGateway
+from .uploads import append_chunk, discard, file_sha256, partial_path
+
+FIRST_DAY = date(2025, 1, 1)
+CHUNK_BYTES = 64 * 1024
+# Smallest valid PNG (1x1 transparent pixel), attached by the upload completion scenario
+PIXEL_PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII='
+)
+
+
+@dataclass
+class Scenario:
+    name: str
+    route: str
+    build: object
+    write: bool = False
+    after: object = None
+
+
+@dataclass
+class BenchRequest:
+    method: str
+    path: str
+    body: bytes = b''
+    content_type: str = 'application/json'
+    token: str = None
+    headers: dict = None
+    state: object = None
+
+    def send(self, client):
+        headers = dict(self.headers or {})
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        response = client.generic(
+            self.method, self.path, self.body, content_type=self.content_type, headers=headers
+        )
+        # Streamed bodies are produced (and queried for) while they are read
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+
+class Fixtures:
+    """Ids and tokens of the benchmark dataset shared by all scenarios."""
+
+    def __init__(self, user, staff, concurrency):
+        self.user = user
+        self.token = str(RefreshToken.for_user(user).access_token)
+        self.refresh = str(RefreshToken.for_user(user))
+        self.staff_token = str(RefreshToken.for_user(staff).access_token)
+        self.type_ids = list(
+            WasteType.objects.filter(name__startswith=BENCH_PREFIX).values_list('id', flat=True)
+        )
+        self.center_ids = list(
+            Center.objects.filter(name__startswith=BENCH_PREFIX).values_list('id', flat=True)
+        )
+        self.booking_ids = list(
+            Booking.objects.filter(user=user).order_by('id').values_list('id', flat=True)[:10000]
+        )
+        if not (self.type_ids and self.center_ids and self.booking_ids):
+            raise ValueError('The benchmark dataset has no waste types, centers or bookings')
+        # One resumable upload per client thread, rewritten at offset 0 by every PUT
+        self.upload_ids = [
+            ImageUpload.objects.get_or_create(
+                user=user, filename=f'bench-{worker}.bin', size=CHUNK_BYTES, status='uploading'
+            )[0].pk
+            for worker in range(concurrency)
+        ]
+
+    def cleanup(self):
+        """Delete the fixture uploads and the partial files the PUT scenario wrote."""
+        for upload in ImageUpload.objects.filter(pk__in=self.upload_ids):
+            discard(upload)
+            upload.delete()
+
+
+def json_request(method, path, payload, token=None):
+    return BenchRequest(method, path, json.dumps(payload).encode(), token=token)
+
+
+def get(path, token=None):
+    return BenchRequest('GET', path, token=token)
+
+
+def point(rng, spread=0.2):
+    return {
+        'latitude': round(ORIGIN[0] + rng.uniform(-spread, spread), 6),
+        'longitude': round(ORIGIN[1] + rng.uniform(-spread, spread), 6),
+    }
+
+
+def day(rng):
+    return FIRST_DAY + timedelta(days=rng.randrange(365))
+
+
+def booking_payload(fx, rng):
+    return {
+        'waste_type_id': rng.choice(fx.type_ids),
+        'quantity_kg': f'{rng.uniform(1, 50):.2f}',
+        'pickup_date': str(date.today() + timedelta(days=rng.randrange(1, 60))),
+        'pickup_time': f'{rng.randrange(8, 18):02d}:00',
+        'address': 'Benchmark address',
+        'selected_center_id': rng.choice(fx.center_ids),
+    }
+
+
+def nearest(fx, rng, worker):
+    return json_request('POST', reverse('nearest_center'), point(rng))
+
+
+def nearest_batch(fx, rng, worker):
+    points = [point(rng) for _ in range(100)]
+    return json_request('POST', reverse('nearest_center_batch'), {'points': points})
+
+
+def center_search(fx, rng, worker):
+    where = point(rng)
+    query = f"latitude={where['latitude']}&longitude={where['longitude']}"
+    query += '&radius_km=5' if rng.random() < 0.5 else '&k=10'
+    return get(f"{reverse('center_search')}?{query}")
+
+
+def price_quote(fx, rng, worker):
+    items = [
+        {'waste_type_id': rng.choice(fx.type_ids), 'quantity_kg': f'{rng.uniform(1, 50):.2f}'}
+        for _ in range(5)
+    ]
+    return json_request('POST', reverse('price_quote'), {'items': items})
+
+
+def slot_availability(fx, rng, worker):
+    start = day(rng)
+    return get(
+        f"{reverse('slot_availability')}?center={rng.choice(fx.center_ids)}"
+        f'&start={start}&end={start + timedelta(days=6)}'
+    )
+
+
+def route_plan(fx, rng, worker):
+    return get(
+        f"{reverse('route_plan')}?center={rng.choice(fx.center_ids)}&date={day(rng)}",
+        fx.staff_token
+    )
+
+
+def analytics_daily(fx, rng, worker):
+    start = day(rng)
+    return get(
+        f"{reverse('analytics_daily')}?start={start}&end={start + timedelta(days=29)}",
+        fx.staff_token
+    )
+
+
+def booking_create(fx, rng, worker):
+    return json_request('POST', reverse('booking_create'), booking_payload(fx, rng), fx.token)
+
+
+def booking_bulk_create(fx, rng, worker):
+    bookings = [booking_payload(fx, rng) for _ in range(20)]
+    return json_request('POST', reverse('booking_bulk_create'), {'bookings': bookings}, fx.token)
+
+
+def booking_detail(fx, rng, worker):
+    return get(reverse('booking_detail', args=[rng.choice(fx.booking_ids)]), fx.token)
+
+
+def upload_create(fx, rng, worker):
+    payload = {'filename': 'bench.jpg', 'size': 4 * 1024 * 1024}
+    return json_request('POST', reverse('image_upload_create'), payload, fx.token)
+
+
+def upload_progress(fx, rng, worker):
+    return get(reverse('image_upload', args=[fx.upload_ids[worker]]), fx.token)
+
+
+def upload_chunk(fx, rng, worker):
+    path = f"{reverse('image_upload', args=[fx.upload_ids[worker]])}?offset=0"
+    return BenchRequest(
+        'PUT', path, rng.randbytes(CHUNK_BYTES), 'application/octet-stream', fx.token
+    )
+
+
+def upload_complete(fx, rng, worker):
+    upload = ImageUpload.objects.create(user=fx.user, filename='bench.png', size=len(PIXEL_PNG))
+    upload.received = append_chunk(upload, io.BytesIO(PIXEL_PNG), len(PIXEL_PNG))
+    upload.save(update_fields=['received'])
+    payload = {'sha256': file_sha256(partial_path(upload)), 'booking_id': rng.choice(fx.booking_ids)}
+    request = json_request(
+        'POST', reverse('image_upload_complete', args=[upload.pk]), payload, fx.token
+    )
+    request.state = (upload, payload['booking_id'])
+    return request
+
+
+def remove_attached_image(fx, request, response):
+    upload, booking_id = request.state
+    discard(upload)
+    booking = Booking.objects.get(pk=booking_id)
+    if booking.waste_image:
+        booking.waste_image.delete(save=False)
+
+
+def payment_create(fx, rng, worker):
+    payload = {'booking_id': rng.choice(fx.booking_ids)}
+    return json_request('POST', reverse('payment_create'), payload, fx.token)
+
+
+def payment_verify(fx, rng, worker):
+    booking = Booking.objects.get(pk=rng.choice(fx.booking_ids))
+    payment, _ = Payment.objects.update_or_create(
+        booking=booking,
+        defaults={
+            'amount': booking.total_price, 'status': 'pending',
+            'razorpay_order_id': f'order_bench_{uuid.UUID(int=rng.getrandbits(128)).hex}',
+        }
+    )
+    payload = {
+        'razorpay_order_id': payment.razorpay_order_id,
+        'razorpay_payment_id': f'pay_bench_{worker}',
+        'razorpay_signature': 'bench',
+    }
+    return json_request('POST', reverse('payment_verify'), payload, fx.token)
+
+
+def payment_webhook(fx, rng, worker):
+    gateway = StubGateway(secret=settings.RAZORPAY_WEBHOOK_SECRET, seed=rng.getrandbits(32))
+    body, headers = gateway.event(f'order_bench_{rng.getrandbits(64)}')
+    return BenchRequest('POST', reverse('payment_webhook'), body, headers=headers)
+
+
+def register(fx, rng, worker):
+    password = f'Bench-{rng.getrandbits(64):x}'
+    payload = {
+        'email': f'bench-register-{uuid.UUID(int=rng.getrandbits(128)).hex}@example.com',
+        'name': 'Benchmark', 'password': password, 'password2': password,
+    }
+    return json_request('POST', reverse('register'), payload)
+
+
+def change_password(fx, rng, worker):
+    payload = {'old_password': BENCH_PASSWORD, 'new_password': f'Bench-{rng.getrandbits(64):x}'}
+    return json_request('POST', reverse('change_password'), payload, fx.token)
+
+
+SCENARIOS = [
+    Scenario('waste_types', 'waste_types', lambda fx, rng, worker: get(reverse('waste_types'))),
+    Scenario('centers', 'centers', lambda fx, rng, worker: get(reverse('centers'))),
+    Scenario('nearest_center', 'nearest_center', nearest),
+    Scenario('nearest_center_batch', 'nearest_center_batch', nearest_batch),
+    Scenario('center_search', 'center_search', center_search),
+    Scenario('price_quote', 'price_quote', price_quote),
+    Scenario('slot_availability', 'slot_availability', slot_availability),
+    Scenario('route_plan', 'route_plan', route_plan),
+    Scenario('analytics_daily', 'analytics_daily', analytics_daily),
+    Scenario('booking_create', 'booking_create', booking_create, write=True),
+    Scenario('booking_bulk_create', 'booking_bulk_create', booking_bulk_create, write=True),
+    Scenario(
+        'booking_history', 'booking_history',
+        lambda fx, rng, worker: get(reverse('booking_history'), fx.token)
+    ),
+    Scenario(
+        'booking_summary', 'booking_summary',
+        lambda fx, rng, worker: get(reverse('booking_summary'), fx.token)
+    ),
+    Scenario('booking_detail', 'booking_detail', booking_detail),
+    Scenario('image_upload_create', 'image_upload_create', upload_create, write=True),
+    Scenario('image_upload', 'image_upload', upload_progress),
+    Scenario('image_upload_put', 'image_upload', upload_chunk, write=True),
+    Scenario(
+        'image_upload_complete', 'image_upload_complete', upload_complete,
+        write=True, after=remove_attached_image
+    ),
+    Scenario('payment_create', 'payment_create', payment_create, write=True),
+    Scenario('payment_verify', 'payment_verify', payment_verify, write=True),
+    Scenario('payment_webhook', 'payment_webhook', payment_webhook, write=True),
+    Scenario(
+        'token_obtain_pair', 'token_obtain_pair',
+        lambda fx, rng, worker: json_request(
+            'POST', reverse('token_obtain_pair'), {'email': BENCH_EMAIL, 'password': BENCH_PASSWORD}
+        )
+    ),
+    Scenario(
+        'token_refresh', 'token_refresh',
+        lambda fx, rng, worker: json_request('POST', reverse('token_refresh'), {'refresh': fx.refresh})
+    ),
+    Scenario('register', 'register', register, write=True),
+    Scenario('me', 'me', lambda fx, rng, worker: get(reverse('me'), fx.token)),
+    Scenario(
+        'update_profile', 'update_profile',
+        lambda fx, rng, worker: json_request(
+            'PATCH', reverse('update_profile'), {'name': f'Benchmark {worker}'}, fx.token
+        ),
+        write=True
+    ),
+    Scenario('change_password', 'change_password', change_password, write=True),
+]
+
+
+class QueryCounter:
+    """``execute_wrapper`` counting the queries of the current thread's connection."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(client, scenario, fixtures, rng, worker, counter=None):
+    """Send one request; returns ``(status, seconds, queries)``.
+
+    Building the request and the scenario's ``after`` hook are not timed.
+    """
+    with transaction.atomic() if scenario.write else nullcontext():
+        request = scenario.build(fixtures, rng, worker)
+        if counter is not None:
+            counter.count = 0
+        started = time.perf_counter()
+        response = request.send(client)
+        elapsed = time.perf_counter() - started
+        queries = counter.count if counter is not None else 0
+        if scenario.after is not None:
+            scenario.after(fixtures, request, response)
+        if scenario.write:
+            transaction.set_rollback(True)
+    return response.status_code, elapsed, queries
+
+
+def make_client():
+    # Errors become 500 responses instead of exceptions. localhost passes an empty
+    # ALLOWED_HOSTS in DEBUG; otherwise use the first concrete allowed host.
+    host = next(
+        (host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')),
+        'localhost'
+    )
+    return Client(raise_request_exception=False, HTTP_HOST=host)
+
+
+def run(scenario, fixtures, concurrency, duration, warmup=5, seed=0):
+    """Drive ``scenario`` from ``concurrency`` clients for ``duration`` seconds.
+
+    Each client first sends ``warmup`` unmeasured requests. Returns
+    ``(latencies, queries, errors, elapsed)``: seconds and query counts of
+    successful requests and ``{status: count}`` of the others (exceptions
+    raised while building a request count under their class name). With a
+    concurrency of 1 the client runs in the calling thread.
+    """
+    latencies, queries, errors = [], [], {}
+    lock = threading.Lock()
+    window = []
+    ready = threading.Barrier(concurrency, action=lambda: window.append(time.perf_counter()))
+
+    def client(worker):
+        rng = random.Random(seed * 1000 + worker)
+        http = make_client()
+        counter = QueryCounter()
+        local_latencies, local_queries, local_errors = [], [], {}
+        try:
+            with connection.execute_wrapper(counter):
+                for _ in range(warmup):
+                    # Failures are counted in the measured window instead
+                    with suppress(Exception):
+                        measure(http, scenario, fixtures, rng, worker)
+                ready.wait()
+                while time.perf_counter() < window[0] + duration:
+                    try:
+                        status, elapsed, count = measure(
+                            http, scenario, fixtures, rng, worker, counter
+                        )
+                    except Exception as exc:
+                        status = type(exc).__name__
+                    if isinstance(status, int) and status < 400:
+                        local_latencies.append(elapsed)
+                        local_queries.append(count)
+                    else:
+                        local_errors[str(status)] = local_errors.get(str(status), 0) + 1
+        except threading.BrokenBarrierError:
+            pass
+        finally:
+            # Releases the other clients if this one failed before the window opened
+            ready.abort()
+            if concurrency > 1:
+                connections.close_all()
+        with lock:
+            latencies.extend(local_latencies)
+            queries.extend(local_queries)
+            for status, count in local_errors.items():
+                errors[status] = errors.get(status, 0) + count
+
+    if concurrency == 1:
+        client(0)
+    else:
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - window[0] if window else 0.0
+    return latencies, queries, errors, elapsed
+
+
+def allocations(scenario, fixtures, samples, seed=0):
+    """Mean peak memory allocated per request, in bytes, over ``samples`` requests."""
+    rng = random.Random(seed)
+    http = make_client()
+    measure(http, scenario, fixtures, rng, 0)
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            with transaction.atomic() if scenario.write else nullcontext():
+                request = scenario.build(fixtures, rng, 0)
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                response = request.send(http)
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+                if scenario.after is not None:
+                    scenario.after(fixtures, request, response)
+                if scenario.write:
+                    transaction.set_rollback(True)
+    finally:
+        tracemalloc.stop()
+    return float(np.mean(peaks)) if peaks else 0.0
+
+
+def summarize(latencies, queries, errors, elapsed, allocated):
+    if latencies:
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    else:
+        p50 = p95 = p99 = None
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': _round(p50),
+        'p95_ms': _round(p95),
+        'p99_ms': _round(p99),
+        'queries': round(float(np.mean(queries)), 2) if queries else None,
+        'alloc_kib': round(allocated / 1024, 1),
+        'errors': sum(errors.values()),
+        'error_statuses': dict(sorted(errors.items())),
+    }
+
+
+def _round(value):
+    return None if value is None else round(float(value), 3)
+
+
+def compare(results, baseline, tolerance):
+    """Compare route results with a baseline; returns ``(rows, regressions)``.
+
+    A route regresses when its throughput drops or its p99 latency or
+    allocations grow by more than ``tolerance`` (a fraction), or when it runs
+    more queries per request.
+    """
+    rows, regressions = [], []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        changes = {
+            'rps': _change(current['rps'], previous['rps']),
+            'p99_ms': _change(current['p99_ms'], previous['p99_ms']),
+            'alloc_kib': _change(current['alloc_kib'], previous['alloc_kib']),
+            'queries': (
+                None if current['queries'] is None or previous['queries'] is None
+                else round(current['queries'] - previous['queries'], 2)
+            ),
+        }
+        problems = []
+        if changes['rps'] is not None and changes['rps'] < -tolerance:
+            problems.append('throughput')
+        if changes['p99_ms'] is not None and changes['p99_ms'] > tolerance:
+            problems.append('p99')
+        if changes['alloc_kib'] is not None and changes['alloc_kib'] > tolerance:
+            problems.append('allocations')
+        if changes['queries'] is not None and changes['queries'] >= 0.5:
+            problems.append('queries')
+        rows.append((name, changes, problems))
+        if problems:
+            regressions.append(f"{name}: {', '.join(problems)}")
+    return rows, regressions
+
+
+def _change(current, previous):
+    if current is None or not previous:
+        return None
+    return (current - previous) / previous
+
+
+def dataset_size(user):
+    return {
+        'users': type(user).objects.count(),
+        'centers': Center.objects.count(),
+        'waste_types': WasteType.objects.count(),
+        'bookings': Booking.objects.count(),
+    }
+
@@ -0,0 +1,249 @@
+"""
+Native async versions of the hot read-only endpoints, used under ASGI.
+
+DRF views are synchronous, so under ASGI every request to them is handed to
+a thread. These views run on the event loop with the async ORM and the async
+cache API instead. They reuse the sync views' serializers, pagination and
+field selection and render with DRF's JSON renderer, so response bodies are
+identical; ``waste.urls`` picks them when ``ASYNC_VIEWS`` is enabled (the
+default in ``garbage_management.asgi``).
+"""
+import json
+from math import isfinite
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views import View
+from garbage_management.metrics import serializing
+from rest_framework.exceptions import (
+    APIException, AuthenticationFailed, MethodNotAllowed, NotAuthenticated, ParseError
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+from users.authentication import CachedJWTAuthentication
+
+from .catalog import CENTERS, WASTE_TYPES, acatalog_version, aget_catalog_body, version_timestamp
+from .fastread import read_plan, render as render_rows
+from .models import Booking, Center, WasteType
+from .serializers import CenterSerializer, WasteTypeSerializer
+from .spatial import center_index
+from .views import BookingListView, NearestCenterView
+
+
+def render_json(data, status=200):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, content_type='application/json'
+    )
+
+
+class AsyncAPIView(View):
+    """Async counterpart of DRF's ``APIView`` for read-only JSON endpoints.
+
+    Authenticates with ``CachedJWTAuthentication`` whenever a token is sent
+    (as DRF does, even for public endpoints), enforces
+    ``requires_authentication`` and turns API exceptions into DRF's error
+    bodies and status codes.
+    """
+    authenticator = CachedJWTAuthentication()
+    requires_authentication = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Token-authenticated like the DRF views, so no CSRF check
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            # Honour APIClient.force_authenticate() the way DRF's Request does
+            forced_user = getattr(request, '_force_auth_user', None)
+            if forced_user is not None:
+                request.user = forced_user
+            else:
+                user_auth = await self.authenticator.aauthenticate(request)
+                request.user = user_auth[0] if user_auth else AnonymousUser()
+            if self.requires_authentication and not request.user.is_authenticated:
+                raise NotAuthenticated()
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(request, exc)
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        raise MethodNotAllowed(request.method)
+
+    def handle_exception(self, request, exc):
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            exc.status_code = 401
+        error = exception_handler(exc, {'request': request, 'view': self})
+        response = render_json(error.data, error.status_code)
+        for header, value in error.items():
+            response[header] = value
+        if exc.status_code == 401:
+            response['WWW-Authenticate'] = self.authenticator.authenticate_header(request)
+        return response
+
+
+class AsyncCatalogListView(AsyncAPIView):
+    """Async ``CatalogListView``: same cache entries, ETag and Last-Modified."""
+    model = None
+    serializer_class = None
+    catalog_name = None
+
+    async def get(self, request):
+        version = await acatalog_version(self.catalog_name)
+        etag = f'"{self.catalog_name}-{version}"'
+        last_modified = version_timestamp(version)
+
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified)
+        )
+        if not_modified is not None:
+            return not_modified
+
+        body = await aget_catalog_body(self.catalog_name, version, self.render_catalog)
+        response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    async def render_catalog(self):
+        plan = read_plan(self.serializer_class)
+        if plan is not None:
+            rows = [row async for row in plan.values(self.model.objects.all())]
+            return render_rows(plan.represent(rows))
+        rows = [row async for row in self.model.objects.all()]
+        with serializing():
+            return JSONRenderer().render(self.serializer_class(rows, many=True).data)
+
+
+class AsyncWasteTypeListView(AsyncCatalogListView):
+    model = WasteType
+    serializer_class = WasteTypeSerializer
+    catalog_name = WASTE_TYPES
+
+
+class AsyncCenterListView(AsyncCatalogListView):
+    model = Center
+    serializer_class = CenterSerializer
+    catalog_name = CENTERS
+
+
+class AsyncNearestCenterView(AsyncAPIView):
+    haversine = NearestCenterView.haversine
+
+    def get_data(self, request):
+        if request.content_type == 'application/json':
+            try:
+                return json.loads(request.body or b'{}')
+            except ValueError as exc:
+                raise ParseError(f'JSON parse error - {exc}')
+        return request.POST
+
+    async def post(self, request):
+        data = self.get_data(request)
+        latitude = data.get('latitude')
+        longitude = data.get('longitude')
+
+        if not latitude or not longitude:
+            return render_json({'error': 'Latitude and longitude are required'}, 400)
+
+        try:
+            latitude, longitude = float(latitude), float(longitude)
+        except (TypeError, ValueError):
+            latitude = longitude = float('nan')
+        if not (isfinite(latitude) and isfinite(longitude)):
+            return render_json({'error': 'Latitude and longitude must be numbers'}, 400)
+        if abs(latitude) > 90 or abs(longitude) > 180:
+            return render_json({'error': 'Coordinates out of range'}, 400)
+
+        matches = center_index.nearest(latitude, longitude)
+
+        nearest_center = None
+        min_distance = float('inf')
+
+        if matches:
+            center_id, min_distance = matches[0]
+            nearest_center = await Center.objects.filter(pk=center_id).afirst()
+            if nearest_center is None:
+                # Deleted by another process since the index was built
+                center_index.invalidate()
+                matches = None
+                min_distance = float('inf')
+
+        if matches is None:
+            # Index is cold: scan once and warm it from the same rows
+            generation = center_index.generation
+            centers = [center async for center in Center.objects.all()]
+            center_index.build(
+                ((c.id, c.latitude, c.longitude) for c in centers), generation
+            )
+
+            for center in centers:
+                distance = self.haversine(latitude, longitude, center.latitude, center.longitude)
+                if distance < min_distance:
+                    min_distance = distance
+                    nearest_center = center
+
+        if nearest_center:
+            with serializing():
+                center = CenterSerializer(nearest_center).data
+            return render_json({
+                'center': center,
+                'distance_km': round(min_distance, 2)
+            })
+        return render_json({'error': 'No centers found'}, 404)
+
+
+class AsyncBookingListView(AsyncAPIView):
+    """Async ``BookingListView``.
+
+    The sync view supplies the queryset, ``fields``/``expand`` handling and
+    serializer or fast read plan; only the page query runs differently, through
+    ``BookingCursorPagination.apaginate_queryset``. Expanded relations are
+    joined in that query, so serializing the page needs no queries. The
+    ``ETag`` is the sync view's, from the same aggregate query.
+    """
+    requires_authentication = True
+
+    async def get(self, request):
+        drf_request = Request(request)
+        drf_request.user = request.user
+
+        view = BookingListView()
+        view.setup(drf_request)
+        view.format_kwarg = None
+
+        state = await Booking.objects.filter(user=request.user).aaggregate(
+            **view.HISTORY_STATE
+        )
+        etag = view.get_etag(
+            state,
+            (await acatalog_version(WASTE_TYPES), await acatalog_version(CENTERS)),
+            'application/json'
+        )
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = await self.render_page(view, drf_request)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    async def render_page(self, view, drf_request):
+        paginator = view.paginator
+        plan = view.get_read_plan()
+        if plan is None:
+            page = await paginator.apaginate_queryset(view.get_queryset(), drf_request, view)
+            with serializing():
+                data = view.get_serializer(page, many=True).data
+            return render_json(paginator.get_paginated_response(data).data)
+        rows = plan.values(view.get_queryset(), extra=paginator.ordering_columns())
+        page = await paginator.apaginate_queryset(rows, drf_request, view)
+        data = plan.represent(page, drf_request)
+        return HttpResponse(
+            render_rows(paginator.get_paginated_response(data).data),
+            content_type='application/json'
+        )
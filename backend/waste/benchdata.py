@@ -0,0 +1,151 @@
+"""
+Deterministic synthetic data for load tests and benchmarks.
+
+Rows are written with ``bulk_create`` in batches, so millions of bookings fit
+in memory, and the caches and rollups that signal handlers normally maintain
+are refreshed explicitly afterwards. Bookings are completed pickups in the
+past and do not hold pickup slot places. ``bench@example.com`` (password
+``BENCH_PASSWORD``) owns a share of the bookings; ``bench-staff@example.com``
+is a staff account for the admin-only endpoints.
+"""
+import random
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+
+from .catalog import CENTERS, WASTE_TYPES, bump_catalog_version
+from .models import Booking, Center, WasteType
+from .pricing import line_total
+from .rollups import record_bookings
+from .spatial import center_coordinates, center_index
+
+BENCH_EMAIL = 'bench@example.com'
+BENCH_STAFF_EMAIL = 'bench-staff@example.com'
+BENCH_USER_EMAIL = 'bench-user-{}@example.com'
+BENCH_PASSWORD = 'bench-password-1'
+BENCH_PREFIX = 'Bench'
+# Roughly Bengaluru: centers and bookings are spread around this point
+ORIGIN = (12.9716, 77.5946)
+
+
+def bench_user():
+    return get_user_model().objects.filter(email=BENCH_EMAIL).first()
+
+
+def bench_staff():
+    return get_user_model().objects.filter(email=BENCH_STAFF_EMAIL).first()
+
+
+def bench_users():
+    return get_user_model().objects.filter(
+        Q(email__in=[BENCH_EMAIL, BENCH_STAFF_EMAIL]) | Q(email__startswith='bench-user-')
+    )
+
+
+def seed(users=1, centers=200, waste_types=6, bookings=5000, seed=0, spread_km=25.0,
+         batch_size=10000):
+    """Create the benchmark dataset unless it already exists; returns the bench user.
+
+    ``users`` counts the bench user, which gets its share of the bookings
+    like the others.
+    """
+    user = bench_user()
+    if user is not None:
+        return user
+
+    rng = random.Random(seed)
+    spread = spread_km / 111.0
+
+    def point():
+        return (
+            Decimal(f'{ORIGIN[0] + rng.uniform(-spread, spread):.6f}'),
+            Decimal(f'{ORIGIN[1] + rng.uniform(-spread, spread):.6f}'),
+        )
+
+    User = get_user_model()
+    with transaction.atomic():
+        user = User.objects.create_user(
+            email=BENCH_EMAIL, password=BENCH_PASSWORD, name='Benchmark'
+        )
+        User.objects.create_user(
+            email=BENCH_STAFF_EMAIL, password=BENCH_PASSWORD, name='Benchmark staff',
+            is_staff=True
+        )
+        unusable = make_password(None)
+        owners = [user] + User.objects.bulk_create(
+            (
+                User(email=BENCH_USER_EMAIL.format(i), name=f'Benchmark {i}', password=unusable)
+                for i in range(1, users)
+            ),
+            batch_size=batch_size
+        )
+        types = WasteType.objects.bulk_create(
+            WasteType(
+                name=f'{BENCH_PREFIX} type {i}',
+                price_per_kg=Decimal(rng.randint(200, 3000)) / 100,
+            )
+            for i in range(waste_types)
+        )
+        sites = Center.objects.bulk_create(
+            (
+                Center(
+                    name=f'{BENCH_PREFIX} center {i}', address=f'{i} Benchmark Road',
+                    latitude=latitude, longitude=longitude, contact_info='',
+                )
+                for i, (latitude, longitude) in enumerate(point() for _ in range(centers))
+            ),
+            batch_size=batch_size
+        )
+
+        first_day = date(2025, 1, 1)
+        for start in range(0, bookings, batch_size):
+            rows = []
+            for _ in range(min(batch_size, bookings - start)):
+                waste_type = rng.choice(types)
+                quantity = Decimal(rng.randint(100, 5000)) / 100
+                latitude, longitude = point()
+                rows.append(Booking(
+                    user=rng.choice(owners), waste_type=waste_type, quantity_kg=quantity,
+                    pickup_date=first_day + timedelta(days=rng.randrange(365)),
+                    pickup_time=time(rng.randrange(8, 18), 0),
+                    address='Benchmark address', latitude=latitude, longitude=longitude,
+                    selected_center=rng.choice(sites), status='completed',
+                    payment_status=rng.choice(['paid', 'paid', 'pending']),
+                    unit_price=waste_type.price_per_kg,
+                    total_price=line_total(waste_type.price_per_kg, quantity),
+                ))
+            record_bookings(Booking.objects.bulk_create(rows))
+
+    refresh_caches()
+    return user
+
+
+def reset(batch_size=10000):
+    """Delete the benchmark dataset.
+
+    Bookings go first, in batches, so the rollup signal handlers stay within
+    memory; the users' other rows are removed with them.
+    """
+    owners = bench_users()
+    while True:
+        pks = list(
+            Booking.objects.filter(user__in=owners).values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            break
+        Booking.objects.filter(pk__in=pks).delete()
+    owners.delete()
+    Center.objects.filter(name__startswith=BENCH_PREFIX).delete()
+    WasteType.objects.filter(name__startswith=BENCH_PREFIX).delete()
+    refresh_caches()
+
+
+def refresh_caches():
+    bump_catalog_version(WASTE_TYPES)
+    bump_catalog_version(CENTERS)
+    center_index.invalidate()
+    center_coordinates.invalidate()
@@ -0,0 +1,214 @@
+"""
+Streaming CSV/JSONL import and export of the center and waste type catalogs.
+
+Imports read the file a batch at a time, validate each row with the model's
+field validation and upsert the batch with one
+``bulk_create(update_conflicts=True)`` keyed on the catalog's natural key
+(``name`` for waste types, ``name`` and ``address`` for centers), inside a
+single transaction. Each row only updates the columns it carries, so a file
+with just ``name,price_per_kg`` reprices waste types without touching their
+descriptions.
+
+Exports stream rows with ``iterator()`` in the format imports accept, so
+memory stays flat however large the table is. ``bulk_create`` skips the save
+signals, so the imported catalog's caches are refreshed once the import
+commits.
+"""
+import csv
+import json
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .catalog import CENTERS, WASTE_TYPES, bump_catalog_version
+from .models import Center, WasteType
+from .spatial import center_coordinates, center_index
+
+FORMATS = ('csv', 'jsonl')
+
+
+class InvalidImport(Exception):
+    """An import file or one of its rows is invalid."""
+
+
+def _refresh_centers():
+    center_index.invalidate()
+    center_coordinates.invalidate()
+    bump_catalog_version(CENTERS)
+
+
+def _validate_center(center):
+    if not -90 <= center.latitude <= 90:
+        raise ValidationError({'latitude': 'Must be between -90 and 90.'})
+    if not -180 <= center.longitude <= 180:
+        raise ValidationError({'longitude': 'Must be between -180 and 180.'})
+
+
+@dataclass
+class Catalog:
+    model: type
+    # Columns of import and export files, in export order
+    fields: tuple
+    # Natural key the upsert matches existing rows on (a unique constraint)
+    key: tuple
+    # Called once an import commits, in place of the skipped save signals
+    refresh: Callable
+    validate: Callable = None
+
+
+CATALOGS = {
+    CENTERS: Catalog(
+        Center, ('name', 'address', 'latitude', 'longitude', 'contact_info'), ('name', 'address'),
+        refresh=_refresh_centers, validate=_validate_center,
+    ),
+    WASTE_TYPES: Catalog(
+        WasteType, ('name', 'description', 'price_per_kg'), ('name',),
+        refresh=lambda: bump_catalog_version(WASTE_TYPES),
+    ),
+}
+
+
+def detect_format(path, default='csv'):
+    for name in FORMATS:
+        if path.endswith(f'.{name}'):
+            return name
+    return default
+
+
+def read_rows(stream, file_format, fields):
+    """``(line number, {column: value})`` pairs from a CSV or JSONL text stream."""
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        unknown = set(reader.fieldnames or ()) - set(fields)
+        if unknown:
+            raise InvalidImport(f"Unknown columns: {', '.join(sorted(unknown))}")
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_num, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line, parse_float=Decimal)
+        except ValueError as exc:
+            raise InvalidImport(f'line {line_num}: {exc}') from None
+        if not isinstance(row, dict):
+            raise InvalidImport(f'line {line_num}: expected a JSON object')
+        unknown = row.keys() - set(fields)
+        if unknown:
+            raise InvalidImport(f"line {line_num}: unknown fields: {', '.join(sorted(unknown))}")
+        yield line_num, row
+
+
+def _error_text(error):
+    if hasattr(error, 'message_dict'):
+        return '; '.join(
+            f"{name}: {' '.join(messages)}" for name, messages in error.message_dict.items()
+        )
+    return ' '.join(error.messages)
+
+
+class ImportResult:
+    __slots__ = ('rows', 'written', 'skipped', 'errors', 'seconds')
+
+    def __init__(self):
+        self.rows = 0
+        self.written = 0
+        self.skipped = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def import_rows(catalog, rows, batch_size=2000, skip_invalid=False, progress=None):
+    """Validate and upsert ``(line number, row)`` pairs in batches of ``batch_size``.
+
+    Invalid rows raise ``InvalidImport`` (rolling the whole import back) or, with
+    ``skip_invalid``, are counted and listed in ``ImportResult.errors``.
+    ``progress`` is called with the result after each batch.
+    """
+    model = catalog.model
+    nullable = {name for name in catalog.fields if model._meta.get_field(name).null}
+    result = ImportResult()
+    started = time.perf_counter()
+    rows = iter(rows)
+    with transaction.atomic():
+        while batch := list(islice(rows, batch_size)):
+            # Upserting one key twice in a statement fails, so the last row wins
+            instances = {}
+            for line_num, row in batch:
+                result.rows += 1
+                values = {name: row[name] for name in catalog.fields if name in row}
+                for name in nullable & values.keys():
+                    # CSV has no null; exports write it as an empty cell
+                    if values[name] == '':
+                        values[name] = None
+                instance = model(**values)
+                try:
+                    instance.clean_fields(exclude=['id', 'created_at'])
+                    if catalog.validate is not None:
+                        catalog.validate(instance)
+                except ValidationError as exc:
+                    message = f'line {line_num}: {_error_text(exc)}'
+                    if not skip_invalid:
+                        raise InvalidImport(message) from None
+                    result.skipped += 1
+                    result.errors.append(message)
+                    continue
+                key = tuple(getattr(instance, name) for name in catalog.key)
+                instances[key] = (instance, frozenset(values))
+
+            # Rows only update the columns they carry, so JSONL rows with
+            # different keys are upserted in separate statements
+            groups = {}
+            for instance, columns in instances.values():
+                groups.setdefault(columns, []).append(instance)
+            for columns, group in groups.items():
+                update_fields = [
+                    name for name in catalog.fields if name in columns and name not in catalog.key
+                ]
+                if update_fields:
+                    model.objects.bulk_create(
+                        group, update_conflicts=True,
+                        unique_fields=catalog.key, update_fields=update_fields,
+                    )
+                else:
+                    # Key columns only: nothing to update on existing rows
+                    model.objects.bulk_create(group, ignore_conflicts=True)
+            result.written += len(instances)
+            result.seconds = time.perf_counter() - started
+            if progress is not None:
+                progress(result)
+        transaction.on_commit(catalog.refresh)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def export_rows(catalog, stream, file_format, chunk_size=2000):
+    """Write every row of ``catalog`` to ``stream``; returns the row count."""
+    rows = catalog.model.objects.order_by('pk').values_list(*catalog.fields).iterator(
+        chunk_size=chunk_size
+    )
+    count = 0
+    if file_format == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(catalog.fields)
+        for row in rows:
+            writer.writerow(['' if value is None else value for value in row])
+            count += 1
+        return count
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        # One write per line: management command output wrappers add missing newlines
+        stream.write(encoder.encode(dict(zip(catalog.fields, row))) + '\n')
+        count += 1
+    return count
@@ -0,0 +1,79 @@
+"""
+Versioned response cache for the public catalog endpoints.
+
+Each catalog (waste types, centers) has a version token in Django's cache that
+is replaced whenever one of its rows is saved or deleted. Serialized response
+bodies are cached per version, so a request costs one cache lookup for the
+version and, unless the client already holds that version, one for the body.
+
+The version doubles as the ``ETag`` and, being a timestamp, as
+``Last-Modified``. Version tokens never expire, so an ETag only changes when
+the catalog does; the bodies expire after ``CATALOG_CACHE_TIMEOUT`` seconds.
+Invalidation only reaches other worker processes through a shared cache
+backend, which is why production settings require one.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+WASTE_TYPES = 'waste_types'
+CENTERS = 'centers'
+
+
+def _version_key(name):
+    return f'waste:catalog:{name}:version'
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+
+def catalog_version(name):
+    """Return the current version token of a catalog, creating it if needed."""
+    version = cache.get(_version_key(name))
+    if version is None:
+        version = time.time_ns() // 1000
+        cache.add(_version_key(name), version, None)
+        version = cache.get(_version_key(name), version)
+    return version
+
+
+def bump_catalog_version(name):
+    """Mark every cached response of a catalog as stale."""
+    cache.set(_version_key(name), time.time_ns() // 1000, None)
+
+
+def version_timestamp(version):
+    """Seconds since the epoch at which ``version`` was issued."""
+    return version / 1_000_000
+
+
+def get_catalog_body(name, version, build):
+    """Return the serialized body for ``version``, calling ``build`` on a miss."""
+    key = f'waste:catalog:{name}:{version}'
+    body = cache.get(key)
+    if body is None:
+        body = build()
+        cache.set(key, body, _timeout())
+    return body
+
+
+async def acatalog_version(name):
+    """Async :func:`catalog_version`."""
+    version = await cache.aget(_version_key(name))
+    if version is None:
+        version = time.time_ns() // 1000
+        await cache.aadd(_version_key(name), version, None)
+        version = await cache.aget(_version_key(name), version)
+    return version
+
+
+async def aget_catalog_body(name, version, build):
+    """Async :func:`get_catalog_body`; ``build`` is a coroutine function."""
+    key = f'waste:catalog:{name}:{version}'
+    body = await cache.aget(key)
+    if body is None:
+        body = await build()
+        await cache.aset(key, body, _timeout())
+    return body
@@ -0,0 +1,292 @@
+"""
+Fast read path for the booking, center and waste type list endpoints.
+
+``read_plan`` compiles a serializer, with its ``fields``/``expand`` selection
+applied, into the ``values_list()`` lookups it needs and one converter per
+output field, mirroring the ``to_representation`` of each DRF field type.
+Rows are then turned into plain dicts without model instances or bound
+fields, and ``render`` encodes them (with orjson when it is installed) to the
+same bytes as DRF's ``JSONRenderer``. Serializers using a field type the
+compiler does not know get no plan and stay on the regular DRF path.
+"""
+import decimal
+import json
+from datetime import timezone as dt_timezone
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from garbage_management.metrics import serializing
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class Unsupported(Exception):
+    """The serializer uses a field the fast path cannot reproduce exactly."""
+
+
+class Context:
+    __slots__ = ('request', 'timezone')
+
+    def __init__(self, request):
+        self.request = request
+        self.timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+
+
+def _decimal(quantum, rounding, context, value, ctx):
+    if not isinstance(value, decimal.Decimal):
+        value = decimal.Decimal(str(value).strip())
+    return format(value.quantize(quantum, rounding=rounding, context=context), 'f')
+
+
+def _datetime(value, ctx):
+    if ctx.timezone is not None:
+        if value.tzinfo is not ctx.timezone:
+            value = (
+                value.astimezone(ctx.timezone) if timezone.is_aware(value)
+                else timezone.make_aware(value, ctx.timezone)
+            )
+    elif timezone.is_aware(value):
+        value = timezone.make_naive(value, dt_timezone.utc)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _isoformat(value, ctx):
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def _file_url(storage, value, ctx):
+    if not value:
+        return None
+    url = storage.url(value)
+    return ctx.request.build_absolute_uri(url) if ctx.request is not None else url
+
+
+def _choice(choices, value, ctx):
+    if value == '':
+        return value
+    return choices.get(str(value), value)
+
+
+def _plain(convert, value, ctx):
+    return convert(value)
+
+
+# to_representation methods that return DB values of their field type unchanged
+_IDENTITY_REPRESENTATIONS = {
+    serializers.CharField.to_representation, serializers.IntegerField.to_representation,
+}
+# ... and ones that only coerce the type (possibly honouring coerce_to_string)
+_PLAIN_REPRESENTATIONS = {
+    getattr(serializers, name).to_representation
+    for name in ('BigIntegerField', 'FloatField', 'BooleanField')
+    if hasattr(serializers, name)
+}
+
+
+class ReadPlan:
+    """Compiled ``serializer``: ``values_list()`` lookups plus one converter per field."""
+
+    def __init__(self, serializer):
+        self.lookups = []
+        self.fields = self._compile(serializer, '')
+        self._represent = self._generate()
+
+    def _column(self, lookup):
+        if lookup not in self.lookups:
+            self.lookups.append(lookup)
+        return self.lookups.index(lookup)
+
+    def _compile(self, serializer, prefix):
+        model = serializer.Meta.model
+        entries = []
+        for field in serializer._readable_fields:
+            source = field.source
+            if source == '*' or '.' in source:
+                raise Unsupported(field.field_name)
+            lookup = prefix + source
+
+            if isinstance(field, serializers.ListSerializer):
+                raise Unsupported(field.field_name)
+            if isinstance(field, serializers.ModelSerializer):
+                # A null foreign key renders the nested object as null
+                guard = self._column(lookup)
+                entries.append((field.field_name, guard, self._compile(field, lookup + '__')))
+                continue
+
+            sources = getattr(field, 'sources', (source,))
+            if isinstance(field, serializers.FileField):
+                if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+                    raise Unsupported(field.field_name)
+                # Renders the first non-empty file of ``sources``
+                columns = [self._column(prefix + name) for name in sources]
+                storages = [model._meta.get_field(name).storage for name in sources]
+                if len(set(map(id, storages))) > 1:
+                    raise Unsupported(field.field_name)
+                entries.append((field.field_name, columns, partial(_file_url, storages[0])))
+                continue
+            if sources != (source,):
+                raise Unsupported(field.field_name)
+
+            entries.append((field.field_name, self._column(lookup), self._converter(field)))
+        return entries
+
+    def _converter(self, field):
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            if field.pk_field is not None:
+                raise Unsupported(field.field_name)
+            return None
+        if type(field).to_representation in _IDENTITY_REPRESENTATIONS:
+            return None
+        if isinstance(field, serializers.IntegerField) and not getattr(
+            field, 'coerce_to_string', getattr(api_settings, 'COERCE_BIGINT_TO_STRING', False)
+        ) and type(field).to_representation in _PLAIN_REPRESENTATIONS:
+            return None
+        if isinstance(field, serializers.DecimalField):
+            if (
+                not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+                or field.localize or field.decimal_places is None
+                or getattr(field, 'normalize_output', False)
+            ):
+                raise Unsupported(field.field_name)
+            context = decimal.getcontext().copy()
+            if field.max_digits is not None:
+                context.prec = field.max_digits
+            return partial(
+                _decimal, decimal.Decimal('.1') ** field.decimal_places, field.rounding, context
+            )
+        if isinstance(field, serializers.DateTimeField):
+            if getattr(field, 'format', api_settings.DATETIME_FORMAT) != ISO_8601 \
+                    or getattr(field, 'timezone', None) is not None:
+                raise Unsupported(field.field_name)
+            return _datetime
+        if isinstance(field, serializers.DateField):
+            if getattr(field, 'format', api_settings.DATE_FORMAT) != ISO_8601:
+                raise Unsupported(field.field_name)
+            return _isoformat
+        if isinstance(field, serializers.TimeField):
+            if getattr(field, 'format', api_settings.TIME_FORMAT) != ISO_8601:
+                raise Unsupported(field.field_name)
+            return _isoformat
+        if type(field) is serializers.ChoiceField:
+            return partial(_choice, field.choice_strings_to_values)
+        if type(field).to_representation in _PLAIN_REPRESENTATIONS:
+            return partial(_plain, field.to_representation)
+        raise Unsupported(field.field_name)
+
+    def values(self, queryset, extra=()):
+        """``queryset`` as named rows; ``extra`` adds columns (e.g. for cursors)."""
+        lookups = self.lookups + [name for name in extra if name not in self.lookups]
+        return queryset.values_list(*lookups, named=True)
+
+    def represent(self, rows, request=None):
+        ctx = Context(request)
+        with serializing():
+            return self._represent(rows, ctx)
+
+    def _generate(self):
+        """Compile ``fields`` into one function building every row's dict.
+
+        Rows become dict displays over tuple indexes, so there is no per-field
+        loop or dispatch at run time; converters are only called for non-null
+        values, as DRF's ``Serializer.to_representation`` does.
+        """
+        namespace = {}
+
+        def converter(convert):
+            name = f'convert_{len(namespace)}'
+            namespace[name] = convert
+            return name
+
+        def expression(entries):
+            items = []
+            for name, column, convert in entries:
+                if isinstance(convert, list):
+                    value = f'None if row[{column}] is None else {expression(convert)}'
+                elif isinstance(column, list):
+                    files = ' or '.join(f'row[{index}]' for index in column)
+                    value = f'{converter(convert)}({files}, ctx)'
+                elif convert is None:
+                    value = f'row[{column}]'
+                else:
+                    value = (
+                        f'None if row[{column}] is None '
+                        f'else {converter(convert)}(row[{column}], ctx)'
+                    )
+                items.append(f'{name!r}: ({value})')
+            return '{' + ', '.join(items) + '}'
+
+        source = f'def represent(rows, ctx):\n    return [{expression(self.fields)} for row in rows]\n'
+        exec(compile(source, f'<read plan {self.lookups}>', 'exec'), namespace)
+        return namespace['represent']
+
+
+# Distinct plans kept per process. ``fields``/``expand`` selections come from
+# query parameters, so their combinations are not bounded by the code.
+PLAN_CACHE_SIZE = 128
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _plan(serializer_class, options):
+    try:
+        return ReadPlan(serializer_class(**dict(options)))
+    except Unsupported:
+        return None
+
+
+def read_plan(serializer_class, **kwargs):
+    """The cached plan for ``serializer_class(**kwargs)``, or ``None`` without one.
+
+    ``kwargs`` values must be ``None`` or iterables of names (``fields``,
+    ``expand``); their order does not matter.
+    """
+    if not settings.FAST_READ_PATH:
+        return None
+    options = tuple(
+        (name, None if value is None else frozenset(value))
+        for name, value in sorted(kwargs.items())
+    )
+    return _plan(serializer_class, options)
+
+
+def render(data):
+    """Encode ``data`` (JSON-native values only) to the bytes ``JSONRenderer`` produces."""
+    if orjson is not None and api_settings.UNICODE_JSON and api_settings.COMPACT_JSON:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(
+            data, ensure_ascii=not api_settings.UNICODE_JSON,
+            allow_nan=not api_settings.STRICT_JSON,
+            separators=SHORT_SEPARATORS if api_settings.COMPACT_JSON else LONG_SEPARATORS,
+        ).encode()
+    # As JSONRenderer does, so the output is also valid JavaScript
+    return body.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+def renders_plain_json(request):
+    """Whether DRF would answer ``request`` with ``JSONRenderer`` and no indent."""
+    return (
+        type(request.accepted_renderer) is JSONRenderer
+        and 'indent' not in request.accepted_media_type
+    )
+
+
+class FastJSONResponse(Response):
+    """``Response`` rendered by :func:`render`; for ``renders_plain_json`` requests."""
+
+    @property
+    def rendered_content(self):
+        self['Content-Type'] = 'application/json'
+        return render(self.data)
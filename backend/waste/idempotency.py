@@ -0,0 +1,118 @@
+"""
+Idempotency keys for retried POST requests.
+
+A client sends ``Idempotency-Key: <opaque string>`` with a request. The first
+request claims the key by inserting an ``IdempotencyKey`` row with an empty
+response, runs the view and stores the response. Retries with the same key and
+body are answered from that row without running the view again; a retry while
+the first request is still running gets 409, and reusing a key for a different
+body gets 422. Server errors release the key so the request can be retried.
+
+A worker that dies mid-request never stores a response, so a claim without one
+is only honoured for ``IDEMPOTENCY_LEASE_SECONDS``; after that the next retry
+takes the key over and runs the view.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+
+
+def request_hash(data):
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def expiry_cutoff():
+    return timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+def lease_cutoff():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+
+
+def in_flight():
+    return Response(
+        {'error': 'A request with this Idempotency-Key is still being processed'},
+        status=status.HTTP_409_CONFLICT
+    )
+
+
+def replay(record, fingerprint):
+    if record.request_hash != fingerprint:
+        return Response(
+            {'error': 'Idempotency-Key was already used with a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record.response_status is None:
+        return in_flight()
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(request, endpoint, handler):
+    """Run ``handler()`` at most once per ``Idempotency-Key`` and return its response.
+
+    Requests without the header call ``handler`` directly.
+    """
+    key = request.META.get(HEADER)
+    if not key:
+        return handler()
+    if len(key) > MAX_KEY_LENGTH:
+        return Response(
+            {'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    fingerprint = request_hash(request.data)
+    lookup = {'user': request.user, 'endpoint': endpoint, 'key': key}
+    IdempotencyKey.objects.filter(
+        Q(created_at__lt=expiry_cutoff())
+        | Q(response_status__isnull=True, created_at__lt=lease_cutoff()),
+        **lookup
+    ).delete()
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(request_hash=fingerprint, **lookup)
+            break
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(**lookup).first()
+            if existing is not None:
+                return replay(existing, fingerprint)
+            # Released by the failed request holding it; claim it again
+    else:
+        return in_flight()
+
+    try:
+        response = handler()
+    except Exception:
+        record.delete()
+        raise
+    if response.status_code >= 500:
+        record.delete()
+        return response
+
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        response_status=response.status_code, response_body=response.data
+    )
+    return response
+
+
+def purge_expired():
+    """Delete keys past ``IDEMPOTENCY_KEY_TTL_HOURS``; returns the number removed."""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expiry_cutoff()).delete()
+    return deleted
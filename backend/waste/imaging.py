@@ -0,0 +1,126 @@
+"""
+Background processing of booking images.
+
+Uploads are stored as-is during the booking request and an ``ImageJob`` row is
+queued. A worker then strips metadata (after applying the EXIF orientation),
+re-encodes the original as a JPEG bounded by ``IMAGE_MAX_DIMENSION`` and
+writes a ``IMAGE_THUMBNAIL_SIZE`` thumbnail.
+
+Jobs are claimed with a conditional UPDATE on their status, so the in-process
+thread pool (``IMAGE_WORKER_THREADS``) and any number of
+``process_image_jobs`` workers can share the queue without a broker.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Booking, ImageJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _encode_jpeg(image, max_dimension):
+    image = image.copy()
+    image.thumbnail((max_dimension, max_dimension))
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=85, optimize=True)
+    return buffer.getvalue()
+
+
+def process_booking_image(booking):
+    """Re-encode a booking's image and generate its thumbnail."""
+    original = booking.waste_image
+    with original.open('rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    base = os.path.splitext(os.path.basename(original.name))[0]
+    storage = original.storage
+    old_name = original.name
+
+    original_name = storage.save(
+        f'waste_images/{base}.jpg',
+        ContentFile(_encode_jpeg(image, settings.IMAGE_MAX_DIMENSION))
+    )
+    thumbnail_name = storage.save(
+        f'waste_images/thumbnails/{base}.jpg',
+        ContentFile(_encode_jpeg(image, settings.IMAGE_THUMBNAIL_SIZE))
+    )
+    Booking.objects.filter(pk=booking.pk).update(
+        waste_image=original_name,
+        waste_image_thumbnail=thumbnail_name,
+        updated_at=timezone.now(),
+    )
+    if old_name != original_name:
+        storage.delete(old_name)
+
+
+def run_job(job_id):
+    """Claim and run one job. Returns ``False`` if another worker has it."""
+    claimed = ImageJob.objects.filter(pk=job_id, status='pending').update(
+        status='processing', attempts=F('attempts') + 1, updated_at=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    job = ImageJob.objects.select_related('booking').get(pk=job_id)
+    try:
+        if job.booking.waste_image:
+            process_booking_image(job.booking)
+    except Exception as exc:
+        logger.exception('Image job %s failed', job_id)
+        retry = job.attempts < settings.IMAGE_JOB_MAX_ATTEMPTS
+        ImageJob.objects.filter(pk=job_id).update(
+            status='pending' if retry else 'failed', error=str(exc), updated_at=timezone.now()
+        )
+    else:
+        ImageJob.objects.filter(pk=job_id).update(status='done', error='', updated_at=timezone.now())
+    return True
+
+
+def _run_in_worker(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKER_THREADS, thread_name_prefix='image-jobs'
+        )
+    return _executor
+
+
+def enqueue_image_job(booking):
+    """Queue processing of ``booking.waste_image`` once the transaction commits."""
+    job = ImageJob.objects.create(booking=booking)
+    if settings.IMAGE_WORKER_THREADS:
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, job.pk))
+    return job
+
+
+def pending_job_ids(limit):
+    return list(
+        ImageJob.objects.filter(status='pending').order_by('id').values_list('id', flat=True)[:limit]
+    )
+
+
+def requeue_stale_jobs(older_than):
+    """Return jobs stuck in ``processing`` (e.g. after a crash) to the queue."""
+    return ImageJob.objects.filter(
+        status='processing', updated_at__lt=timezone.now() - older_than
+    ).update(status='pending', updated_at=timezone.now())
+
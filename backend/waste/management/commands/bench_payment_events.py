@@ -0,0 +1,70 @@
+import time
+from datetime import date, time as clock
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from waste.models import Booking, Payment, PaymentEvent, WasteType
+from waste.stub_gateway import StubGateway
+from waste.webhooks import ingest, process_batch, verify_signature
+
+
+class Command(BaseCommand):
+    help = 'Benchmark webhook ingestion and batched reconciliation against the stub gateway'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=5000, help='Number of paid orders to simulate')
+        parser.add_argument('--batch-size', type=int, default=500, help='Events reconciled per transaction')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        gateway = StubGateway(seed=options['seed'])
+
+        # Everything is rolled back, so the benchmark can run against any database
+        with transaction.atomic():
+            order_ids = self.seed(options['orders'])
+            deliveries = gateway.deliveries(order_ids)
+
+            started = time.perf_counter()
+            for body, headers in deliveries:
+                if verify_signature(body, headers['X-Razorpay-Signature'], gateway.secret):
+                    ingest(body, headers['X-Razorpay-Event-Id'])
+            ingest_seconds = time.perf_counter() - started
+            queued = PaymentEvent.objects.filter(status='pending').count()
+
+            started = time.perf_counter()
+            while process_batch(options['batch_size']):
+                pass
+            process_seconds = time.perf_counter() - started
+
+            paid = Payment.objects.filter(razorpay_order_id__in=order_ids, status='paid').count()
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f'ingest:    {len(deliveries)} deliveries in {ingest_seconds:.2f}s '
+            f'({len(deliveries) / ingest_seconds:,.0f}/s, {queued} queued)'
+        )
+        self.stdout.write(
+            f'reconcile: {queued} events in {process_seconds:.2f}s '
+            f'({queued / process_seconds:,.0f}/s, batch size {options["batch_size"]})'
+        )
+        style = self.style.SUCCESS if paid == len(order_ids) else self.style.ERROR
+        self.stdout.write(style(f'{paid}/{len(order_ids)} orders paid'))
+
+    def seed(self, count):
+        user = get_user_model().objects.create_user(email='bench-payments@example.com', password=None)
+        waste_type = WasteType.objects.create(name='Bench', price_per_kg=Decimal('10.00'))
+        bookings = Booking.objects.bulk_create(
+            Booking(
+                user=user, waste_type=waste_type, quantity_kg=Decimal('1.00'),
+                pickup_date=date(2026, 1, 1), pickup_time=clock(9, 0), address='Bench',
+                unit_price=Decimal('10.00'), total_price=Decimal('10.00'),
+            )
+            for _ in range(count)
+        )
+        payments = Payment.objects.bulk_create(
+            Payment(booking=booking, amount=booking.total_price, razorpay_order_id=f'order_bench_{booking.pk}')
+            for booking in bookings
+        )
+        return [payment.razorpay_order_id for payment in payments]
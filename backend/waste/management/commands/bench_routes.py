@@ -0,0 +1,52 @@
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from waste.routing import distance_matrix, nearest_neighbor_trips, plan_routes, route_length
+
+
+class Command(BaseCommand):
+    help = 'Benchmark route planning on synthetic days of pickups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=str, default='50,500,5000', help='Comma-separated stop counts')
+        parser.add_argument('--capacity-kg', type=float, default=None, help='Vehicle capacity in kg')
+        parser.add_argument('--time-limit', type=float, default=30.0, help='Improvement time budget in seconds')
+        parser.add_argument('--radius-km', type=float, default=15.0, help='Spread of stops around the depot')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        depot = (12.9716, 77.5946)
+        spread = options['radius_km'] / 111.0
+
+        for size in (int(value) for value in options['sizes'].split(',')):
+            stops = [
+                (
+                    pk,
+                    depot[0] + rng.uniform(-spread, spread),
+                    depot[1] + rng.uniform(-spread, spread),
+                    round(rng.uniform(1, 50), 2),
+                )
+                for pk in range(1, size + 1)
+            ]
+
+            started = time.perf_counter()
+            matrix = distance_matrix(
+                [depot[0]] + [s[1] for s in stops], [depot[1]] + [s[2] for s in stops]
+            )
+            demands = [0.0] + [s[3] for s in stops]
+            seed_routes = nearest_neighbor_trips(matrix, np.array(demands), options['capacity_kg'])
+            seed_km = sum(route_length(route, matrix) for route in seed_routes)
+            seed_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            plan = plan_routes(depot, stops, options['capacity_kg'], options['time_limit'])
+            plan_seconds = time.perf_counter() - started
+
+            self.stdout.write(
+                f'{size:>6} stops: nearest-neighbour {seed_km:10.2f} km in {seed_seconds:6.2f}s | '
+                f'optimized {plan.distance_km:10.2f} km in {plan_seconds:6.2f}s '
+                f'({100 * (1 - plan.distance_km / seed_km):5.1f}% shorter, {len(plan.trips)} trip(s))'
+            )
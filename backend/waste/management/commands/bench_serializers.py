@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from waste.benchdata import BENCH_PREFIX, bench_user
+from waste.fastread import ReadPlan, orjson, render
+from waste.models import Booking, Center, WasteType
+from waste.serializers import BookingSerializer, CenterSerializer, WasteTypeSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare DRF serializers + JSONRenderer with the fast read path (waste.fastread) '
+        'on the benchmark dataset, checking that both produce the same bytes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per rendered page')
+        parser.add_argument('--repeat', type=int, default=50, help='Pages rendered per case')
+
+    def handle(self, *args, **options):
+        user = bench_user()
+        if user is None:
+            raise CommandError('No benchmark dataset; run seed_benchmark_data first')
+        request = RequestFactory().get('/api/waste/booking/history/')
+        rows = options['rows']
+
+        bookings = Booking.objects.filter(user=user).order_by('-created_at', '-id')
+        cases = [
+            ('waste types', WasteTypeSerializer, {},
+             WasteType.objects.filter(name__startswith=BENCH_PREFIX).order_by('id')),
+            ('centers', CenterSerializer, {},
+             Center.objects.filter(name__startswith=BENCH_PREFIX).order_by('id')[:rows]),
+            ('bookings (nested)', BookingSerializer, {},
+             bookings.select_related(*BookingSerializer.EXPANDABLE_FIELDS)[:rows]),
+            ('bookings (flat)', BookingSerializer, {'expand': ()}, bookings[:rows]),
+        ]
+
+        encoder = 'orjson' if orjson is not None else 'json'
+        self.stdout.write(
+            f"{'case':<20} {'rows':>5} {'DRF ms':>9} {f'fast ({encoder}) ms':>16} {'speedup':>8}"
+        )
+        for name, serializer_class, kwargs, queryset in cases:
+            plan = ReadPlan(serializer_class(**kwargs))
+
+            def drf():
+                serializer = serializer_class(
+                    list(queryset.all()), many=True, context={'request': request}, **kwargs
+                )
+                return JSONRenderer().render(serializer.data)
+
+            def fast():
+                return render(plan.represent(list(plan.values(queryset)), request))
+
+            expected, actual = drf(), fast()
+            if expected != actual:
+                raise CommandError(f'{name}: the fast path output differs from DRF')
+            drf_ms = self.time(drf, options['repeat'])
+            fast_ms = self.time(fast, options['repeat'])
+            self.stdout.write(
+                f'{name:<20} {queryset.count():>5} {drf_ms:>9.2f} '
+                f'{fast_ms:>16.2f} {drf_ms / fast_ms:>7.1f}x'
+            )
+
+    def time(self, render_page, repeat):
+        """Median milliseconds per call of ``render_page``, queries included."""
+        samples = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            render_page()
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        return samples[len(samples) // 2] * 1000
@@ -0,0 +1,92 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter per settings module and prints one JSON line
+PROBE = r'''
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+application = get_wsgi_application()
+get_resolver().url_patterns
+startup = time.perf_counter() - started
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+path, requests = sys.argv[1], int(sys.argv[2])
+host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+client = Client(HTTP_HOST=host)
+statuses = set()
+for _ in range(20):
+    statuses.add(client.get(path).status_code)
+started = time.perf_counter()
+for _ in range(requests):
+    client.get(path)
+per_request = (time.perf_counter() - started) / requests
+connections.close_all()
+print(json.dumps({
+    'startup': startup, 'per_request': per_request, 'statuses': sorted(statuses),
+    'middleware': len(settings.MIDDLEWARE), 'apps': len(settings.INSTALLED_APPS),
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare settings modules: median time to set up Django and load the URLconf in '
+        'a new process, and in-process time per request to one endpoint'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--settings-module', action='append', dest='modules', metavar='MODULE',
+            help='Settings module to measure (repeatable; default: the base and production settings)'
+        )
+        parser.add_argument('--path', default='/api/waste/types/', help='Endpoint to request')
+        parser.add_argument('--requests', type=int, default=2000, help='Measured requests per run')
+        parser.add_argument('--repeat', type=int, default=5, help='Processes per settings module')
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or [
+            'garbage_management.settings', 'garbage_management.settings_production'
+        ]
+        env = dict(os.environ)
+        # The production settings refuse to start without these
+        env.setdefault('ALLOWED_HOSTS', 'localhost')
+        env.setdefault('METRICS_TOKEN', 'bench-settings')
+        env.setdefault('CACHE_URL', 'locmem://')
+
+        self.stdout.write(
+            f"{'settings':<40} {'apps':>4} {'mw':>3} {'startup ms':>11} {'µs/request':>11}"
+        )
+        for module in modules:
+            runs = [self.probe(module, env, options) for _ in range(max(options['repeat'], 1))]
+            startup = statistics.median(run['startup'] for run in runs) * 1000
+            per_request = statistics.median(run['per_request'] for run in runs) * 1e6
+            line = (
+                f"{module:<40} {runs[0]['apps']:>4} {runs[0]['middleware']:>3} "
+                f'{startup:>11.1f} {per_request:>11.1f}'
+            )
+            statuses = runs[0]['statuses']
+            if any(status >= 400 for status in statuses):
+                line = self.style.WARNING(f'{line}  (status {", ".join(map(str, statuses))})')
+            self.stdout.write(line)
+
+    def probe(self, module, env, options):
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE, options['path'], str(options['requests'])],
+            env={**env, 'DJANGO_SETTINGS_MODULE': module},
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f'{module} failed:\n{completed.stderr.strip()}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
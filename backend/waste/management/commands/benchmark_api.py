@@ -0,0 +1,166 @@
+import json
+import platform
+import tempfile
+from contextlib import nullcontext
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from waste.apibench import SCENARIOS, Fixtures, allocations, compare, dataset_size, run, summarize
+from waste.benchdata import bench_staff, bench_user
+from waste.stub_gateway import StubGateway
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every API route in-process against the benchmark dataset: throughput, '
+        'p50/p95/p99 latency, queries and allocations per request, with JSON baselines'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--routes', default='',
+                            help='Comma-separated scenario names (default: all)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per route')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per client')
+        parser.add_argument('--alloc-samples', type=int, default=20,
+                            help='Requests per route traced for allocations (0 skips)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', help='Compare with results saved by --output')
+        parser.add_argument('--tolerance', type=float, default=10.0,
+                            help='Allowed throughput/p99/allocation change in percent')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error when a route regresses against --baseline')
+
+    def handle(self, *args, **options):
+        scenarios = SCENARIOS
+        if options['routes']:
+            names = [name for name in options['routes'].split(',') if name]
+            known = {scenario.name for scenario in SCENARIOS}
+            unknown = set(names) - known
+            if unknown:
+                raise CommandError(f"Unknown routes: {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in SCENARIOS if scenario.name in names]
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as source:
+                baseline = json.load(source)
+
+        user, staff = bench_user(), bench_staff()
+        if user is None or staff is None:
+            raise CommandError('No benchmark dataset; run seed_benchmark_data first')
+        concurrency = max(options['concurrency'], 1)
+
+        if settings.DEBUG:
+            self.stderr.write(self.style.WARNING(
+                'DEBUG is on: every query is also logged, which inflates latencies'
+            ))
+
+        # The webhook scenario signs with the stub gateway's secret if none is configured
+        secret = nullcontext() if settings.RAZORPAY_WEBHOOK_SECRET else override_settings(
+            RAZORPAY_WEBHOOK_SECRET=StubGateway().secret
+        )
+
+        results = {}
+        media_root = tempfile.TemporaryDirectory(prefix='benchmark-media-')
+        self.stdout.write(
+            f"{'route':<24} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'queries':>7} {'alloc KiB':>9} {'errors':>6}"
+        )
+        # Upload scenarios write files a rollback does not remove, and the
+        # per-client fixture uploads must not use up the in-progress cap
+        media = override_settings(
+            MEDIA_ROOT=media_root.name,
+            UPLOAD_MAX_IN_PROGRESS=settings.UPLOAD_MAX_IN_PROGRESS + concurrency,
+        )
+        with media_root, media, secret:
+            fixtures = Fixtures(user, staff, concurrency)
+            try:
+                for scenario in scenarios:
+                    latencies, queries, errors, elapsed = run(
+                        scenario, fixtures, concurrency, options['duration'],
+                        warmup=options['warmup'], seed=options['seed']
+                    )
+                    allocated = (
+                        allocations(scenario, fixtures, options['alloc_samples'], options['seed'])
+                        if options['alloc_samples'] else 0.0
+                    )
+                    result = summarize(latencies, queries, errors, elapsed, allocated)
+                    results[scenario.name] = result
+                    self.report(scenario.name, result)
+            finally:
+                fixtures.cleanup()
+
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                json.dump({
+                    'meta': self.meta(user, options, concurrency),
+                    'routes': results,
+                }, target, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            self.compare(results, baseline, options)
+
+    def report(self, name, result):
+        def number(value, digits=2):
+            return '-' if value is None else f'{value:.{digits}f}'
+
+        line = (
+            f"{name:<24} {result['requests']:>8} {result['rps']:>8.1f} "
+            f"{number(result['p50_ms']):>8} {number(result['p95_ms']):>8} "
+            f"{number(result['p99_ms']):>8} {number(result['queries'], 1):>7} "
+            f"{result['alloc_kib']:>9.1f} {result['errors']:>6}"
+        )
+        if result['errors']:
+            statuses = ', '.join(f'{status} x{count}' for status, count in result['error_statuses'].items())
+            line = self.style.ERROR(f'{line}  ({statuses})')
+        self.stdout.write(line)
+
+    def meta(self, user, options, concurrency):
+        return {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'debug': settings.DEBUG,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'concurrency': concurrency,
+            'duration': options['duration'],
+            'dataset': dataset_size(user),
+        }
+
+    def compare(self, results, baseline, options):
+        meta = baseline.get('meta', {})
+        self.stdout.write(
+            f"\nAgainst baseline from {meta.get('created', '?')} "
+            f"({meta.get('database', '?')}, concurrency {meta.get('concurrency', '?')}):"
+        )
+        self.stdout.write(
+            f"{'route':<24} {'req/s':>8} {'p99':>8} {'alloc':>8} {'queries':>8}"
+        )
+
+        def percent(value):
+            return '-' if value is None else f'{value * 100:+.1f}%'
+
+        rows, regressions = compare(
+            results, baseline.get('routes', {}), options['tolerance'] / 100
+        )
+        for name, changes, problems in rows:
+            queries = '-' if changes['queries'] is None else f"{changes['queries']:+.1f}"
+            line = (
+                f"{name:<24} {percent(changes['rps']):>8} {percent(changes['p99_ms']):>8} "
+                f"{percent(changes['alloc_kib']):>8} {queries:>8}"
+            )
+            self.stdout.write(self.style.ERROR(line) if problems else line)
+
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('No regressions'))
+        elif options['fail_on_regression']:
+            raise CommandError('Regressions: ' + '; '.join(regressions))
+        else:
+            self.stdout.write(self.style.WARNING('Regressions: ' + '; '.join(regressions)))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from waste.bulkio import CATALOGS, FORMATS, detect_format, export_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream centers or waste types to a CSV or JSONL file that import_catalog reads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalog', choices=sorted(CATALOGS))
+        parser.add_argument('path', nargs='?', default='-',
+                            help="File to write (default '-': standard output)")
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='File format (default: from the extension, else csv)')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched from the database at a time')
+
+    def handle(self, *args, **options):
+        catalog = CATALOGS[options['catalog']]
+        path = options['path']
+        file_format = options['format'] or detect_format(path)
+
+        if path == '-':
+            export_rows(catalog, self.stdout, file_format, options['chunk_size'])
+            return
+        started = time.perf_counter()
+        with open(path, 'w', newline='', encoding='utf-8') as stream:
+            count = export_rows(catalog, stream, file_format, options['chunk_size'])
+        seconds = time.perf_counter() - started
+        self.stderr.write(
+            f'Exported {count} rows to {path} in {seconds:.1f}s, '
+            f'{count / seconds if seconds else 0:.0f} rows/s'
+        )
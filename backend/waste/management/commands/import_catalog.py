@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from waste.bulkio import CATALOGS, FORMATS, InvalidImport, detect_format, import_rows, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Upsert centers or waste types from a CSV or JSONL file (columns as written by '
+        'export_catalog), matching existing rows on their name (and address for centers)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalog', choices=sorted(CATALOGS))
+        parser.add_argument('path', help="File to read, or '-' for standard input")
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='File format (default: from the extension, else csv)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per upsert')
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help='Report and skip invalid rows instead of aborting the import')
+
+    def handle(self, *args, **options):
+        catalog = CATALOGS[options['catalog']]
+        path = options['path']
+        file_format = options['format'] or detect_format(path)
+
+        def progress(result):
+            if options['verbosity'] > 1:
+                self.stderr.write(f'{result.rows} rows, {result.rows_per_second:.0f} rows/s')
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            result = import_rows(
+                catalog, read_rows(stream, file_format, catalog.fields),
+                batch_size=max(options['batch_size'], 1),
+                skip_invalid=options['skip_invalid'], progress=progress,
+            )
+        except InvalidImport as exc:
+            raise CommandError(f'{exc} (nothing was imported)') from None
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in result.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.written} {options['catalog'].replace('_', ' ')} from {result.rows} rows "
+            f'({result.skipped} skipped) in {result.seconds:.1f}s, '
+            f'{result.rows_per_second:.0f} rows/s'
+        ))
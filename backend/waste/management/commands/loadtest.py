@@ -0,0 +1,138 @@
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+from waste.benchdata import ORIGIN, bench_user, seed
+
+ENDPOINTS = ('types', 'centers', 'nearest', 'history')
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the catalog, nearest-center and booking-history endpoints of one or '
+        'more running deployments (e.g. WSGI and ASGI) against the benchmark dataset'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True, metavar='NAME=URL',
+            help='Deployment to test, e.g. wsgi=http://127.0.0.1:8000 (repeatable)'
+        )
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS),
+                            help=f'Comma-separated subset of {", ".join(ENDPOINTS)}')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent keep-alive clients')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per endpoint and target')
+        parser.add_argument('--warmup', type=float, default=1.0, help='Unmeasured seconds before each run')
+        parser.add_argument('--seed', action='store_true', help='Create the benchmark dataset if missing')
+
+    def handle(self, *args, **options):
+        targets = []
+        for value in options['target']:
+            name, sep, url = value.partition('=')
+            if not sep or not url.startswith(('http://', 'https://')):
+                raise CommandError(f'--target must look like NAME=http://host:port, got {value!r}')
+            targets.append((name, url.rstrip('/')))
+        endpoints = [name for name in options['endpoints'].split(',') if name]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+        user = seed() if options['seed'] else bench_user()
+        if user is None:
+            raise CommandError('No benchmark dataset; run with --seed (or seed_benchmark_data) first')
+        token = str(RefreshToken.for_user(user).access_token)
+
+        self.stdout.write(
+            f"{'target':<10} {'endpoint':<10} {'requests':>9} {'req/s':>9} "
+            f"{'p50 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        )
+        for endpoint in endpoints:
+            for name, url in targets:
+                request = self.make_request(endpoint, token)
+                run(url, request, options['concurrency'], options['warmup'])
+                latencies, errors, elapsed = run(
+                    url, request, options['concurrency'], options['duration']
+                )
+                self.report(name, endpoint, latencies, errors, elapsed)
+
+    def make_request(self, endpoint, token):
+        """Return a ``rng -> (method, path, body, headers)`` factory for ``endpoint``."""
+        if endpoint == 'types':
+            return lambda rng: ('GET', '/api/waste/types/', None, {})
+        if endpoint == 'centers':
+            return lambda rng: ('GET', '/api/waste/centers/', None, {})
+        if endpoint == 'nearest':
+            def nearest(rng):
+                body = json.dumps({
+                    'latitude': round(ORIGIN[0] + rng.uniform(-0.2, 0.2), 6),
+                    'longitude': round(ORIGIN[1] + rng.uniform(-0.2, 0.2), 6),
+                })
+                return 'POST', '/api/waste/centers/nearest/', body, {'Content-Type': 'application/json'}
+            return nearest
+        return lambda rng: (
+            'GET', '/api/waste/booking/history/', None, {'Authorization': f'Bearer {token}'}
+        )
+
+    def report(self, name, endpoint, latencies, errors, elapsed):
+        if latencies:
+            p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+        else:
+            p50 = p99 = float('nan')
+        self.stdout.write(
+            f'{name:<10} {endpoint:<10} {len(latencies):>9} {len(latencies) / elapsed:>9.1f} '
+            f'{p50:>8.2f} {p99:>8.2f} {errors:>7}'
+        )
+
+
+def run(base_url, make_request, concurrency, duration):
+    """Drive ``base_url`` from ``concurrency`` threads for ``duration`` seconds.
+
+    Returns ``(latencies, errors, elapsed)``; latencies are seconds for
+    successful responses.
+    """
+    parts = urlsplit(base_url)
+    connection_class = (
+        http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    )
+    deadline = time.perf_counter() + duration
+    latencies, lock = [], threading.Lock()
+    errors = [0]
+
+    def client(index):
+        rng = random.Random(index)
+        connection = connection_class(parts.hostname, parts.port, timeout=30)
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            method, path, body, headers = make_request(rng)
+            started = time.perf_counter()
+            try:
+                connection.request(method, parts.path + path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = connection_class(parts.hostname, parts.port, timeout=30)
+                continue
+            if response.status < 400:
+                local.append(time.perf_counter() - started)
+            else:
+                failed += 1
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - started
@@ -0,0 +1,39 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from waste.models import Center
+from waste.routing import plan_center_day
+
+
+class Command(BaseCommand):
+    help = "Plan the pickup routes of a center's bookings for one day"
+
+    def add_arguments(self, parser):
+        parser.add_argument('center_id', type=int, help='ID of the center the vehicles start from')
+        parser.add_argument('date', type=date.fromisoformat, help='Pickup date (YYYY-MM-DD)')
+        parser.add_argument('--capacity-kg', type=float, default=None, help='Vehicle capacity in kg')
+        parser.add_argument('--time-limit', type=float, default=10.0, help='Improvement time budget in seconds')
+
+    def handle(self, *args, **options):
+        try:
+            center = Center.objects.get(pk=options['center_id'])
+        except Center.DoesNotExist:
+            raise CommandError(f"Center {options['center_id']} does not exist")
+
+        plan = plan_center_day(
+            center, options['date'], options['capacity_kg'], options['time_limit']
+        )
+
+        for number, trip in enumerate(plan.trips, start=1):
+            stops = ' -> '.join(f'#{booking_id}' for booking_id in trip.booking_ids)
+            self.stdout.write(
+                f'Trip {number}: {trip.distance_km:.2f} km, {trip.load_kg:.2f} kg: '
+                f'{center.name} -> {stops} -> {center.name}'
+            )
+        if plan.unrouted:
+            self.stdout.write(self.style.WARNING(
+                'Bookings without coordinates: ' + ', '.join(f'#{pk}' for pk in plan.unrouted)
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(plan.trips)} trip(s), {plan.distance_km:.2f} km in total'
+        ))
@@ -0,0 +1,46 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from waste.imaging import pending_job_ids, requeue_stale_jobs, run_job
+
+
+def run_job_in_thread(job_id):
+    try:
+        return run_job(job_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Process queued booking image jobs (thumbnails and re-encoding)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of worker threads')
+        parser.add_argument('--batch-size', type=int, default=50, help='Jobs fetched per poll')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--stale-minutes', type=int, default=15,
+                            help='Requeue jobs stuck in processing for this long')
+
+    def handle(self, *args, **options):
+        stale = timedelta(minutes=options['stale_minutes'])
+        processed = 0
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                requeued = requeue_stale_jobs(stale)
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale job(s)'))
+
+                job_ids = pending_job_ids(options['batch_size'])
+                if job_ids:
+                    processed += sum(executor.map(run_job_in_thread, job_ids))
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} image job(s)'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from waste.webhooks import process_batch
+
+
+class Command(BaseCommand):
+    help = 'Reconcile queued payment gateway webhook events into payments and bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Events reconciled per transaction')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+
+    def handle(self, *args, **options):
+        handled = 0
+        while True:
+            count = process_batch(options['batch_size'])
+            handled += count
+            if count:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Handled {handled} payment event(s)'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from waste.uploads import purge_stale
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished image uploads and their partial files idle longer than UPLOAD_STALE_HOURS'
+
+    def handle(self, *args, **options):
+        deleted = purge_stale()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} stale upload(s)'))
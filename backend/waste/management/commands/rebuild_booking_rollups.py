@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from waste.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily booking rollups from the bookings table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, default=None, help='First pickup date (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, default=None, help='Last pickup date (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per insert')
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if start and end and end < start:
+            raise CommandError('--end must not be before --start')
+
+        count = rebuild(start, end, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} rollup row(s)'))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from waste.benchdata import BENCH_EMAIL, BENCH_PASSWORD, BENCH_STAFF_EMAIL, bench_user, reset, seed
+
+
+class Command(BaseCommand):
+    help = 'Create the deterministic dataset used by benchmark_api and loadtest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Users owning the bookings')
+        parser.add_argument('--centers', type=int, default=2000)
+        parser.add_argument('--waste-types', type=int, default=6)
+        parser.add_argument('--bookings', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per bulk insert')
+        parser.add_argument('--reset', action='store_true',
+                            help='Delete an existing benchmark dataset first')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            started = time.perf_counter()
+            reset(options['batch_size'])
+            self.stdout.write(f'Removed the previous dataset in {time.perf_counter() - started:.1f}s')
+        elif bench_user() is not None:
+            self.stdout.write('Benchmark dataset already exists; use --reset to recreate it')
+            return
+
+        started = time.perf_counter()
+        seed(
+            users=max(options['users'], 1), centers=options['centers'],
+            waste_types=options['waste_types'], bookings=options['bookings'],
+            seed=options['seed'], batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['users']} users, {options['centers']} centers, "
+            f"{options['waste_types']} waste types and {options['bookings']} bookings "
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
+        self.stdout.write(f'Log in as {BENCH_EMAIL} or {BENCH_STAFF_EMAIL} with {BENCH_PASSWORD!r}')
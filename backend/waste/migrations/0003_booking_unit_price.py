@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste', '0002_booking_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Price per kg applied when the booking was priced', max_digits=10, null=True),
+        ),
+    ]
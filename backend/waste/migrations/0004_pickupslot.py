@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste', '0003_booking_unit_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickupSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('capacity', models.PositiveIntegerField()),
+                ('reserved', models.PositiveIntegerField(default=0)),
+                ('center', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pickup_slots', to='waste.center')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('center', 'date', 'time'), name='unique_pickup_slot'), models.CheckConstraint(condition=models.Q(('reserved__lte', models.F('capacity'))), name='pickup_slot_within_capacity')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """Roll up the bookings that exist before the signals start maintaining rollups."""
+    from waste.rollups import rebuild
+
+    rebuild(booking_model=apps.get_model('waste', 'Booking'),
+            rollup_model=apps.get_model('waste', 'BookingDailyRollup'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste', '0007_imageupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('booking_count', models.IntegerField(default=0)),
+                ('quantity_kg', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('center', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='waste.center')),
+                ('waste_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='waste.wastetype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='rollup_day_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('center__isnull', False)), fields=('day', 'center', 'waste_type', 'status'), name='unique_rollup_bucket'), models.UniqueConstraint(condition=models.Q(('center__isnull', True)), fields=('day', 'waste_type', 'status'), name='unique_rollup_bucket_no_center')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:04
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.utils import timezone
+
+
+def merge_rows(model, fk_name, keep_id, duplicate_ids, bucket_fields, sum_fields):
+    """Repoint ``model`` rows from the duplicates to ``keep_id``.
+
+    Rows that would then collide on ``bucket_fields`` (a unique constraint)
+    are added into the keeper's row instead.
+    """
+    for row in model.objects.filter(**{f'{fk_name}__in': duplicate_ids}):
+        bucket = {name: getattr(row, name) for name in bucket_fields}
+        target = model.objects.filter(**{fk_name: keep_id}, **bucket).first()
+        if target is None:
+            setattr(row, fk_name, keep_id)
+            row.save(update_fields=[fk_name])
+            continue
+        for name in sum_fields:
+            setattr(target, name, getattr(target, name) + getattr(row, name))
+        target.save(update_fields=list(sum_fields))
+        row.delete()
+
+
+def merge_duplicates(apps, schema_editor):
+    """Merge catalog rows that share a natural key into the oldest of them.
+
+    Before the constraints, the admin could create the same waste type or
+    center twice; bookings, rollups and pickup slots of the copies move to
+    the oldest row, and the copies are deleted.
+    """
+    WasteType = apps.get_model('waste', 'WasteType')
+    Center = apps.get_model('waste', 'Center')
+    Booking = apps.get_model('waste', 'Booking')
+    Rollup = apps.get_model('waste', 'BookingDailyRollup')
+    PickupSlot = apps.get_model('waste', 'PickupSlot')
+    rollup_sums = ('booking_count', 'quantity_kg', 'total_price')
+
+    for model, key in ((WasteType, ('name',)), (Center, ('name', 'address'))):
+        groups = (
+            model.objects.values(*key).annotate(keep=Min('id'), rows=Count('id')).filter(rows__gt=1)
+        )
+        for group in groups:
+            keep = group['keep']
+            duplicates = list(
+                model.objects.filter(**{name: group[name] for name in key})
+                .exclude(pk=keep).values_list('pk', flat=True)
+            )
+            if model is WasteType:
+                Booking.objects.filter(waste_type_id__in=duplicates).update(
+                    waste_type_id=keep, updated_at=timezone.now()
+                )
+                merge_rows(Rollup, 'waste_type_id', keep, duplicates,
+                           ('day', 'center_id', 'status'), rollup_sums)
+            else:
+                Booking.objects.filter(selected_center_id__in=duplicates).update(
+                    selected_center_id=keep, updated_at=timezone.now()
+                )
+                merge_rows(Rollup, 'center_id', keep, duplicates,
+                           ('day', 'waste_type_id', 'status'), rollup_sums)
+                merge_rows(PickupSlot, 'center_id', keep, duplicates,
+                           ('date', 'time'), ('capacity', 'reserved'))
+            model.objects.filter(pk__in=duplicates).delete()
+
+    # PostgreSQL refuses to ALTER a table with deferred foreign key checks
+    # still pending from the updates above
+    schema_editor.connection.check_constraints()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste', '0012_booking_user_updated_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='center',
+            constraint=models.UniqueConstraint(fields=('name', 'address'), name='unique_center_name_address'),
+        ),
+        migrations.AddConstraint(
+            model_name='wastetype',
+            constraint=models.UniqueConstraint(fields=('name',), name='unique_waste_type_name'),
+        ),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 
+from .pricing import line_total
+
 User = get_user_model()
 
 class WasteType(models.Model):
@@ -9,6 +14,12 @@ class WasteType(models.Model):
     description = models.TextField(blank=True)
     price_per_kg = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        # Natural key of add_waste_type and import_catalog
+        constraints = [
+            models.UniqueConstraint(fields=['name'], name='unique_waste_type_name'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -21,10 +32,39 @@ class Center(models.Model):
     contact_info = models.CharField(max_length=100, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Natural key of import_catalog
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'address'], name='unique_center_name_address'),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class PickupSlot(models.Model):
+    """Pickup capacity of a center at one date and time.
+
+    ``reserved`` is a counter maintained by :mod:`waste.slots` with conditional
+    UPDATEs, so checking availability never counts ``Booking`` rows.
+    """
+    center = models.ForeignKey(Center, on_delete=models.CASCADE, related_name='pickup_slots')
+    date = models.DateField()
+    time = models.TimeField()
+    capacity = models.PositiveIntegerField()
+    reserved = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['center', 'date', 'time'], name='unique_pickup_slot'),
+            models.CheckConstraint(condition=models.Q(reserved__lte=models.F('capacity')),
+                                   name='pickup_slot_within_capacity'),
+        ]
+
+    def __str__(self):
+        return f"{self.center_id} @ {self.date} {self.time} ({self.reserved}/{self.capacity})"
+
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -46,21 +86,140 @@ class Booking(models.Model):
     pickup_date = models.DateField()
     pickup_time = models.TimeField()
     address = models.TextField()
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     selected_center = models.ForeignKey(Center, on_delete=models.SET_NULL, null=True, blank=True)
     waste_image = models.ImageField(upload_to='waste_images/', blank=True, null=True)
+    waste_image_thumbnail = models.ImageField(upload_to='waste_images/thumbnails/', blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                     help_text='Price per kg applied when the booking was priced')
     total_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='booking_user_created_idx'),
+            # Count and latest update per user (booking history ETags) from the index alone
+            models.Index(fields=['user', 'updated_at'], name='booking_user_updated_idx'),
+            models.Index(fields=['pickup_date'], name='booking_pickup_date_idx'),
+            models.Index(fields=['status', 'pickup_date'], name='booking_status_pickup_idx'),
+            # Route planning and slot work only look at bookings that still need a pickup
+            models.Index(
+                fields=['selected_center', 'pickup_date'], name='booking_center_day_active_idx',
+                condition=~models.Q(status='cancelled'),
+            ),
+            # Unpaid bookings are a small, shrinking fraction of the table
+            models.Index(
+                fields=['created_at'], name='booking_unpaid_created_idx',
+                condition=models.Q(payment_status='pending'),
+            ),
+        ]
+
     def __str__(self):
         return f"Booking #{self.id} - {self.user.email} - {self.waste_type.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember loaded values so signal handlers can see what changed
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.total_price:
-            self.total_price = self.quantity_kg * self.waste_type.price_per_kg
-        super().save(*args, **kwargs)
+            # The waste type the serializer or admin form loaded, else its current row
+            self.unit_price = self.waste_type.price_per_kg
+            self.total_price = line_total(self.unit_price, self.quantity_kg)
+        # Slot moves in the signal handlers commit or roll back with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields
+        }
+
+
+class ImageJob(models.Model):
+    """Background processing of a booking's uploaded image (see waste.imaging)."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='image_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='imagejob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Image job #{self.id} for Booking #{self.booking_id} ({self.status})"
+
+
+class ImageUpload(models.Model):
+    """A resumable, chunked image upload (see waste.uploads)."""
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='image_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.received}/{self.size} bytes)"
+
+
+class BookingDailyRollup(models.Model):
+    """Bookings summed per pickup day, center, waste type and status.
+
+    Maintained incrementally from Booking signals by waste.rollups and
+    rebuilt with ``manage.py rebuild_booking_rollups``.
+    """
+    day = models.DateField()
+    center = models.ForeignKey(Center, on_delete=models.CASCADE, null=True, blank=True)
+    waste_type = models.ForeignKey(WasteType, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    booking_count = models.IntegerField(default=0)
+    quantity_kg = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_price = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'center', 'waste_type', 'status'],
+                condition=models.Q(center__isnull=False),
+                name='unique_rollup_bucket',
+            ),
+            models.UniqueConstraint(
+                fields=['day', 'waste_type', 'status'],
+                condition=models.Q(center__isnull=True),
+                name='unique_rollup_bucket_no_center',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='rollup_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.center_id} {self.waste_type_id} {self.status}: {self.booking_count}"
 
 
 class Payment(models.Model):
@@ -73,5 +232,67 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     paid_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['razorpay_order_id'], name='payment_order_id_idx',
+                condition=models.Q(razorpay_order_id__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Payment for Booking #{self.booking_id}"
+
+
+class IdempotencyKey(models.Model):
+    """Stored response of a request made with an ``Idempotency-Key`` header.
+
+    ``response_status`` stays empty while the first request is in flight
+    (see waste.idempotency).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    endpoint = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'endpoint', 'key'], name='unique_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} {self.key}"
+
+
+class PaymentEvent(models.Model):
+    """A raw payment gateway webhook delivery awaiting reconciliation (see waste.webhooks)."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+    ]
+
+    event_id = models.CharField(max_length=100, unique=True, null=True, blank=True,
+                                help_text='Gateway delivery id, used to drop redelivered events')
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['id'], name='paymentevent_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+
     def __str__(self):
-        return f"Payment for Booking #{self.booking.id}"
+        return f"Payment event #{self.id} ({self.status})"
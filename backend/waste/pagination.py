@@ -0,0 +1,113 @@
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class BookingCursorPagination(CursorPagination):
+    """Keyset pagination over ``(created_at, id)``, newest first.
+
+    Backed by the ``(user, created_at, id)`` index on ``Booking``, so every page
+    is an index range scan regardless of how deep the client has paged.
+
+    ``paginate_queryset`` is DRF's, split around the single query it runs so
+    the async booking list (``apaginate_queryset``) shares the same cursor
+    handling.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+    def ordering_columns(self):
+        """Columns the cursor positions are read from, for ``values_list()`` rows."""
+        return [name.lstrip('-') for name in self.ordering]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.set_page([item async for item in page_queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Decode the cursor and return the (unevaluated) query for the page."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (self.offset, self.reverse, self.current_position) = (0, False, None)
+        else:
+            (self.offset, self.reverse, self.current_position) = self.cursor
+
+        # Cursor pagination always enforces an ordering.
+        if self.reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        # If we have a cursor with a fixed position then filter by that.
+        if self.current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith('-')
+            order_attr = order.lstrip('-')
+
+            # Test for: (cursor reversed) XOR (queryset reversed)
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + '__lt': self.current_position}
+            else:
+                kwargs = {order_attr + '__gt': self.current_position}
+
+            queryset = queryset.filter(**kwargs)
+
+        # Fetch one extra item to know whether a following page exists
+        return queryset[self.offset:self.offset + self.page_size + 1]
+
+    def set_page(self, results):
+        """Build the page and the next/previous positions from the fetched rows."""
+        offset, reverse, current_position = self.offset, self.reverse, self.current_position
+        self.page = list(results[:self.page_size])
+
+        # Determine the position of the final item following the page.
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # If we have a reverse queryset, then the query ordering was in reverse
+            # so we need to reverse the items again before returning them to the user.
+            self.page = list(reversed(self.page))
+
+            # Determine next and previous positions for reverse cursors.
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            # Determine next and previous positions for forward cursors.
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        # Display page controls in the browsable API if there is more
+        # than one page.
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
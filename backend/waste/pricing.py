@@ -0,0 +1,27 @@
+"""
+Booking prices, always taken from the current ``WasteType`` rows.
+
+Prices are money, so they are never served from a per-process cache: another
+worker (or ``add_waste_type``, ``import_catalog``, the admin) may have changed
+them, and without a shared cache this process would not find out. Instead,
+``Booking.save`` prices from the waste type the serializer or admin form has
+already loaded, and the quote endpoint loads every waste type it prices in a
+single query.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+CENT = Decimal('0.01')
+
+
+def line_total(price_per_kg, quantity_kg):
+    """Price of ``quantity_kg`` at ``price_per_kg``, rounded to the paisa."""
+    return (Decimal(quantity_kg) * price_per_kg).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def current_prices(waste_type_ids):
+    """``{waste_type_id: price_per_kg}`` for the existing ids, in one query."""
+    from .models import WasteType  # models imports this module
+
+    return dict(
+        WasteType.objects.filter(pk__in=set(waste_type_ids)).values_list('id', 'price_per_kg')
+    )
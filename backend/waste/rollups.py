@@ -0,0 +1,136 @@
+"""
+Daily booking rollups.
+
+Every booking contributes its count, ``quantity_kg`` and ``total_price`` to the
+``BookingDailyRollup`` bucket of its pickup day, center, waste type and status.
+Saves and deletes apply the difference between the old and new contribution
+with conditional UPDATEs, so reports read a handful of rollup rows instead of
+scanning ``Booking``.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Booking, BookingDailyRollup
+
+ZERO = Decimal('0')
+KEY_FIELDS = ('pickup_date', 'selected_center_id', 'waste_type_id', 'status')
+BOOKING_FIELDS = KEY_FIELDS + ('quantity_kg', 'total_price')
+
+
+def contribution(values):
+    """``(bucket key, (count, quantity_kg, total_price))`` of booking values."""
+    key = tuple(values[name] for name in KEY_FIELDS)
+    return key, (1, values['quantity_kg'] or ZERO, values['total_price'] or ZERO)
+
+
+def booking_values(booking):
+    return {name: getattr(booking, name) for name in BOOKING_FIELDS}
+
+
+def lock_order(item):
+    """Sort key giving every transaction the same bucket order (``center_id`` may be None)."""
+    (day, center_id, waste_type_id, status), _ = item
+    return day, center_id is not None, center_id or 0, waste_type_id, status
+
+
+def apply_deltas(deltas):
+    """Add ``{key: [count, quantity_kg, total_price]}`` to the rollup table.
+
+    Buckets are updated in key order, so transactions touching the same
+    buckets lock them in the same order and cannot deadlock each other.
+    """
+    for (day, center_id, waste_type_id, status), (count, quantity, price) in sorted(
+        deltas.items(), key=lock_order
+    ):
+        if not count and not quantity and not price:
+            continue
+        bucket = BookingDailyRollup.objects.filter(
+            day=day, center_id=center_id, waste_type_id=waste_type_id, status=status
+        )
+        changes = {
+            'booking_count': F('booking_count') + count,
+            'quantity_kg': F('quantity_kg') + quantity,
+            'total_price': F('total_price') + price,
+        }
+        if bucket.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                BookingDailyRollup.objects.create(
+                    day=day, center_id=center_id, waste_type_id=waste_type_id, status=status,
+                    booking_count=count, quantity_kg=quantity, total_price=price
+                )
+        except IntegrityError:
+            # Created concurrently; add to it instead
+            bucket.update(**changes)
+
+
+def record_change(old_values, new_values):
+    """Move a booking's contribution from ``old_values`` to ``new_values``.
+
+    Either side may be ``None`` for creations and deletions.
+    """
+    deltas = defaultdict(lambda: [0, ZERO, ZERO])
+    for values, sign in ((old_values, -1), (new_values, 1)):
+        if values is None:
+            continue
+        key, measures = contribution(values)
+        for position, measure in enumerate(measures):
+            deltas[key][position] += sign * measure
+    apply_deltas(deltas)
+
+
+def record_bookings(bookings):
+    """Add bookings written without signals (e.g. ``bulk_create``)."""
+    deltas = defaultdict(lambda: [0, ZERO, ZERO])
+    for booking in bookings:
+        key, measures = contribution(booking_values(booking))
+        for position, measure in enumerate(measures):
+            deltas[key][position] += measure
+    apply_deltas(deltas)
+
+
+def rebuild(start=None, end=None, batch_size=1000, booking_model=Booking,
+            rollup_model=BookingDailyRollup):
+    """Recompute rollups from ``Booking`` for pickup days in ``[start, end]``.
+
+    Migrations pass their historical models as ``booking_model`` and
+    ``rollup_model``.
+    """
+    bookings = booking_model.objects.all()
+    rollups = rollup_model.objects.all()
+    if start:
+        bookings = bookings.filter(pickup_date__gte=start)
+        rollups = rollups.filter(day__gte=start)
+    if end:
+        bookings = bookings.filter(pickup_date__lte=end)
+        rollups = rollups.filter(day__lte=end)
+
+    buckets = (
+        bookings.order_by()
+        .values('pickup_date', 'selected_center_id', 'waste_type_id', 'status')
+        .annotate(
+            count=Count('id'),
+            quantity=Coalesce(Sum('quantity_kg'), Value(ZERO)),
+            price=Coalesce(Sum('total_price'), Value(ZERO)),
+        )
+    )
+    with transaction.atomic():
+        rollups.delete()
+        created = rollup_model.objects.bulk_create(
+            (
+                rollup_model(
+                    day=row['pickup_date'], center_id=row['selected_center_id'],
+                    waste_type_id=row['waste_type_id'], status=row['status'],
+                    booking_count=row['count'], quantity_kg=row['quantity'],
+                    total_price=row['price'],
+                )
+                for row in buckets.iterator()
+            ),
+            batch_size=batch_size,
+        )
+    return len(created)
@@ -0,0 +1,186 @@
+"""
+Pickup route planning for a center's day.
+
+Stops are the day's geocoded bookings and the depot is the center. Trips are
+seeded with a capacity-aware nearest-neighbour walk (a vehicle returns to the
+depot when the next closest stop would not fit) and each trip is then improved
+with 2-opt and or-opt moves evaluated in vectorized form against a
+precomputed haversine distance matrix.
+"""
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .models import Booking
+from .spatial import haversine_km
+
+# Improvements smaller than this (in km, i.e. 10 cm) are float32 rounding noise
+# and would let equivalent moves cycle forever
+EPSILON = 1e-4
+
+
+@dataclass
+class Trip:
+    booking_ids: list
+    load_kg: float
+    distance_km: float
+
+
+@dataclass
+class RoutePlan:
+    trips: list = field(default_factory=list)
+    unrouted: list = field(default_factory=list)
+
+    @property
+    def distance_km(self):
+        return sum(trip.distance_km for trip in self.trips)
+
+
+def distance_matrix(latitudes, longitudes, block_rows=512):
+    """Pairwise great-circle distances as a ``float32`` matrix.
+
+    Rows are computed in blocks so the float64 temporaries stay small even
+    for thousands of stops.
+    """
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    size = len(latitudes)
+    matrix = np.empty((size, size), dtype=np.float32)
+    for start in range(0, size, block_rows):
+        stop = min(start + block_rows, size)
+        matrix[start:stop] = haversine_km(
+            latitudes[start:stop, None], longitudes[start:stop, None], latitudes, longitudes
+        )
+    return matrix
+
+
+def route_length(route, matrix):
+    route = np.asarray(route)
+    return float(matrix[route[:-1], route[1:]].sum(dtype=np.float64))
+
+
+def nearest_neighbor_trips(matrix, demands, capacity=None):
+    """Seed trips as node lists ``[0, ..., 0]``; node 0 is the depot."""
+    unvisited = np.ones(len(demands), dtype=bool)
+    unvisited[0] = False
+    trips = []
+    while unvisited.any():
+        route, load, current = [0], 0.0, 0
+        while True:
+            candidates = unvisited.copy()
+            if capacity is not None:
+                candidates &= demands <= capacity - load
+                if len(route) == 1 and not candidates.any():
+                    # Heavier than a whole vehicle: give it a trip of its own
+                    candidates = unvisited.copy()
+            if not candidates.any():
+                break
+            row = np.where(candidates, matrix[current], np.inf)
+            current = int(np.argmin(row))
+            unvisited[current] = False
+            route.append(current)
+            load += demands[current]
+            if capacity is not None and load >= capacity:
+                break
+        route.append(0)
+        trips.append(route)
+    return trips
+
+
+def two_opt(route, matrix, deadline):
+    """Reverse segments while that shortens the closed route."""
+    route = np.asarray(route)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for i in range(1, len(route) - 2):
+            if time.monotonic() >= deadline:
+                break
+            a, b = route[i - 1], route[i]
+            c = route[i + 1:-1]
+            d = route[i + 2:]
+            delta = matrix[a, c] + matrix[b, d] - matrix[a, b] - matrix[c, d]
+            j = int(np.argmin(delta))
+            if delta[j] < -EPSILON:
+                end = i + 1 + j
+                route[i:end + 1] = route[i:end + 1][::-1].copy()
+                improved = True
+    return route.tolist()
+
+
+def or_opt(route, matrix, deadline, max_segment=3):
+    """Move runs of up to ``max_segment`` stops to their cheapest position."""
+    route = list(route)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for length in range(1, max_segment + 1):
+            i = 1
+            while i + length < len(route) and time.monotonic() < deadline:
+                segment = route[i:i + length]
+                prev, nxt = route[i - 1], route[i + length]
+                first, last = segment[0], segment[-1]
+                removal_gain = matrix[prev, first] + matrix[last, nxt] - matrix[prev, nxt]
+
+                rest = np.asarray(route[:i] + route[i + length:])
+                p, q = rest[:-1], rest[1:]
+                forward = matrix[p, first] + matrix[last, q] - matrix[p, q]
+                backward = matrix[p, last] + matrix[first, q] - matrix[p, q]
+                forward[i - 1] = backward[i - 1] = np.inf  # the edge it came from
+                best = np.minimum(forward, backward)
+                k = int(np.argmin(best))
+                if best[k] < removal_gain - EPSILON:
+                    moved = segment if forward[k] <= backward[k] else segment[::-1]
+                    route = rest[:k + 1].tolist() + moved + rest[k + 1:].tolist()
+                    improved = True
+                i += 1
+    return route
+
+
+def plan_routes(depot, stops, capacity_kg=None, time_limit=10.0):
+    """Plan trips from ``depot`` over ``stops``.
+
+    ``depot`` is a ``(latitude, longitude)`` pair and ``stops`` a list of
+    ``(booking_id, latitude, longitude, quantity_kg)`` tuples. Stops without
+    coordinates are returned in ``RoutePlan.unrouted``.
+    """
+    plan = RoutePlan()
+    routed = []
+    for stop in stops:
+        if stop[1] is None or stop[2] is None:
+            plan.unrouted.append(stop[0])
+        else:
+            routed.append(stop)
+    if not routed:
+        return plan
+
+    deadline = time.monotonic() + time_limit
+    latitudes = [float(depot[0])] + [float(stop[1]) for stop in routed]
+    longitudes = [float(depot[1])] + [float(stop[2]) for stop in routed]
+    demands = np.array([0.0] + [float(stop[3]) for stop in routed])
+    matrix = distance_matrix(latitudes, longitudes)
+    capacity = float(capacity_kg) if capacity_kg is not None else None
+
+    for route in nearest_neighbor_trips(matrix, demands, capacity):
+        route = two_opt(route, matrix, deadline)
+        route = or_opt(route, matrix, deadline)
+        plan.trips.append(Trip(
+            booking_ids=[routed[node - 1][0] for node in route[1:-1]],
+            load_kg=float(demands[route].sum()),
+            distance_km=route_length(route, matrix),
+        ))
+    return plan
+
+
+def plan_center_day(center, pickup_date, capacity_kg=None, time_limit=10.0):
+    """Plan the routes of ``center`` for all active bookings on ``pickup_date``."""
+    stops = (
+        Booking.objects.filter(selected_center=center, pickup_date=pickup_date)
+        .exclude(status='cancelled')
+        .order_by('id')
+        .values_list('id', 'latitude', 'longitude', 'quantity_kg')
+    )
+    return plan_routes(
+        (center.latitude, center.longitude), list(stops), capacity_kg, time_limit
+    )
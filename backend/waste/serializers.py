@@ -1,5 +1,9 @@
+import os
+from decimal import Decimal
+from django.conf import settings
 from rest_framework import serializers
-from .models import WasteType, Center, Booking, Payment
+from .models import WasteType, Center, Booking, BookingDailyRollup, ImageUpload, Payment
+from .pricing import current_prices
 from users.serializers import UserSerializer
 
 class WasteTypeSerializer(serializers.ModelSerializer):
@@ -14,15 +18,128 @@ class CenterSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class CenterSearchSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    # ``k`` bounds every response, radius searches included
+    k = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    radius_km = serializers.FloatField(min_value=0, max_value=1000, required=False)
+
+
+class PriceQuoteItemSerializer(serializers.Serializer):
+    waste_type_id = serializers.IntegerField()
+    quantity_kg = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+
+
+class PriceQuoteSerializer(serializers.Serializer):
+    items = serializers.ListField(
+        child=PriceQuoteItemSerializer(), allow_empty=False, max_length=500
+    )
+
+    def validate(self, attrs):
+        # Loaded once here and handed to the view as validated_data['prices']
+        prices = current_prices(item['waste_type_id'] for item in attrs['items'])
+        unknown = {item['waste_type_id'] for item in attrs['items']} - prices.keys()
+        if unknown:
+            raise serializers.ValidationError({
+                'items': f"Unknown waste types: {', '.join(map(str, sorted(unknown)))}"
+            })
+        attrs['prices'] = prices
+        return attrs
+
+
+class SlotAvailabilitySerializer(serializers.Serializer):
+    center = serializers.IntegerField()
+    start = serializers.DateField()
+    end = serializers.DateField()
+
+    MAX_DAYS = 62
+
+    def validate(self, attrs):
+        span = (attrs['end'] - attrs['start']).days
+        if span < 0:
+            raise serializers.ValidationError({'end': 'end must not be before start'})
+        if span >= self.MAX_DAYS:
+            raise serializers.ValidationError({'end': f'At most {self.MAX_DAYS} days per request'})
+        return attrs
+
+
+class RoutePlanRequestSerializer(serializers.Serializer):
+    center = serializers.IntegerField()
+    date = serializers.DateField()
+    capacity_kg = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False
+    )
+
+
+class RollupQuerySerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    center = serializers.IntegerField(required=False)
+    waste_type = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=Booking.STATUS_CHOICES, required=False)
+
+    MAX_DAYS = 366
+
+    def validate(self, attrs):
+        span = (attrs['end'] - attrs['start']).days
+        if span < 0:
+            raise serializers.ValidationError({'end': 'end must not be before start'})
+        if span >= self.MAX_DAYS:
+            raise serializers.ValidationError({'end': f'At most {self.MAX_DAYS} days per request'})
+        return attrs
+
+
+class BookingDailyRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BookingDailyRollup
+        fields = ['day', 'center', 'waste_type', 'status', 'booking_count', 'quantity_kg', 'total_price']
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field that resolves from ``context['prefetched'][model]``.
+
+    Bulk endpoints load every referenced row up front and pass them in the
+    serializer context, so validating N items does not issue N lookups.
+    Without prefetched rows it behaves like ``PrimaryKeyRelatedField``.
+    """
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get('prefetched', {}).get(self.get_queryset().model)
+        if prefetched is None:
+            return super().to_internal_value(data)
+        # int() would truncate 1.7 to 1, and accepts True, '+1' and ' 1 '
+        if isinstance(data, bool) or not (
+            isinstance(data, int) or isinstance(data, str) and data.isdigit()
+        ):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return prefetched[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except ValueError:
+            # Non-ASCII digits such as '²'
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class ThumbnailImageField(serializers.ImageField):
+    """Accepts an upload; renders the thumbnail once it exists, else the original."""
+    # Checked in this order, also by the fast read path (waste.fastread)
+    sources = ('waste_image_thumbnail', 'waste_image')
+
+    def get_attribute(self, instance):
+        return instance.waste_image_thumbnail or instance.waste_image
+
+
 class BookingSerializer(serializers.ModelSerializer):
     waste_type = WasteTypeSerializer(read_only=True)
-    waste_type_id = serializers.PrimaryKeyRelatedField(
+    waste_type_id = PrefetchedPrimaryKeyRelatedField(
         queryset=WasteType.objects.all(),
         source='waste_type',
         write_only=True
     )
     selected_center = CenterSerializer(read_only=True)
-    selected_center_id = serializers.PrimaryKeyRelatedField(
+    selected_center_id = PrefetchedPrimaryKeyRelatedField(
         queryset=Center.objects.all(),
         source='selected_center',
         write_only=True,
@@ -30,17 +147,53 @@ class BookingSerializer(serializers.ModelSerializer):
         allow_null=True
     )
     user = UserSerializer(read_only=True)
-    waste_image = serializers.ImageField(required=False, allow_null=True)
+    waste_image = ThumbnailImageField(required=False, allow_null=True)
+    waste_image_original = serializers.ImageField(source='waste_image', read_only=True)
 
     class Meta:
         model = Booking
         fields = [
             'id', 'user', 'waste_type', 'waste_type_id', 'quantity_kg',
-            'pickup_date', 'pickup_time', 'address', 'selected_center',
-            'selected_center_id', 'waste_image', 'status', 'payment_status',
-            'total_price', 'created_at', 'updated_at'
+            'pickup_date', 'pickup_time', 'address', 'latitude', 'longitude', 'selected_center',
+            'selected_center_id', 'waste_image', 'waste_image_original', 'status', 'payment_status',
+            'unit_price', 'total_price', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['user', 'status', 'payment_status', 'total_price', 'created_at', 'updated_at']
+        read_only_fields = ['user', 'status', 'payment_status', 'unit_price', 'total_price', 'created_at', 'updated_at']
+
+    EXPANDABLE_FIELDS = ('user', 'waste_type', 'selected_center')
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        """
+        ``fields`` limits the output to the named fields and ``expand`` lists
+        the relations rendered as nested objects; the others are rendered as
+        their primary key. ``None`` keeps the full nested representation.
+        """
+        super().__init__(*args, **kwargs)
+        if expand is not None:
+            for name in self.EXPANDABLE_FIELDS:
+                if name not in expand:
+                    self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+        if fields is not None:
+            for name in list(self.fields):
+                if name not in fields and not self.fields[name].write_only:
+                    self.fields.pop(name)
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'filename', 'size', 'received', 'status', 'booking', 'created_at']
+        read_only_fields = ['received', 'status', 'booking', 'created_at']
+
+    def validate_filename(self, value):
+        return os.path.basename(value)
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError(
+                f'Size must be between 1 and {settings.UPLOAD_MAX_BYTES} bytes'
+            )
+        return value
 
 
 class PaymentSerializer(serializers.ModelSerializer):
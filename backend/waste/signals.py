@@ -0,0 +1,107 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .catalog import CENTERS, WASTE_TYPES, bump_catalog_version
+from .models import Booking, Center, WasteType
+from .rollups import BOOKING_FIELDS, booking_values, record_change
+from .slots import release_slot, reserve_slot
+from .spatial import center_coordinates, center_index
+
+
+def _centers_changed(mutate_index):
+    mutate_index()
+    center_coordinates.invalidate()
+    bump_catalog_version(CENTERS)
+
+
+# Caches are only touched once the write commits: a concurrent reader could
+# otherwise reload the old rows and keep them under the new generation/version.
+@receiver(post_save, sender=Center)
+def update_center_index(sender, instance, **kwargs):
+    upsert = partial(center_index.upsert, instance.pk, instance.latitude, instance.longitude)
+    transaction.on_commit(partial(_centers_changed, upsert))
+
+
+@receiver(post_delete, sender=Center)
+def remove_from_center_index(sender, instance, **kwargs):
+    remove = partial(center_index.remove, instance.pk)
+    transaction.on_commit(partial(_centers_changed, remove))
+
+
+@receiver(post_save, sender=WasteType)
+@receiver(post_delete, sender=WasteType)
+def invalidate_waste_type_catalog(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump_catalog_version, WASTE_TYPES))
+
+
+SLOT_FIELDS = ('selected_center_id', 'pickup_date', 'pickup_time', 'status')
+
+
+def held_slot(values):
+    """The ``(center_id, date, time)`` a booking holds a place in, if any."""
+    if values['selected_center_id'] is None or values['status'] == 'cancelled':
+        return None
+    return values['selected_center_id'], values['pickup_date'], values['pickup_time']
+
+
+@receiver(pre_save, sender=Booking)
+def remember_held_slot(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None)
+    if instance._state.adding or instance.pk is None:
+        previous = None
+    elif loaded is not None and all(name in loaded for name in SLOT_FIELDS):
+        previous = loaded
+    else:
+        previous = Booking.objects.filter(pk=instance.pk).values(*SLOT_FIELDS).first()
+    instance._slot_previous = held_slot(previous) if previous else None
+
+
+@receiver(post_save, sender=Booking)
+def move_booking_slot(sender, instance, created, **kwargs):
+    # New bookings reserve in the views, before the row is written
+    if created:
+        return
+    previous = getattr(instance, '_slot_previous', None)
+    current = held_slot({name: getattr(instance, name) for name in SLOT_FIELDS})
+    if previous == current:
+        return
+    # Booking.save is atomic, so SlotUnavailable also undoes the release and the row
+    if previous is not None:
+        release_slot(*previous)
+    if current is not None:
+        reserve_slot(*current)
+
+
+@receiver(post_delete, sender=Booking)
+def release_deleted_booking_slot(sender, instance, **kwargs):
+    if instance.selected_center_id is not None and instance.status != 'cancelled':
+        release_slot(instance.selected_center_id, instance.pickup_date, instance.pickup_time)
+
+
+@receiver(pre_save, sender=Booking)
+def remember_rollup_values(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None)
+    if instance._state.adding or instance.pk is None:
+        instance._rollup_previous = None
+    elif loaded is not None and all(name in loaded for name in BOOKING_FIELDS):
+        instance._rollup_previous = {name: loaded[name] for name in BOOKING_FIELDS}
+    else:
+        instance._rollup_previous = (
+            Booking.objects.filter(pk=instance.pk).values(*BOOKING_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=Booking)
+def update_booking_rollup(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_rollup_previous', None)
+    current = booking_values(instance)
+    if previous != current:
+        record_change(previous, current)
+
+
+@receiver(post_delete, sender=Booking)
+def remove_booking_from_rollup(sender, instance, **kwargs):
+    record_change(booking_values(instance), None)
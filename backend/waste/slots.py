@@ -0,0 +1,60 @@
+"""
+Pickup slot reservations.
+
+Each ``PickupSlot`` row holds a ``reserved`` counter next to its ``capacity``.
+Reserving is a single conditional UPDATE that only matches while enough places
+are left, so concurrent requests cannot overbook a slot and no ``Booking`` rows
+are counted. Slots that were never configured are created on first use with
+``PICKUP_SLOT_DEFAULT_CAPACITY`` places. Saving a booking with another center,
+date or time, cancelling, reinstating or deleting it moves its place through
+the ``Booking`` signal handlers.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import PickupSlot
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def default_capacity():
+    return settings.PICKUP_SLOT_DEFAULT_CAPACITY
+
+
+def reserve_slot(center_id, pickup_date, pickup_time, count=1):
+    """Reserve ``count`` places or raise :class:`SlotUnavailable`.
+
+    Call inside the transaction that writes the bookings, so a rollback also
+    returns the places.
+    """
+    slot = PickupSlot.objects.filter(center_id=center_id, date=pickup_date, time=pickup_time)
+    available = slot.filter(reserved__lte=F('capacity') - count)
+    if available.update(reserved=F('reserved') + count):
+        return
+
+    capacity = default_capacity()
+    if count <= capacity:
+        try:
+            with transaction.atomic():
+                PickupSlot.objects.create(
+                    center_id=center_id, date=pickup_date, time=pickup_time,
+                    capacity=capacity, reserved=count
+                )
+            return
+        except IntegrityError:
+            # A concurrent first booking created the slot; it may still have room
+            if available.update(reserved=F('reserved') + count):
+                return
+    raise SlotUnavailable(
+        f'No pickup capacity left at center {center_id} on {pickup_date} {pickup_time}'
+    )
+
+
+def release_slot(center_id, pickup_date, pickup_time, count=1):
+    """Return ``count`` places to a slot."""
+    PickupSlot.objects.filter(
+        center_id=center_id, date=pickup_date, time=pickup_time, reserved__gte=count
+    ).update(reserved=F('reserved') - count)
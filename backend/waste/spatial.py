@@ -0,0 +1,333 @@
+"""
+In-process spatial index for collection centers.
+
+Centers are projected onto the unit sphere as (x, y, z) vectors and stored in a
+k-d tree. Straight-line (chord) distance between unit vectors grows
+monotonically with great-circle distance, so the nearest vector is also the
+nearest center, and the chord converts back to kilometres exactly.
+
+Saves and deletes are applied incrementally: changed centers go into a small
+overlay that is scanned linearly and their old tree entries are tombstoned.
+Once the overlay grows past a fraction of the tree, the tree is rebuilt from
+memory without touching the database.
+
+Ranked and radius searches use NumPy instead: distances to every candidate are
+computed in one vectorized pass over a cached coordinate array, or over the
+rows of a bounding-box prefiltered query.
+"""
+import heapq
+import threading
+import time
+from math import asin, cos, degrees, radians, sin, sqrt
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Center
+
+EARTH_RADIUS_KM = 6371
+
+
+def to_unit_vector(latitude, longitude):
+    """Project a latitude/longitude pair (in degrees) onto the unit sphere."""
+    lat, lon = radians(float(latitude)), radians(float(longitude))
+    cos_lat = cos(lat)
+    return (cos_lat * cos(lon), cos_lat * sin(lon), sin(lat))
+
+
+def chord_to_km(chord):
+    """Convert a chord length on the unit sphere to great-circle kilometres."""
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, chord / 2))
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Vectorized great-circle distance in kilometres.
+
+    Arguments are degrees and broadcast like NumPy arrays, so a column of
+    points against a row of centers yields the full distance matrix.
+    """
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def bounding_box_filter(latitude, longitude, radius_km):
+    """Return a ``Q`` matching centers inside the box enclosing a search circle."""
+    angular = radius_km / EARTH_RADIUS_KM
+    min_lat = latitude - degrees(angular)
+    max_lat = latitude + degrees(angular)
+    box = Q(latitude__gte=max(min_lat, -90), latitude__lte=min(max_lat, 90))
+    if min_lat <= -90 or max_lat >= 90 or angular >= np.pi / 2:
+        # The circle covers a pole, so every longitude is plausible
+        return box
+
+    delta_lon = degrees(asin(min(1.0, sin(angular) / cos(radians(latitude)))))
+    min_lon, max_lon = longitude - delta_lon, longitude + delta_lon
+    if min_lon < -180:
+        return box & (Q(longitude__gte=min_lon + 360) | Q(longitude__lte=max_lon))
+    if max_lon > 180:
+        return box & (Q(longitude__gte=min_lon) | Q(longitude__lte=max_lon - 360))
+    return box & Q(longitude__gte=min_lon, longitude__lte=max_lon)
+
+
+def _squared_distance(a, b):
+    dx, dy, dz = a[0] - b[0], a[1] - b[1], a[2] - b[2]
+    return dx * dx + dy * dy + dz * dz
+
+
+class KDTree:
+    """Static 3-d tree over ``(key, (x, y, z))`` items."""
+
+    def __init__(self, items):
+        self.size = len(items)
+        self._root = self._build(list(items), 0)
+
+    def _build(self, items, depth):
+        if not items:
+            return None
+        axis = depth % 3
+        items.sort(key=lambda item: item[1][axis])
+        mid = len(items) // 2
+        return (
+            items[mid],
+            axis,
+            self._build(items[:mid], depth + 1),
+            self._build(items[mid + 1:], depth + 1),
+        )
+
+    def items(self):
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            yield node[0]
+            stack.append(node[2])
+            stack.append(node[3])
+
+    def nearest(self, target, k=1, skip=()):
+        """Return up to ``k`` ``(squared_chord, key)`` pairs, closest first."""
+        heap = []  # max-heap on distance via negated values
+
+        def visit(node):
+            if node is None:
+                return
+            (key, point), axis, left, right = node
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if key not in skip:
+                d2 = _squared_distance(target, point)
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d2, key))
+                elif d2 < -heap[0][0]:
+                    heapq.heapreplace(heap, (-d2, key))
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(self._root)
+        return sorted((-neg_d2, key) for neg_d2, key in heap)
+
+
+class CenterIndex:
+    """Thread-safe nearest-center index keyed by ``Center.pk``.
+
+    The index starts cold. Callers warm it with :meth:`build` (typically from
+    rows they already loaded for a fallback scan). While warm, signal handlers
+    keep it current via :meth:`upsert` and :meth:`remove` once each write
+    commits. Changes made by other processes are picked up when the index
+    expires after ``CENTER_INDEX_TTL`` seconds.
+
+    Every change bumps :attr:`generation`. Callers read it before loading the
+    rows they pass to :meth:`build`, which drops them if a change happened in
+    between, so a slow build cannot overwrite a newer state with stale rows.
+    """
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._reset()
+
+    def _reset(self):
+        self._tree = None
+        self._overlay = {}
+        self._tombstones = set()
+        self._built_at = None
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'CENTER_INDEX_TTL', 300)
+
+    @property
+    def generation(self):
+        return self._generation
+
+    @property
+    def is_warm(self):
+        if self._tree is None:
+            return False
+        ttl = self.ttl
+        return not ttl or time.monotonic() - self._built_at < ttl
+
+    def build(self, rows, generation=None):
+        """Rebuild the index from ``(pk, latitude, longitude)`` rows.
+
+        With the ``generation`` read before the rows were loaded, the rows are
+        only used if nothing changed since; returns whether they were.
+        """
+        items = [(pk, to_unit_vector(lat, lon)) for pk, lat, lon in rows]
+        tree = KDTree(items)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._reset()
+            self._tree = tree
+            self._built_at = time.monotonic()
+        return True
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._reset()
+
+    def upsert(self, pk, latitude, longitude):
+        with self._lock:
+            self._generation += 1
+            if self._tree is None:
+                return
+            self._tombstones.add(pk)
+            self._overlay[pk] = to_unit_vector(latitude, longitude)
+            self._maybe_compact()
+
+    def remove(self, pk):
+        with self._lock:
+            self._generation += 1
+            if self._tree is None:
+                return
+            self._tombstones.add(pk)
+            self._overlay.pop(pk, None)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        pending = len(self._tombstones) + len(self._overlay)
+        if pending <= max(32, self._tree.size // 8):
+            return
+        items = [
+            (pk, point) for pk, point in self._tree.items()
+            if pk not in self._tombstones
+        ]
+        items.extend(self._overlay.items())
+        self._tree = KDTree(items)
+        self._overlay = {}
+        self._tombstones = set()
+
+    def nearest(self, latitude, longitude, k=1):
+        """Return up to ``k`` ``(pk, distance_km)`` pairs, or ``None`` if cold."""
+        target = to_unit_vector(latitude, longitude)
+        with self._lock:
+            if not self.is_warm:
+                return None
+            candidates = self._tree.nearest(target, k, skip=self._tombstones)
+            candidates.extend(
+                (_squared_distance(target, point), pk)
+                for pk, point in self._overlay.items()
+            )
+        candidates.sort()
+        return [(pk, chord_to_km(sqrt(d2))) for d2, pk in candidates[:k]]
+
+
+center_index = CenterIndex()
+
+
+class CenterCoordinates:
+    """Cached ``(ids, latitudes, longitudes)`` arrays of every center.
+
+    Loaded with a single ``values_list`` query and dropped by the ``Center``
+    signal handlers after each commit; like :class:`CenterIndex` it also expires after
+    ``CENTER_INDEX_TTL`` seconds, and arrays loaded across an
+    :meth:`invalidate` are returned but not kept.
+    """
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._arrays = None
+        self._loaded_at = None
+
+    def _is_fresh(self):
+        ttl = getattr(settings, 'CENTER_INDEX_TTL', 300) if self._ttl is None else self._ttl
+        return self._arrays is not None and (
+            not ttl or time.monotonic() - self._loaded_at < ttl
+        )
+
+    def get(self):
+        with self._lock:
+            if self._is_fresh():
+                return self._arrays
+            generation = self._generation
+        rows = list(Center.objects.order_by('id').values_list('id', 'latitude', 'longitude'))
+        arrays = rows_to_arrays(rows)
+        with self._lock:
+            if generation == self._generation:
+                self._arrays = arrays
+                self._loaded_at = time.monotonic()
+        return arrays
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._arrays = None
+
+
+def rows_to_arrays(rows):
+    """Split ``(pk, latitude, longitude)`` rows into NumPy arrays."""
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    data = np.array(rows, dtype=float)
+    return data[:, 0].astype(np.int64), data[:, 1], data[:, 2]
+
+
+def rank_centers(latitude, longitude, arrays, k=None, radius_km=None):
+    """Rank centers by distance from a point.
+
+    Returns ``(pk, distance_km)`` pairs, closest first, optionally limited to
+    ``radius_km`` and to the ``k`` nearest.
+    """
+    ids, latitudes, longitudes = arrays
+    distances = haversine_km(latitude, longitude, latitudes, longitudes)
+    candidates = np.arange(len(ids))
+    if radius_km is not None:
+        candidates = candidates[distances <= radius_km]
+    if k is not None and k < len(candidates):
+        nearest = np.argpartition(distances[candidates], k - 1)[:k]
+        candidates = candidates[nearest]
+    ordered = candidates[np.argsort(distances[candidates], kind='stable')]
+    return [(int(ids[i]), float(distances[i])) for i in ordered]
+
+
+def nearest_for_points(points, arrays, max_cells=1_000_000):
+    """Yield ``(pk, distance_km)`` arrays for chunks of ``points``.
+
+    ``points`` is an ``(n, 2)`` array of latitude/longitude rows. Each chunk
+    computes a points x centers distance matrix of at most ``max_cells``
+    entries, keeping memory bounded for large batches.
+    """
+    ids, latitudes, longitudes = arrays
+    chunk = max(1, max_cells // max(1, len(ids)))
+    for start in range(0, len(points), chunk):
+        block = points[start:start + chunk]
+        matrix = haversine_km(block[:, :1], block[:, 1:], latitudes, longitudes)
+        nearest = np.argmin(matrix, axis=1)
+        yield ids[nearest], matrix[np.arange(len(block)), nearest]
+
+
+center_coordinates = CenterCoordinates()
@@ -0,0 +1,61 @@
+"""
+Local stand-in for the Razorpay webhook sender, for tests and benchmarks.
+
+It produces signed deliveries shaped like Razorpay's ``payment.captured`` and
+``payment.failed`` events, including the failure modes the reconciliation
+worker has to cope with: failed attempts before a capture, redelivery of the
+same event and out-of-order arrival.
+"""
+import json
+import random
+import uuid
+
+from .webhooks import sign
+
+
+class StubGateway:
+    def __init__(self, secret='stub-webhook-secret', seed=0):
+        self.secret = secret
+        self.rng = random.Random(seed)
+
+    def event(self, order_id, event='payment.captured', payment_id=None, amount=None):
+        """Return one ``(body, headers)`` delivery."""
+        payment_id = payment_id or f'pay_{uuid.UUID(int=self.rng.getrandbits(128)).hex[:14]}'
+        body = json.dumps({
+            'entity': 'event',
+            'event': event,
+            'payload': {
+                'payment': {
+                    'entity': {
+                        'id': payment_id,
+                        'order_id': order_id,
+                        'amount': amount,
+                        'status': 'captured' if event == 'payment.captured' else 'failed',
+                    }
+                }
+            },
+        }).encode()
+        headers = {
+            'X-Razorpay-Signature': sign(body, self.secret),
+            'X-Razorpay-Event-Id': f'evt_{uuid.UUID(int=self.rng.getrandbits(128)).hex[:14]}',
+        }
+        return body, headers
+
+    def deliveries(self, order_ids, failure_rate=0.1, redelivery_rate=0.1):
+        """Deliveries paying every order, with failures and redeliveries mixed in.
+
+        A failed attempt is followed by a capture with a new payment id, and a
+        redelivery repeats an earlier delivery byte for byte. The result is
+        shuffled.
+        """
+        deliveries = []
+        for order_id in order_ids:
+            if self.rng.random() < failure_rate:
+                deliveries.append(self.event(order_id, 'payment.failed'))
+            deliveries.append(self.event(order_id))
+        deliveries.extend(
+            self.rng.choice(deliveries)
+            for _ in range(int(len(deliveries) * redelivery_rate))
+        )
+        self.rng.shuffle(deliveries)
+        return deliveries
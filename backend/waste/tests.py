@@ -1,3 +1,2049 @@
-from django.test import TestCase
+import gc
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from garbage_management import compression, metrics
+from garbage_management import settings as base_settings
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from users import urls as users_urls
+from users.authentication import user_cache
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from . import apibench, async_views, benchdata, fastread, idempotency, spatial, views
+from . import urls as waste_urls
+from .catalog import WASTE_TYPES, catalog_version
+from .imaging import pending_job_ids, run_job
+from .models import (
+    Booking, BookingDailyRollup, Center, IdempotencyKey, ImageJob, ImageUpload, Payment,
+    PaymentEvent, PickupSlot, WasteType
+)
+from .rollups import apply_deltas, rebuild
+from .serializers import BookingSerializer, ImageUploadSerializer
+from .routing import distance_matrix, nearest_neighbor_trips, plan_routes, route_length
+from .slots import SlotUnavailable, reserve_slot
+from .stub_gateway import StubGateway
+from .uploads import partial_path
+from .spatial import (
+    CenterIndex, bounding_box_filter, center_coordinates, center_index,
+    haversine_km, nearest_for_points, rows_to_arrays
+)
+from .views import NearestCenterView
+from .webhooks import process_batch
+
+
+def make_center(name, latitude, longitude):
+    return Center.objects.create(
+        name=name, address=f'{name} address',
+        latitude=Decimal(str(latitude)), longitude=Decimal(str(longitude)),
+    )
+
+
+def make_user(email='user@example.com'):
+    return get_user_model().objects.create_user(email=email, password='pass12345', name='Test')
+
+
+def make_booking(user, waste_type, center=None, **fields):
+    fields.setdefault('quantity_kg', Decimal('5.00'))
+    fields.setdefault('pickup_date', date(2026, 1, 15))
+    fields.setdefault('pickup_time', time(10, 0))
+    fields.setdefault('address', '12 Test Street')
+    return Booking.objects.create(
+        user=user, waste_type=waste_type, selected_center=center, **fields
+    )
+
+
+class CenterIndexTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(42)
+        self.rows = [
+            (pk, round(rng.uniform(8, 30), 6), round(rng.uniform(70, 90), 6))
+            for pk in range(1, 501)
+        ]
+        self.index = CenterIndex(ttl=0)
+        self.index.build(self.rows)
+
+    def brute_force(self, lat, lon, rows):
+        haversine = NearestCenterView().haversine
+        return sorted((haversine(lat, lon, rlat, rlon), pk) for pk, rlat, rlon in rows)
+
+    def test_cold_index_returns_none(self):
+        self.assertIsNone(CenterIndex().nearest(12.9, 77.6))
+
+    def test_matches_full_scan(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            lat, lon = rng.uniform(5, 35), rng.uniform(65, 95)
+            expected = self.brute_force(lat, lon, self.rows)[:5]
+            result = self.index.nearest(lat, lon, k=5)
+            self.assertEqual([pk for pk, _ in result], [pk for _, pk in expected])
+            for (_, distance), (expected_distance, _) in zip(result, expected):
+                self.assertAlmostEqual(distance, expected_distance, places=6)
+
+    def test_incremental_updates(self):
+        self.index.upsert(1000, 12.0, 77.0)
+        self.assertEqual(self.index.nearest(12.0, 77.0)[0][0], 1000)
+
+        self.index.upsert(1000, 29.0, 89.0)
+        self.assertEqual(self.index.nearest(29.0, 89.0)[0][0], 1000)
+        self.assertNotEqual(self.index.nearest(12.0, 77.0)[0][0], 1000)
+
+        self.index.remove(1000)
+        self.assertNotIn(1000, [pk for pk, _ in self.index.nearest(29.0, 89.0, k=10)])
+
+    def test_compaction_keeps_results(self):
+        rows = self.rows[100:]
+        for pk, _, _ in self.rows[:100]:
+            self.index.remove(pk)
+        lat, lon = 20.0, 80.0
+        expected = [pk for _, pk in self.brute_force(lat, lon, rows)[:3]]
+        self.assertEqual([pk for pk, _ in self.index.nearest(lat, lon, k=3)], expected)
+
+    def test_build_from_rows_loaded_before_a_change_is_dropped(self):
+        for change in (self.index.invalidate, lambda: self.index.upsert(1000, 12.0, 77.0)):
+            with self.subTest(change=change):
+                generation = self.index.generation
+                change()
+                self.assertFalse(self.index.build(self.rows, generation))
+        self.assertTrue(self.index.build(self.rows, self.index.generation))
+        self.assertTrue(self.index.is_warm)
+
+
+class NearestCenterViewTests(APITestCase):
+    url = '/api/waste/centers/nearest/'
+
+    def setUp(self):
+        center_index.invalidate()
+        self.addCleanup(center_index.invalidate)
+        self.near = make_center('Indiranagar', 12.9784, 77.6408)
+        self.far = make_center('Mysuru', 12.2958, 76.6394)
+
+    def test_cold_then_warm_lookup(self):
+        response = self.client.post(self.url, {'latitude': 12.97, 'longitude': 77.59}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['center']['id'], self.near.id)
+        self.assertTrue(center_index.is_warm)
+
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, {'latitude': 12.3, 'longitude': 76.6}, format='json')
+        self.assertEqual(response.data['center']['id'], self.far.id)
+
+    def test_saved_center_is_indexed(self):
+        self.client.post(self.url, {'latitude': 12.97, 'longitude': 77.59}, format='json')
+        with self.captureOnCommitCallbacks() as callbacks:
+            closer = make_center('MG Road', 12.9756, 77.6066)
+        # Uncommitted rows stay out of the index
+        response = self.client.post(self.url, {'latitude': 12.9756, 'longitude': 77.6066}, format='json')
+        self.assertNotEqual(response.data['center']['id'], closer.id)
+
+        for callback in callbacks:
+            callback()
+        response = self.client.post(self.url, {'latitude': 12.9756, 'longitude': 77.6066}, format='json')
+        self.assertEqual(response.data['center']['id'], closer.id)
+        self.assertEqual(response.data['distance_km'], 0)
+
+    def test_no_centers(self):
+        Center.objects.all().delete()
+        response = self.client.post(self.url, {'latitude': 12.97, 'longitude': 77.59}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_coordinates(self):
+        response = self.client.post(self.url, {'latitude': 'north', 'longitude': 77.59}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_finite_and_out_of_range_coordinates(self):
+        points = [
+            {'latitude': 'nan', 'longitude': 77.59},
+            {'latitude': 12.97, 'longitude': 'inf'},
+            {'latitude': 91, 'longitude': 77.59},
+            {'latitude': 12.97, 'longitude': -180.5},
+        ]
+        # Rejected both before and after the index is warm
+        for warm in (False, True):
+            if warm:
+                self.client.post(self.url, {'latitude': 12.97, 'longitude': 77.59}, format='json')
+                self.assertTrue(center_index.is_warm)
+            for point in points:
+                with self.subTest(point=point, warm=warm):
+                    response = self.client.post(self.url, point, format='json')
+                    self.assertEqual(response.status_code, 400)
+
+
+class CenterSearchViewTests(APITestCase):
+    url = '/api/waste/centers/search/'
+
+    def setUp(self):
+        center_coordinates.invalidate()
+        self.addCleanup(center_coordinates.invalidate)
+        self.centers = [
+            make_center('Indiranagar', 12.9784, 77.6408),
+            make_center('MG Road', 12.9756, 77.6066),
+            make_center('Whitefield', 12.9698, 77.7500),
+            make_center('Mysuru', 12.2958, 76.6394),
+        ]
+
+    def search(self, **params):
+        return self.client.get(self.url, {'latitude': 12.9756, 'longitude': 77.6066, **params})
+
+    def test_k_nearest_ranked(self):
+        response = self.search(k=3)
+        self.assertEqual(response.status_code, 200)
+        names = [r['center']['name'] for r in response.data['results']]
+        self.assertEqual(names, ['MG Road', 'Indiranagar', 'Whitefield'])
+        distances = [r['distance_km'] for r in response.data['results']]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_radius(self):
+        response = self.search(radius_km=20)
+        self.assertEqual(response.data['count'], 3)
+        response = self.search(radius_km=20, k=1)
+        self.assertEqual([r['center']['name'] for r in response.data['results']], ['MG Road'])
+
+    def test_results_are_bounded(self):
+        Center.objects.bulk_create(
+            Center(name=f'Depot {i}', address='Somewhere', latitude=12.9756, longitude=77.6066)
+            for i in range(12)
+        )
+        response = self.search(radius_km=1000)
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual(self.search(k=101).status_code, 400)
+        self.assertEqual(self.search(radius_km=1e9).status_code, 400)
+
+    def test_cached_coordinates_follow_saves(self):
+        self.search(k=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_center('Same spot', 12.9756, 77.6066)
+        with self.assertNumQueries(2):
+            self.search(k=2)
+
+    def test_requires_coordinates(self):
+        self.assertEqual(self.client.get(self.url, {'latitude': 12.9}).status_code, 400)
+
+
+class NearestCenterBatchViewTests(APITestCase):
+    url = '/api/waste/centers/nearest/batch/'
+
+    def setUp(self):
+        center_coordinates.invalidate()
+        self.addCleanup(center_coordinates.invalidate)
+        self.near = make_center('Indiranagar', 12.9784, 77.6408)
+        self.far = make_center('Mysuru', 12.2958, 76.6394)
+
+    def post(self, points):
+        return self.client.post(self.url, {'points': points}, format='json')
+
+    def test_resolves_each_point_in_order(self):
+        points = [
+            {'latitude': 12.3, 'longitude': 76.6},
+            {'latitude': 12.97, 'longitude': 77.64},
+            {'latitude': 12.31, 'longitude': 76.61},
+        ]
+        response = self.post(points)
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body['count'], 3)
+        self.assertEqual([r['index'] for r in body['results']], [0, 1, 2])
+        self.assertEqual(
+            [r['center']['id'] for r in body['results']],
+            [self.far.id, self.near.id, self.far.id]
+        )
+        view = NearestCenterView()
+        self.assertAlmostEqual(
+            body['results'][1]['distance_km'],
+            view.haversine(12.97, 77.64, self.near.latitude, self.near.longitude),
+            places=2
+        )
+
+    def test_chunked_matrix_matches_single_pass(self):
+        rng = random.Random(11)
+        arrays = rows_to_arrays([(pk, rng.uniform(-60, 60), rng.uniform(-180, 180)) for pk in range(40)])
+        points = np.array([(rng.uniform(-60, 60), rng.uniform(-180, 180)) for _ in range(25)])
+        whole = list(nearest_for_points(points, arrays))
+        chunked = list(nearest_for_points(points, arrays, max_cells=100))
+        self.assertEqual(len(whole), 1)
+        self.assertEqual(len(chunked), 13)
+        self.assertEqual(
+            whole[0][0].tolist(), [pk for ids, _ in chunked for pk in ids.tolist()]
+        )
+
+    def test_coordinates_loaded_across_invalidate_are_not_kept(self):
+        load = spatial.rows_to_arrays
+
+        def invalidated_while_loading(rows):
+            center_coordinates.invalidate()
+            return load(rows)
+
+        with mock.patch.object(spatial, 'rows_to_arrays', side_effect=invalidated_while_loading):
+            ids, _, _ = center_coordinates.get()
+        self.assertEqual(sorted(ids.tolist()), [self.near.id, self.far.id])
+        with self.assertNumQueries(1):
+            center_coordinates.get()
+        with self.assertNumQueries(0):
+            center_coordinates.get()
+
+    @override_settings(NEAREST_BATCH_MAX_POINTS=2)
+    def test_cap(self):
+        response = self.post([{'latitude': 1, 'longitude': 1}] * 3)
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_points(self):
+        self.assertEqual(self.post([{'latitude': 1}]).status_code, 400)
+        self.assertEqual(self.post([{'latitude': 91, 'longitude': 0}]).status_code, 400)
+        self.assertEqual(self.post([]).status_code, 400)
+
+    def test_non_finite_points(self):
+        for value in ('nan', 'NaN', 'inf', '-Infinity'):
+            with self.subTest(value=value):
+                response = self.post([{'latitude': value, 'longitude': 77.6}])
+                self.assertEqual(response.status_code, 400)
+                response = self.post([{'latitude': 12.9, 'longitude': value}])
+                self.assertEqual(response.status_code, 400)
+
+
+class BoundingBoxTests(TestCase):
+    def test_prefilter_keeps_every_center_in_radius(self):
+        rng = random.Random(3)
+        for i in range(300):
+            make_center(f'c{i}', round(rng.uniform(-89, 89), 6), round(rng.uniform(-180, 180), 6))
+        rows = list(Center.objects.values_list('id', 'latitude', 'longitude'))
+        for lat, lon, radius in [(0, 179.5, 3000), (0, -179.5, 3000), (85, 10, 1500), (40, 0, 5000)]:
+            inside = {
+                pk for pk, rlat, rlon in rows
+                if haversine_km(lat, lon, float(rlat), float(rlon)) <= radius
+            }
+            boxed = set(
+                Center.objects.filter(bounding_box_filter(lat, lon, radius)).values_list('id', flat=True)
+            )
+            self.assertTrue(inside <= boxed)
+            self.assertLess(len(boxed), len(rows))
+
+
+class QueryCountTests(APITestCase):
+    """List and detail endpoints must issue a constant number of queries."""
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+
+    def add_rows(self, count):
+        # Waste type names are unique, so continue the numbering across calls
+        start = WasteType.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(start, start + count):
+                waste_type = WasteType.objects.create(name=f'Type {i}', price_per_kg=Decimal('10.00'))
+                center = make_center(f'Center {i}', 12 + i / 100, 77 + i / 100)
+                booking = make_booking(self.user, waste_type, center)
+                Payment.objects.create(
+                    booking=booking, amount=booking.total_price,
+                    razorpay_order_id=f'order_{booking.id}'
+                )
+
+    def count_queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 300, response.content)
+        return len(queries)
+
+    def assertConstantQueries(self, method, url_factory, data_factory=lambda: None):
+        self.add_rows(1)
+        small = self.count_queries(method, url_factory(), data_factory())
+        self.add_rows(10)
+        large = self.count_queries(method, url_factory(), data_factory())
+        self.assertEqual(small, large, f'{url_factory()} query count grows with rows')
+
+    def test_waste_types(self):
+        self.assertConstantQueries('get', lambda: '/api/waste/types/')
+
+    def test_centers(self):
+        self.assertConstantQueries('get', lambda: '/api/waste/centers/')
+
+    def test_booking_history(self):
+        self.assertConstantQueries('get', lambda: '/api/waste/booking/history/')
+
+    def test_booking_detail(self):
+        self.assertConstantQueries(
+            'get', lambda: f'/api/waste/booking/{Booking.objects.latest("id").id}/'
+        )
+
+    def test_payment_create_existing(self):
+        self.assertConstantQueries(
+            'post', lambda: '/api/waste/payment/create/',
+            lambda: {'booking_id': Booking.objects.latest('id').id}
+        )
+
+    def test_payment_verify(self):
+        self.assertConstantQueries(
+            'post', lambda: '/api/waste/payment/verify/',
+            lambda: {'razorpay_order_id': f'order_{Booking.objects.latest("id").id}'}
+        )
+
+
+SEQUENTIAL_SCAN = re.compile(r'(?:Seq Scan on|\bSCAN) (waste_booking|waste_payment)\b(?! USING)')
+
+
+def query_plan(sql):
+    """Return the textual plan of ``sql`` on the test database."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # On a small seeded table the planner would rightly prefer a scan;
+            # disabling it makes a missing index show up as a forced Seq Scan
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+@override_settings(PICKUP_SLOT_DEFAULT_CAPACITY=1000)
+class QueryPlanTests(APITestCase):
+    """Every Booking and Payment query an endpoint issues must use an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(3)
+        users = [make_user(f'user{i}@example.com') for i in range(20)]
+        waste_types = [
+            WasteType.objects.create(name=f'Type {i}', price_per_kg=Decimal('10.00')) for i in range(4)
+        ]
+        cls.center = make_center('Indiranagar', 12.9784, 77.6408)
+        Booking.objects.bulk_create(
+            Booking(
+                user=rng.choice(users), waste_type=rng.choice(waste_types),
+                selected_center=cls.center, quantity_kg=Decimal('3.00'),
+                pickup_date=date(2026, 1, rng.randint(1, 28)), pickup_time=time(10, 0),
+                address='x', latitude=Decimal('12.97'), longitude=Decimal('77.64'),
+                status=rng.choice(['pending', 'completed', 'cancelled']),
+                payment_status=rng.choice(['pending', 'paid']), total_price=Decimal('30.00'),
+            )
+            for _ in range(500)
+        )
+        Payment.objects.bulk_create(
+            Payment(booking=booking, amount=booking.total_price, razorpay_order_id=f'order_{booking.id}')
+            for booking in Booking.objects.filter(payment_status='paid')
+        )
+        cls.user = users[0]
+        cls.booking = make_booking(cls.user, waste_types[0], cls.center)
+        cls.staff = get_user_model().objects.create_user(email='staff@example.com', password='x', is_staff=True)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertIndexedQueries(self, method, url, data=None, user=None):
+        self.client.force_authenticate(user or self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 300, response.content)
+
+        checked = 0
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            if 'waste_booking' not in sql and 'waste_payment' not in sql:
+                continue
+            plan = query_plan(sql)
+            self.assertIsNone(SEQUENTIAL_SCAN.search(plan), f'{url}: {sql}\n{plan}')
+            checked += 1
+        self.assertTrue(checked, f'{url} issued no Booking or Payment queries')
+
+    def test_booking_history(self):
+        self.assertIndexedQueries('get', '/api/waste/booking/history/')
+
+    def test_booking_detail(self):
+        self.assertIndexedQueries('get', f'/api/waste/booking/{self.booking.id}/')
+
+    def test_booking_create(self):
+        self.assertIndexedQueries('post', '/api/waste/booking/create/', {
+            'waste_type_id': self.booking.waste_type_id, 'selected_center_id': self.center.id,
+            'quantity_kg': '2.00', 'pickup_date': '2026-01-20', 'pickup_time': '10:00',
+            'address': '1 Road',
+        })
+
+    def test_booking_cancel(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.booking.status = 'cancelled'
+            self.booking.save()
+        for query in queries:
+            if query['sql'].startswith(('SELECT', 'UPDATE')):
+                self.assertIsNone(SEQUENTIAL_SCAN.search(query_plan(query['sql'])), query['sql'])
+
+    def test_payment_create_and_verify(self):
+        self.assertIndexedQueries('post', '/api/waste/payment/create/', {'booking_id': self.booking.id})
+        order_id = Payment.objects.get(booking=self.booking).razorpay_order_id
+        self.assertIndexedQueries('post', '/api/waste/payment/verify/', {'razorpay_order_id': order_id})
+
+    def test_route_plan(self):
+        self.assertIndexedQueries(
+            'get', '/api/waste/routes/', {'center': self.center.id, 'date': '2026-01-15'}, user=self.staff
+        )
+
+
+class BookingHistoryPaginationTests(APITestCase):
+    url = '/api/waste/booking/history/'
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        self.waste_type = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        self.center = make_center('Indiranagar', 12.9784, 77.6408)
+        self.bookings = [make_booking(self.user, self.waste_type, self.center) for _ in range(25)]
+        make_booking(make_user('other@example.com'), self.waste_type)
+
+    def test_cursor_pages_cover_history_once(self):
+        seen = []
+        url = self.url + '?page_size=10'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 10)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, sorted((b.id for b in self.bookings), reverse=True))
+
+    def test_flat_summary(self):
+        response = self.client.get(self.url, {'fields': 'id,waste_type,total_price,status', 'expand': ''})
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'id', 'waste_type', 'total_price', 'status'})
+        self.assertEqual(row['waste_type'], self.waste_type.id)
+
+    def test_partial_expand(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'expand': 'waste_type'})
+        row = response.data['results'][0]
+        self.assertEqual(row['waste_type']['name'], 'Plastic')
+        self.assertEqual(row['selected_center'], self.center.id)
+        self.assertEqual(row['user'], self.user.id)
+        self.assertNotIn('waste_center', queries[-1]['sql'])
+
+    def test_detail_supports_field_selection(self):
+        response = self.client.get(f'/api/waste/booking/{self.bookings[0].id}/', {'fields': 'id,status'})
+        self.assertEqual(response.data, {'id': self.bookings[0].id, 'status': 'pending'})
+
+    def test_unknown_fields_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'fields': 'id,password'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'expand': 'payment'}).status_code, 400)
+
+
+    def test_summary_covers_every_page(self):
+        Booking.objects.filter(pk__in=[b.pk for b in self.bookings[:3]]).update(status='completed')
+        Booking.objects.filter(pk=self.bookings[0].pk).update(payment_status='paid')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/waste/booking/summary/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'total': 25, 'active': 22, 'completed': 3, 'total_spent': '62.50',
+        })
+
+
+class CatalogCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        make_center('Indiranagar', 12.9784, 77.6408)
+
+    def test_cached_body_and_conditional_get(self):
+        for url in ('/api/waste/types/', '/api/waste/centers/'):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(len(first.json()), 1)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(second.content, first.content)
+
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_saves_invalidate(self):
+        etag = self.client.get('/api/waste/types/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            waste_type = WasteType.objects.create(name='Glass', price_per_kg=Decimal('3.00'))
+        response = self.client.get('/api/waste/types/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            waste_type.delete()
+        response = self.client.get('/api/waste/types/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(response.json()), 1)
+
+        etag = self.client.get('/api/waste/centers/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            make_center('Mysuru', 12.2958, 76.6394)
+        response = self.client.get('/api/waste/centers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(response.json()), 2)
+
+    @override_settings(CATALOG_CACHE_TIMEOUT=0)
+    def test_version_outlives_the_bodies(self):
+        first = self.client.get('/api/waste/types/')
+        # A zero timeout drops each body at once; the ETag must not move with it
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/waste/types/')
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_version_changes_when_the_save_commits(self):
+        version = catalog_version(WASTE_TYPES)
+        with self.captureOnCommitCallbacks() as callbacks:
+            WasteType.objects.create(name='Glass', price_per_kg=Decimal('3.00'))
+            # Until the commit, other requests still read the old rows
+            self.assertEqual(catalog_version(WASTE_TYPES), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(catalog_version(WASTE_TYPES), version)
+
+
+class PricingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.plastic = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        self.glass = WasteType.objects.create(name='Glass', price_per_kg=Decimal('3.33'))
+        self.user = make_user()
+
+    def test_booking_save_prices_from_loaded_waste_type(self):
+        booking = Booking(
+            user=self.user, waste_type=self.glass, quantity_kg=Decimal('2.50'),
+            pickup_date=date(2026, 1, 15), pickup_time=time(10, 0), address='x'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            booking.save()
+        self.assertFalse([q for q in queries if 'waste_wastetype' in q['sql']])
+        self.assertEqual(booking.unit_price, Decimal('3.33'))
+        self.assertEqual(booking.total_price, Decimal('8.33'))
+
+    def test_price_change_elsewhere_is_charged(self):
+        self.client.force_authenticate(self.user)
+        item = {'waste_type_id': self.plastic.id, 'quantity_kg': '2.00'}
+        self.client.post('/api/waste/pricing/quote/', {'items': [item]}, format='json')
+        # As another worker would, without this process hearing about it
+        WasteType.objects.filter(pk=self.plastic.pk).update(price_per_kg=Decimal('15.00'))
+
+        response = self.client.post('/api/waste/pricing/quote/', {'items': [item]}, format='json')
+        self.assertEqual(response.data['total_price'], '30.00')
+        booking = dict(item, pickup_date='2026-02-01', pickup_time='09:30', address='1 Road')
+        response = self.client.post('/api/waste/booking/create/', booking, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['total_price'], '30.00')
+        response = self.client.post(
+            '/api/waste/booking/bulk_create/', {'bookings': [booking]}, format='json'
+        )
+        self.assertEqual(response.data['created'][0]['total_price'], '30.00')
+        booking = Booking(
+            user=self.user, waste_type_id=self.plastic.id, quantity_kg=Decimal('1.00'),
+            pickup_date=date(2026, 1, 15), pickup_time=time(10, 0), address='x'
+        )
+        booking.save()
+        self.assertEqual(booking.unit_price, Decimal('15.00'))
+
+    def test_batch_quote(self):
+        items = [
+            {'waste_type_id': self.plastic.id, 'quantity_kg': '2.00'},
+            {'waste_type_id': self.glass.id, 'quantity_kg': '10'},
+        ] * 10
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/waste/pricing/quote/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['total_price'] for item in response.data['items'][:2]], ['25.00', '33.30']
+        )
+        self.assertEqual(response.data['total_price'], '583.00')
+
+    def test_unknown_waste_type(self):
+        response = self.client.post(
+            '/api/waste/pricing/quote/',
+            {'items': [{'waste_type_id': 999, 'quantity_kg': '1'}]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PICKUP_SLOT_DEFAULT_CAPACITY=100)
+class BookingBulkCreateTests(APITestCase):
+    url = '/api/waste/booking/bulk_create/'
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        self.plastic = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        self.center = make_center('Indiranagar', 12.9784, 77.6408)
+
+    def item(self, **fields):
+        return {
+            'waste_type_id': self.plastic.id, 'selected_center_id': self.center.id,
+            'quantity_kg': '4.00', 'pickup_date': '2026-02-01', 'pickup_time': '09:30',
+            'address': '1 Society Road', **fields
+        }
+
+    def test_creates_batch_with_constant_queries(self):
+        self.client.post(self.url, {'bookings': [self.item()]}, format='json')
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, {'bookings': [self.item()] * 2}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(self.url, {'bookings': [self.item()] * 20}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(response.data['created']), 20)
+        self.assertEqual(response.data['created'][0]['total_price'], '50.00')
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 23)
+
+    def test_invalid_item_rejects_batch(self):
+        response = self.client.post(
+            self.url, {'bookings': [self.item(), self.item(waste_type_id=999)]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_partial_creates_valid_items(self):
+        response = self.client.post(
+            self.url,
+            {'bookings': [self.item(), self.item(quantity_kg='0'), self.item()], 'partial': True},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 2)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1])
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_ids_must_be_integers(self):
+        for value in (self.plastic.id + 0.7, float(self.plastic.id), True, f'{self.plastic.id}.0', '²'):
+            with self.subTest(value=value):
+                response = self.client.post(
+                    self.url, {'bookings': [self.item(waste_type_id=value)]}, format='json'
+                )
+                self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            self.url, {'bookings': [self.item(waste_type_id=str(self.plastic.id))]}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Booking.objects.get().waste_type, self.plastic)
+
+    @override_settings(BOOKING_BULK_MAX_ITEMS=2)
+    def test_cap(self):
+        response = self.client.post(self.url, {'bookings': [self.item()] * 3}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PICKUP_SLOT_DEFAULT_CAPACITY=2)
+class PickupSlotTests(APITestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        self.plastic = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        self.center = make_center('Indiranagar', 12.9784, 77.6408)
+
+    def book(self, **fields):
+        data = {
+            'waste_type_id': self.plastic.id, 'selected_center_id': self.center.id,
+            'quantity_kg': '4.00', 'pickup_date': '2026-02-01', 'pickup_time': '09:30:00',
+            'address': '1 Society Road', **fields
+        }
+        return self.client.post('/api/waste/booking/create/', data, format='json')
+
+    def slot(self):
+        return PickupSlot.objects.get(center=self.center, date=date(2026, 2, 1), time=time(9, 30))
+
+    def test_create_reserves_until_full(self):
+        self.assertEqual(self.book().status_code, 201)
+        self.assertEqual(self.book().status_code, 201)
+        response = self.book()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pickup_time', response.data)
+        self.assertEqual(self.slot().reserved, 2)
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertEqual(self.book(pickup_time='10:00:00').status_code, 201)
+
+    def test_configured_capacity(self):
+        PickupSlot.objects.create(center=self.center, date=date(2026, 2, 1), time=time(9, 30), capacity=5)
+        for _ in range(5):
+            reserve_slot(self.center.id, date(2026, 2, 1), time(9, 30))
+        with self.assertRaises(SlotUnavailable):
+            reserve_slot(self.center.id, date(2026, 2, 1), time(9, 30))
+
+    def test_concurrent_first_use(self):
+        day, slot_time = date(2026, 2, 1), time(9, 30)
+
+        def created_elsewhere():
+            # Another request creates the slot between the UPDATE and the INSERT
+            PickupSlot.objects.create(
+                center=self.center, date=day, time=slot_time, capacity=10, reserved=1
+            )
+            return 10
+
+        with mock.patch('waste.slots.default_capacity', side_effect=created_elsewhere):
+            reserve_slot(self.center.id, day, slot_time)
+        self.assertEqual(self.slot().reserved, 2)
+
+    def test_cancel_and_delete_release(self):
+        self.book()
+        self.book()
+        booking = Booking.objects.first()
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertEqual(self.slot().reserved, 1)
+        booking.save()
+        self.assertEqual(self.slot().reserved, 1)
+        Booking.objects.exclude(pk=booking.pk).get().delete()
+        self.assertEqual(self.slot().reserved, 0)
+
+    def test_rescheduling_moves_the_reservation(self):
+        self.book()
+        booking = Booking.objects.get()
+        other_center = make_center('Whitefield', 12.9698, 77.7500)
+
+        def reserved():
+            return {
+                (slot.center_id, slot.date, slot.time): slot.reserved
+                for slot in PickupSlot.objects.filter(reserved__gt=0)
+            }
+
+        booking.pickup_time = time(11, 0)
+        booking.save()
+        self.assertEqual(reserved(), {(self.center.id, date(2026, 2, 1), time(11, 0)): 1})
+        booking.pickup_date = date(2026, 2, 2)
+        booking.selected_center = other_center
+        booking.save()
+        self.assertEqual(reserved(), {(other_center.id, date(2026, 2, 2), time(11, 0)): 1})
+
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertEqual(reserved(), {})
+        booking.status = 'pending'
+        booking.save()
+        self.assertEqual(reserved(), {(other_center.id, date(2026, 2, 2), time(11, 0)): 1})
+
+    def test_moving_to_a_full_slot_changes_nothing(self):
+        self.book()
+        booking = Booking.objects.get()
+        PickupSlot.objects.create(
+            center=self.center, date=date(2026, 2, 1), time=time(11, 0), capacity=1, reserved=1
+        )
+        booking.pickup_time = time(11, 0)
+        with self.assertRaises(SlotUnavailable):
+            booking.save()
+        self.assertEqual(Booking.objects.get().pickup_time, time(9, 30))
+        self.assertEqual(self.slot().reserved, 1)
+
+    def test_bulk_create_reserves_per_slot(self):
+        item = {
+            'waste_type_id': self.plastic.id, 'selected_center_id': self.center.id,
+            'quantity_kg': '1', 'pickup_date': '2026-02-01', 'address': 'x'
+        }
+        bookings = [
+            {**item, 'pickup_time': '09:30'}, {**item, 'pickup_time': '11:00'},
+            {**item, 'pickup_time': '11:00'}, {**item, 'pickup_time': '11:00'},
+        ]
+        response = self.client.post('/api/waste/booking/bulk_create/', {'bookings': bookings}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1, 2, 3])
+        self.assertFalse(PickupSlot.objects.exists())
+
+        response = self.client.post(
+            '/api/waste/booking/bulk_create/', {'bookings': bookings, 'partial': True}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 1)
+        self.assertEqual(self.slot().reserved, 1)
+
+    def test_availability(self):
+        self.book()
+        self.book(pickup_date='2026-02-03')
+        response = self.client.get(
+            '/api/waste/slots/availability/',
+            {'center': self.center.id, 'start': '2026-02-01', 'end': '2026-02-02'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['default_capacity'], 2)
+        self.assertEqual(len(response.data['slots']), 1)
+        self.assertEqual(response.data['slots'][0]['available'], 1)
+
+        response = self.client.get(
+            '/api/waste/slots/availability/',
+            {'center': self.center.id, 'start': '2026-02-03', 'end': '2026-01-01'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class RoutePlanningTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(5)
+        self.depot = (12.97, 77.59)
+        self.stops = [
+            (pk, 12.97 + rng.uniform(-0.1, 0.1), 77.59 + rng.uniform(-0.1, 0.1), rng.uniform(5, 40))
+            for pk in range(1, 61)
+        ]
+
+    def test_visits_every_stop_once_and_improves_seed(self):
+        plan = plan_routes(self.depot, self.stops)
+        visited = [pk for trip in plan.trips for pk in trip.booking_ids]
+        self.assertEqual(sorted(visited), list(range(1, 61)))
+
+        matrix = distance_matrix(
+            [self.depot[0]] + [s[1] for s in self.stops], [self.depot[1]] + [s[2] for s in self.stops]
+        )
+        demands = np.array([0.0] + [s[3] for s in self.stops])
+        seed = sum(route_length(r, matrix) for r in nearest_neighbor_trips(matrix, demands))
+        self.assertLessEqual(plan.distance_km, seed)
+
+    def test_capacity(self):
+        plan = plan_routes(self.depot, self.stops + [(99, 12.9, 77.5, 500)], capacity_kg=100)
+        self.assertGreater(len(plan.trips), 1)
+        for trip in plan.trips:
+            self.assertTrue(trip.load_kg <= 100 or trip.booking_ids == [99])
+
+    def test_unrouted(self):
+        plan = plan_routes(self.depot, [(1, None, None, 5), (2, 12.9, 77.5, 5)])
+        self.assertEqual(plan.unrouted, [1])
+        self.assertEqual(plan.trips[0].booking_ids, [2])
+
+
+class RoutePlanViewTests(APITestCase):
+    url = '/api/waste/routes/'
+
+    def setUp(self):
+        self.center = make_center('Indiranagar', 12.9784, 77.6408)
+        waste_type = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        user = make_user()
+        for lat, lon in [(12.98, 77.65), (12.99, 77.66), (12.97, 77.63)]:
+            make_booking(user, waste_type, self.center, latitude=Decimal(str(lat)), longitude=Decimal(str(lon)))
+        make_booking(user, waste_type, self.center, status='cancelled')
+        self.staff = get_user_model().objects.create_user(email='staff@example.com', password='x', is_staff=True)
+
+    def test_requires_staff(self):
+        self.client.force_authenticate(make_user('collector@example.com'))
+        response = self.client.get(self.url, {'center': self.center.id, 'date': '2026-01-15'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_plan(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(
+            self.url, {'center': self.center.id, 'date': '2026-01-15', 'capacity_kg': '10'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['trips']), 2)
+        self.assertEqual(sum(len(t['booking_ids']) for t in response.data['trips']), 3)
+
+
+def make_jpeg(size=(3000, 2000), exif=True):
+    image = Image.new('RGB', size, (120, 200, 80))
+    buffer = BytesIO()
+    if exif:
+        data = Image.Exif()
+        data[0x010F] = 'PhoneMaker'  # Make
+        data[0x0112] = 6  # Orientation: rotate 90 degrees
+        image.save(buffer, format='JPEG', exif=data)
+    else:
+        image.save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class ImageProcessingTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media_root, IMAGE_WORKER_THREADS=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        self.waste_type = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+
+    def create_booking(self):
+        return self.client.post('/api/waste/booking/create/', {
+            'waste_type_id': self.waste_type.id, 'quantity_kg': '3', 'pickup_date': '2026-02-01',
+            'pickup_time': '09:30', 'address': 'x',
+            'waste_image': SimpleUploadedFile('photo.jpeg', make_jpeg(), content_type='image/jpeg'),
+        }, format='multipart')
+
+    def test_upload_queues_job_and_worker_processes_it(self):
+        response = self.create_booking()
+        self.assertEqual(response.status_code, 201)
+        booking = Booking.objects.get()
+        self.assertFalse(booking.waste_image_thumbnail)
+        self.assertEqual(len(pending_job_ids(10)), 1)
+
+        self.assertTrue(run_job(pending_job_ids(10)[0]))
+        self.assertFalse(run_job(ImageJob.objects.get().pk))
+        self.assertEqual(ImageJob.objects.get().status, 'done')
+
+        booking.refresh_from_db()
+        with Image.open(booking.waste_image.path) as original:
+            self.assertEqual(original.size, (1067, 1600))  # rotated by EXIF, then bounded
+            self.assertNotIn(0x010F, original.getexif())
+        with Image.open(booking.waste_image_thumbnail.path) as thumbnail:
+            self.assertLessEqual(max(thumbnail.size), 320)
+
+        data = self.client.get(f'/api/waste/booking/{booking.id}/').data
+        self.assertIn('thumbnails', data['waste_image'])
+        self.assertNotIn('thumbnails', data['waste_image_original'])
+
+    def test_failed_job_is_retried_then_failed(self):
+        self.create_booking()
+        booking = Booking.objects.get()
+        booking.waste_image.storage.delete(booking.waste_image.name)
+        job = ImageJob.objects.get()
+        with override_settings(IMAGE_JOB_MAX_ATTEMPTS=2), self.assertLogs('waste.imaging', 'ERROR'):
+            run_job(job.pk)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('pending', 1))
+            run_job(job.pk)
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'failed')
+
+
+class ChunkedUploadTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media_root, IMAGE_WORKER_THREADS=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        waste_type = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        self.booking = make_booking(self.user, waste_type)
+        self.content = make_jpeg(size=(400, 300))
+
+    def start(self, content):
+        response = self.client.post('/api/waste/uploads/', {'filename': 'pic.jpg', 'size': len(content)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return f"/api/waste/uploads/{response.data['id']}/"
+
+    def put(self, url, offset, chunk):
+        return self.client.put(f'{url}?offset={offset}', chunk, content_type='application/octet-stream')
+
+    def upload(self, content, chunk_size=1000):
+        url = self.start(content)
+        for offset in range(0, len(content), chunk_size):
+            response = self.put(url, offset, content[offset:offset + chunk_size])
+            self.assertEqual(response.status_code, 200)
+        return url
+
+    def test_chunked_upload_attaches_image(self):
+        url = self.upload(self.content)
+        self.assertEqual(self.client.get(url).data['received'], len(self.content))
+        response = self.client.post(url + 'complete/', {
+            'sha256': hashlib.sha256(self.content).hexdigest(), 'booking_id': self.booking.id
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'complete')
+
+        self.booking.refresh_from_db()
+        with self.booking.waste_image.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertEqual(ImageJob.objects.filter(booking=self.booking).count(), 1)
+
+    def test_offset_must_match(self):
+        url = self.start(self.content)
+        self.assertEqual(self.put(url, 0, self.content[:500]).status_code, 200)
+        response = self.put(url, 0, self.content[:500])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['received'], 500)
+        self.assertEqual(self.put(url, 500, self.content[500:] + b'extra').status_code, 400)
+
+    def test_offset_claimed_by_a_concurrent_chunk(self):
+        url = self.start(self.content)
+        pk = url.rstrip('/').rsplit('/', 1)[1]
+        real_stage = views.stage_chunk
+
+        def stage_while_another_request_wins(upload, stream, length):
+            staged = real_stage(upload, stream, length)
+            with mock.patch.object(views, 'stage_chunk', real_stage):
+                self.assertEqual(self.put(url, 0, self.content[:500]).status_code, 200)
+            return staged
+
+        with mock.patch.object(views, 'stage_chunk', stage_while_another_request_wins):
+            response = self.put(url, 0, b'x' * 300)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['received'], 500)
+        upload = ImageUpload.objects.get(pk=pk)
+        with open(partial_path(upload), 'rb') as partial:
+            self.assertEqual(partial.read(), self.content[:500])
+        # The losing chunk's staged file is removed
+        self.assertEqual(os.listdir(os.path.dirname(partial_path(upload))), [str(upload.pk)])
+
+    def test_checksum_mismatch(self):
+        url = self.upload(self.content)
+        response = self.client.post(url + 'complete/', {
+            'sha256': hashlib.sha256(b'other').hexdigest(), 'booking_id': self.booking.id
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.booking.refresh_from_db()
+        self.assertFalse(self.booking.waste_image)
+
+    def test_other_users_upload(self):
+        url = self.start(self.content)
+        self.client.force_authenticate(make_user('other@example.com'))
+        self.assertEqual(self.put(url, 0, self.content[:10]).status_code, 404)
+
+    @override_settings(UPLOAD_MAX_BYTES=100)
+    def test_size_limit(self):
+        response = self.client.post('/api/waste/uploads/', {'filename': 'a.jpg', 'size': 101}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_purge_stale_uploads(self):
+        stale_url = self.start(self.content)
+        self.put(stale_url, 0, self.content[:500])
+        fresh_url = self.start(self.content)
+        self.put(fresh_url, 0, self.content[:500])
+        stale = ImageUpload.objects.get(pk=stale_url.rstrip('/').rsplit('/', 1)[1])
+        ImageUpload.objects.filter(pk=stale.pk).update(
+            updated_at=timezone.now() - timedelta(hours=25)
+        )
+
+        out = StringIO()
+        call_command('purge_stale_uploads', stdout=out)
+        self.assertIn('Deleted 1 stale upload(s)', out.getvalue())
+        self.assertFalse(ImageUpload.objects.filter(pk=stale.pk).exists())
+        self.assertFalse(os.path.exists(partial_path(stale)))
+        self.assertEqual(self.client.get(fresh_url).data['received'], 500)
+
+    @override_settings(UPLOAD_MAX_IN_PROGRESS=2)
+    def test_in_progress_cap(self):
+        payload = {'filename': 'a.jpg', 'size': 100}
+        first = self.client.post('/api/waste/uploads/', payload, format='json').data['id']
+        self.client.post('/api/waste/uploads/', payload, format='json')
+        response = self.client.post('/api/waste/uploads/', payload, format='json')
+        self.assertEqual(response.status_code, 429)
+
+        # Stale uploads no longer count against the cap
+        ImageUpload.objects.filter(pk=first).update(updated_at=timezone.now() - timedelta(hours=25))
+        response = self.client.post('/api/waste/uploads/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+@override_settings(PICKUP_SLOT_DEFAULT_CAPACITY=100)
+class BookingRollupTests(APITestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.plastic = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        self.paper = WasteType.objects.create(name='Paper', price_per_kg=Decimal('4.00'))
+        self.center = make_center('Indiranagar', 12.9784, 77.6408)
+
+    def snapshot(self):
+        return list(
+            BookingDailyRollup.objects.exclude(booking_count=0)
+            .order_by('day', 'center_id', 'waste_type_id', 'status')
+            .values_list(
+                'day', 'center_id', 'waste_type_id', 'status',
+                'booking_count', 'quantity_kg', 'total_price'
+            )
+        )
+
+    def assertMatchesRebuild(self):
+        maintained = self.snapshot()
+        rebuild()
+        self.assertEqual(maintained, self.snapshot())
+
+    def test_signals_match_rebuild(self):
+        first = make_booking(self.user, self.plastic, self.center)
+        second = make_booking(self.user, self.plastic, self.center, quantity_kg=Decimal('2.00'))
+        make_booking(self.user, self.paper)
+        self.assertEqual(
+            BookingDailyRollup.objects.get(waste_type=self.plastic).total_price, Decimal('87.50')
+        )
+
+        first.status = 'completed'
+        first.save()
+        second.pickup_date = date(2026, 1, 16)
+        second.save()
+        Booking.objects.get(pk=second.pk).save()  # no change, no delta
+        self.assertMatchesRebuild()
+
+        first.delete()
+        self.assertMatchesRebuild()
+
+    def test_bulk_create_is_recorded(self):
+        self.client.force_authenticate(self.user)
+        item = {
+            'waste_type_id': self.plastic.id, 'selected_center_id': self.center.id,
+            'quantity_kg': '4.00', 'pickup_date': '2026-02-01', 'pickup_time': '09:30',
+            'address': '1 Society Road',
+        }
+        response = self.client.post('/api/waste/booking/bulk_create/', {'bookings': [item] * 3}, format='json')
+        self.assertEqual(response.status_code, 201)
+        rollup = BookingDailyRollup.objects.get()
+        self.assertEqual((rollup.booking_count, rollup.total_price), (3, Decimal('150.00')))
+        self.assertMatchesRebuild()
+
+    def test_deltas_applied_in_key_order(self):
+        deltas = {
+            (date(2026, 1, 2), None, self.plastic.id, 'pending'): [1, Decimal('1'), Decimal('1')],
+            (date(2026, 1, 1), self.center.id, self.paper.id, 'pending'): [1, Decimal('1'), Decimal('1')],
+            (date(2026, 1, 1), None, self.paper.id, 'pending'): [1, Decimal('1'), Decimal('1')],
+        }
+        apply_deltas(deltas)
+        self.assertEqual(
+            list(BookingDailyRollup.objects.order_by('id').values_list('day', 'center_id')),
+            [(date(2026, 1, 1), None), (date(2026, 1, 1), self.center.id), (date(2026, 1, 2), None)],
+        )
+
+    def test_analytics_requires_staff(self):
+        make_booking(self.user, self.plastic, self.center)
+        make_booking(self.user, self.paper, self.center)
+        url = '/api/waste/analytics/daily/?start=2026-01-01&end=2026-01-31'
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['totals']['booking_count'], 2)
+        self.assertEqual(response.data['totals']['total_price'], '82.50')
+
+        response = self.client.get(url + f'&waste_type={self.paper.id}')
+        self.assertEqual(response.data['totals']['total_price'], '20.00')
+        self.assertEqual(self.client.get(url.replace('2026-01-31', '2025-12-01')).status_code, 400)
+
+
+class PaymentIdempotencyTests(APITestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        waste_type = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        self.booking = make_booking(self.user, waste_type)
+
+    def post(self, url, data, key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(url, data, format='json', **headers)
+
+    def test_create_is_idempotent_without_key(self):
+        first = self.post('/api/waste/payment/create/', {'booking_id': self.booking.id})
+        second = self.post('/api/waste/payment/create/', {'booking_id': self.booking.id})
+        self.assertEqual(first.data['razorpay_order_id'], second.data['razorpay_order_id'])
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_verify_marks_booking_paid(self):
+        order_id = self.post('/api/waste/payment/create/', {'booking_id': self.booking.id}).data['razorpay_order_id']
+        response = self.post('/api/waste/payment/verify/', {
+            'razorpay_order_id': order_id, 'razorpay_payment_id': 'pay_1'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['payment']['status'], 'paid')
+        self.assertEqual(response.data['payment']['booking']['payment_status'], 'paid')
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.payment_status, 'paid')
+        self.assertIsNotNone(Payment.objects.get().paid_at)
+
+        # A repeated verification leaves the recorded payment alone
+        self.post('/api/waste/payment/verify/', {
+            'razorpay_order_id': order_id, 'razorpay_payment_id': 'pay_2'
+        })
+        self.assertEqual(Payment.objects.get().razorpay_payment_id, 'pay_1')
+
+    def test_retry_is_replayed_from_store(self):
+        order_id = self.post('/api/waste/payment/create/', {'booking_id': self.booking.id}).data['razorpay_order_id']
+        data = {'razorpay_order_id': order_id, 'razorpay_payment_id': 'pay_1'}
+        first = self.post('/api/waste/payment/verify/', data, key='verify-1')
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.post('/api/waste/payment/verify/', data, key='verify-1')
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(json.loads(retry.content), json.loads(first.content))
+        self.assertFalse([q for q in queries if 'waste_payment' in q['sql'] or 'waste_booking' in q['sql']])
+
+    def test_key_reused_with_other_body(self):
+        self.post('/api/waste/payment/create/', {'booking_id': self.booking.id}, key='k')
+        response = self.post('/api/waste/payment/create/', {'booking_id': self.booking.id + 1}, key='k')
+        self.assertEqual(response.status_code, 422)
+
+    def test_key_in_flight(self):
+        data = {'booking_id': self.booking.id}
+        IdempotencyKey.objects.create(
+            user=self.user, endpoint='payment.create', key='k',
+            request_hash=idempotency.request_hash(data)
+        )
+        response = self.post('/api/waste/payment/create/', data, key='k')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_abandoned_key_is_taken_over(self):
+        data = {'booking_id': self.booking.id}
+        record = IdempotencyKey.objects.create(
+            user=self.user, endpoint='payment.create', key='k',
+            request_hash=idempotency.request_hash(data)
+        )
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            created_at=timezone.now() - timedelta(seconds=61)
+        )
+        response = self.post('/api/waste/payment/create/', data, key='k')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(IdempotencyKey.objects.get().response_status, 200)
+
+    def test_key_released_during_claim_is_claimed_again(self):
+        data = {'booking_id': self.booking.id}
+        create = IdempotencyKey.objects.create
+        calls = []
+
+        def released_after_conflict(**fields):
+            # The first attempt loses to a request that then fails and releases the key
+            calls.append(fields)
+            if len(calls) == 1:
+                raise IntegrityError('duplicate key')
+            return create(**fields)
+
+        with mock.patch.object(IdempotencyKey.objects, 'create', side_effect=released_after_conflict):
+            response = self.post('/api/waste/payment/create/', data, key='k')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 2)
+
+    def test_keys_are_per_user(self):
+        self.post('/api/waste/payment/create/', {'booking_id': self.booking.id}, key='k')
+        self.client.force_authenticate(make_user('other@example.com'))
+        response = self.post('/api/waste/payment/create/', {'booking_id': self.booking.id}, key='k')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(RAZORPAY_WEBHOOK_SECRET='stub-webhook-secret')
+class PaymentWebhookTests(APITestCase):
+    url = '/api/waste/payment/webhook/'
+
+    def setUp(self):
+        self.gateway = StubGateway()
+        user = make_user()
+        waste_type = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        self.payments = []
+        for _ in range(3):
+            booking = make_booking(user, waste_type)
+            self.payments.append(Payment.objects.create(
+                booking=booking, amount=booking.total_price, razorpay_order_id=f'order_{booking.id}'
+            ))
+
+    def deliver(self, delivery):
+        body, headers = delivery
+        return self.client.generic('POST', self.url, body, content_type='application/json', headers=headers)
+
+    def test_ingest_only_queues(self):
+        delivery = self.gateway.event(self.payments[0].razorpay_order_id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.deliver(delivery)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries if 'waste_payment"' in q['sql'] or 'waste_booking' in q['sql']])
+        self.deliver(delivery)  # redelivery
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+        self.assertEqual(Payment.objects.filter(status='paid').count(), 0)
+
+    def test_rejects_bad_signature(self):
+        body, headers = self.gateway.event(self.payments[0].razorpay_order_id)
+        headers['X-Razorpay-Signature'] = '0' * 64
+        self.assertEqual(self.deliver((body, headers)).status_code, 400)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_batch_reconciles_payments(self):
+        first, second, third = (payment.razorpay_order_id for payment in self.payments)
+        deliveries = [
+            self.gateway.event(first, payment_id='pay_a'),
+            self.gateway.event(first, payment_id='pay_a'),  # same payment, new event id
+            self.gateway.event(second, 'payment.failed', payment_id='pay_b1'),
+            self.gateway.event(second, payment_id='pay_b2'),
+            self.gateway.event(third, 'payment.failed', payment_id='pay_c'),
+            self.gateway.event('order_unknown'),
+        ]
+        for delivery in deliveries:
+            self.deliver(delivery)
+
+        with self.assertNumQueries(9):
+            self.assertEqual(process_batch(), 6)
+        self.assertEqual(process_batch(), 0)
+
+        statuses = {p.razorpay_order_id: (p.status, p.razorpay_payment_id, p.booking.payment_status)
+                    for p in Payment.objects.select_related('booking')}
+        self.assertEqual(statuses[first], ('paid', 'pay_a', 'paid'))
+        self.assertEqual(statuses[second], ('paid', 'pay_b2', 'paid'))
+        self.assertEqual(statuses[third], ('failed', 'pay_c', 'failed'))
+        self.assertEqual(PaymentEvent.objects.get(status='ignored').error, 'Unknown order')
+
+    def test_late_failure_keeps_payment_paid(self):
+        order_id = self.payments[0].razorpay_order_id
+        self.deliver(self.gateway.event(order_id))
+        process_batch()
+        self.deliver(self.gateway.event(order_id, 'payment.failed'))
+        process_batch()
+        self.assertEqual(Payment.objects.get(pk=self.payments[0].pk).status, 'paid')
+
+    def test_stub_gateway_traffic(self):
+        for delivery in self.gateway.deliveries(
+            [p.razorpay_order_id for p in self.payments], failure_rate=0.5, redelivery_rate=0.5
+        ):
+            self.assertEqual(self.deliver(delivery).status_code, 200)
+        while process_batch(batch_size=2):
+            pass
+        self.assertEqual(Payment.objects.filter(status='paid').count(), 3)
+        self.assertEqual(Booking.objects.filter(payment_status='paid').count(), 3)
+
+
+class AsyncViewTests(APITestCase):
+    """The async read endpoints return the same bodies as their sync views."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        center_index.invalidate()
+        self.addCleanup(center_index.invalidate)
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.user = make_user()
+        waste_type = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        centers = [make_center(f'Center {i}', 12.9 + i / 100, 77.6 + i / 100) for i in range(5)]
+        for i in range(25):
+            make_booking(self.user, waste_type, centers[i % 5], quantity_kg=Decimal(i + 1))
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        self.factory = AsyncRequestFactory()
+
+    def call_async(self, view, method, path, data=None, **extra):
+        # The async factory takes headers by name rather than as META keys
+        headers = {key[5:].replace('_', '-'): value for key, value in extra.items()}
+        if method == 'post':
+            request = self.factory.post(
+                path, json.dumps(data), content_type='application/json', headers=headers
+            )
+        else:
+            request = self.factory.get(path, data, headers=headers)
+        return async_to_sync(view.as_view())(request)
+
+    def assertSameResponse(self, view, method, path, data=None, **extra):
+        if method == 'post':
+            expected = self.client.post(path, data, format='json', **extra)
+        else:
+            expected = self.client.get(path, data, **extra)
+        actual = self.call_async(view, method, path, data, **extra)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        return actual
+
+    def test_catalogs(self):
+        response = self.assertSameResponse(async_views.AsyncCenterListView, 'get', '/api/waste/centers/')
+        self.assertSameResponse(async_views.AsyncWasteTypeListView, 'get', '/api/waste/types/')
+        not_modified = self.call_async(
+            async_views.AsyncCenterListView, 'get', '/api/waste/centers/', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_nearest_center(self):
+        point = {'latitude': 12.93, 'longitude': 77.63}
+        self.assertSameResponse(async_views.AsyncNearestCenterView, 'post', '/api/waste/centers/nearest/', point)
+        center_index.invalidate()
+        self.assertSameResponse(async_views.AsyncNearestCenterView, 'post', '/api/waste/centers/nearest/', point)
+        self.assertSameResponse(async_views.AsyncNearestCenterView, 'post', '/api/waste/centers/nearest/', {})
+        for point in ({'latitude': 'nan', 'longitude': 77.63}, {'latitude': 12.93, 'longitude': 181}):
+            response = self.assertSameResponse(
+                async_views.AsyncNearestCenterView, 'post', '/api/waste/centers/nearest/', point
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_booking_history_pages(self):
+        path = '/api/waste/booking/history/'
+        view = async_views.AsyncBookingListView
+        first = self.assertSameResponse(view, 'get', path, {'page_size': 10}, **self.auth)
+        next_page = json.loads(first.content)['next']
+        self.assertSameResponse(view, 'get', next_page.replace('http://testserver', ''), **self.auth)
+        self.assertSameResponse(
+            view, 'get', path, {'fields': 'id,status,waste_type', 'expand': 'waste_type'}, **self.auth
+        )
+        self.assertSameResponse(view, 'get', path, {'fields': 'nope'}, **self.auth)
+
+    def test_booking_history_etag(self):
+        path = '/api/waste/booking/history/'
+        view = async_views.AsyncBookingListView
+        response = self.assertSameResponse(view, 'get', path, {'page_size': 10}, **self.auth)
+        self.assertEqual(response['ETag'], self.client.get(path, {'page_size': 10}, **self.auth)['ETag'])
+        not_modified = self.call_async(
+            view, 'get', path, {'page_size': 10}, HTTP_IF_NONE_MATCH=response['ETag'], **self.auth
+        )
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_booking_history_requires_token(self):
+        path = '/api/waste/booking/history/'
+        view = async_views.AsyncBookingListView
+        response = self.assertSameResponse(view, 'get', path)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+        self.assertSameResponse(view, 'get', path, HTTP_AUTHORIZATION='Bearer garbage')
+
+
+class BenchmarkSuiteTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media_root, IMAGE_WORKER_THREADS=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(benchdata.refresh_caches)
+        user = benchdata.seed(users=3, centers=20, waste_types=3, bookings=200, batch_size=64)
+        self.fixtures = apibench.Fixtures(user, benchdata.bench_staff(), concurrency=1)
+
+    def test_every_route_has_a_scenario(self):
+        names = {
+            pattern.name
+            for urls in (waste_urls.urlpatterns, users_urls.urlpatterns)
+            for pattern in urls
+        }
+        names |= {'token_obtain_pair', 'token_refresh'}
+        self.assertEqual({scenario.route for scenario in apibench.SCENARIOS}, names)
+
+    def test_seed_is_idempotent(self):
+        self.assertEqual(Booking.objects.count(), 200)
+        self.assertEqual(benchdata.seed(bookings=10).pk, self.fixtures.user.pk)
+        self.assertEqual(Booking.objects.count(), 200)
+
+    def test_read_scenarios_succeed(self):
+        for scenario in apibench.SCENARIOS:
+            if scenario.write:
+                continue
+            with self.subTest(scenario=scenario.name):
+                latencies, queries, errors, elapsed = apibench.run(
+                    scenario, self.fixtures, concurrency=1, duration=0.05, warmup=1
+                )
+                self.assertEqual(errors, {})
+                result = apibench.summarize(latencies, queries, errors, elapsed, 0.0)
+                self.assertGreater(result['requests'], 0)
+                self.assertIsNotNone(result['p99_ms'])
+
+    def test_write_scenarios_roll_back(self):
+        scenario = next(s for s in apibench.SCENARIOS if s.name == 'booking_bulk_create')
+        before = Booking.objects.count()
+        latencies, _, errors, _ = apibench.run(
+            scenario, self.fixtures, concurrency=1, duration=0.05, warmup=1
+        )
+        self.assertEqual(errors, {})
+        self.assertTrue(latencies)
+        self.assertEqual(Booking.objects.count(), before)
+
+    def test_cleanup_removes_upload_fixtures(self):
+        scenario = next(s for s in apibench.SCENARIOS if s.name == 'image_upload_put')
+        apibench.run(scenario, self.fixtures, concurrency=1, duration=0.05, warmup=1)
+        upload = ImageUpload.objects.get(pk=self.fixtures.upload_ids[0])
+        self.assertTrue(os.path.exists(partial_path(upload)))
+        self.fixtures.cleanup()
+        self.assertFalse(ImageUpload.objects.filter(pk__in=self.fixtures.upload_ids).exists())
+        self.assertFalse(os.path.exists(partial_path(upload)))
+
+    def test_compare_flags_regressions(self):
+        previous = {'rps': 100.0, 'p99_ms': 10.0, 'alloc_kib': 50.0, 'queries': 2.0}
+        baseline = {'same': previous, 'slower': previous}
+        results = {
+            'same': dict(previous, rps=105.0),
+            'slower': {'rps': 80.0, 'p99_ms': 10.5, 'alloc_kib': 50.0, 'queries': 3.0},
+            'new': previous,
+        }
+        rows, regressions = apibench.compare(results, baseline, tolerance=0.1)
+        self.assertEqual([name for name, _, _ in rows], ['same', 'slower'])
+        self.assertEqual(regressions, ['slower: throughput, queries'])
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+        self.user = make_user()
+        waste_type = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        for i in range(3):
+            make_booking(self.user, waste_type, make_center(f'Center {i}', 12.9 + i / 100, 77.6))
+
+    def sample(self, text, name, **labels):
+        wanted = ','.join(f'{key}="{value}"' for key, value in labels.items())
+        match = re.search(rf'^{name}{{{re.escape(wanted)}}} (\S+)$', text, re.M)
+        self.assertIsNotNone(match, f'{name}{{{wanted}}} missing')
+        return float(match.group(1))
+
+    def test_records_route_latency_queries_and_size(self):
+        self.client.force_authenticate(self.user)
+        responses = [self.client.get('/api/waste/booking/history/') for _ in range(2)]
+        self.client.get('/api/waste/no-such-route/')
+
+        text = self.client.get('/metrics').content.decode()
+        route = {'route': 'api/waste/booking/history/', 'method': 'GET'}
+        self.assertEqual(self.sample(text, 'http_request_duration_seconds_count', **route), 2)
+        self.assertEqual(
+            self.sample(text, 'http_request_duration_seconds_bucket', **route, le='+Inf'), 2
+        )
+        self.assertEqual(self.sample(text, 'http_requests_total', **route, status=200), 2)
+        self.assertGreater(self.sample(text, 'http_db_queries_total', **route), 0)
+        self.assertGreater(self.sample(text, 'http_serializer_seconds_total', **route), 0)
+        self.assertEqual(
+            self.sample(text, 'http_response_bytes_total', **route),
+            sum(len(response.content) for response in responses)
+        )
+        self.assertEqual(
+            self.sample(text, 'http_requests_total', route='<unmatched>', method='GET', status=404), 1
+        )
+
+    def test_serializer_time_without_patching_drf(self):
+        self.client.force_authenticate(self.user)
+        booking = Booking.objects.first()
+        self.client.get(f'/api/waste/booking/{booking.id}/')
+        text = self.client.get('/metrics').content.decode()
+        route = {'route': 'api/waste/booking/<int:pk>/', 'method': 'GET'}
+        self.assertGreater(self.sample(text, 'http_serializer_seconds_total', **route), 0)
+        for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+            data = serializer_class.__dict__['data']
+            self.assertEqual(data.fget.__module__, 'rest_framework.serializers')
+
+    def test_merges_thread_buckets(self):
+        stats = metrics.RequestStats()
+        stats.queries = 2
+
+        def record():
+            metrics.registry.record('r/', 'GET', 200, 0.02, stats, 10)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        record()
+        merged = metrics.registry.collect()[('r/', 'GET')]
+        self.assertEqual((merged.requests, merged.queries, merged.response_bytes), (5, 10, 50))
+        self.assertEqual(merged.buckets[metrics.LATENCY_BUCKETS.index(0.025)], 5)
+
+    def test_exited_threads_buckets_are_folded(self):
+        stats = metrics.RequestStats()
+        buckets = len(metrics.registry._buckets)
+        for _ in range(5):
+            thread = threading.Thread(
+                target=metrics.registry.record, args=('r/', 'GET', 200, 0.02, stats, 10)
+            )
+            thread.start()
+            thread.join()
+        gc.collect()
+        self.assertEqual(metrics.registry.collect()[('r/', 'GET')].requests, 5)
+        self.assertEqual(len(metrics.registry._buckets), buckets)
+        metrics.registry.clear()
+        self.assertEqual(metrics.registry.collect(), {})
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0, METRICS_SLOW_SQL_SAMPLES=1)
+    def test_logs_slow_requests_with_sql(self):
+        with self.assertLogs('garbage_management.metrics', 'WARNING') as logs:
+            self.client.get('/api/waste/centers/')
+        self.assertIn('Slow request GET /api/waste/centers/', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_token_protects_endpoint(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+
+class ProductionSettingsTests(APITestCase):
+    def load(self, **env):
+        env = {'METRICS_TOKEN': 'scrape-secret', 'CACHE_URL': 'redis://cache:6379/1', **env}
+        with mock.patch.dict(os.environ, env):
+            sys.modules.pop('garbage_management.settings_production', None)
+            return importlib.import_module('garbage_management.settings_production')
+
+    def test_requires_allowed_hosts(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.load(ALLOWED_HOSTS='')
+
+    def test_requires_metrics_token(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.load(ALLOWED_HOSTS='api.example.com', METRICS_TOKEN='')
+
+    def test_requires_shared_cache(self):
+        for url in ('', 'cache:6379', 'file:///tmp/cache'):
+            with self.subTest(url=url), self.assertRaises(ImproperlyConfigured):
+                self.load(ALLOWED_HOSTS='api.example.com', CACHE_URL=url)
+
+        cache = self.load(ALLOWED_HOSTS='api.example.com').CACHES['default']
+        self.assertEqual(cache['BACKEND'], 'django.core.cache.backends.redis.RedisCache')
+        self.assertEqual(cache['LOCATION'], 'redis://cache:6379/1')
+        cache = self.load(
+            ALLOWED_HOSTS='api.example.com', CACHE_URL='memcached://mc1:11211,mc2:11211'
+        ).CACHES['default']
+        self.assertEqual(cache['BACKEND'], 'django.core.cache.backends.memcached.PyMemcacheCache')
+        self.assertEqual(cache['LOCATION'], ['mc1:11211', 'mc2:11211'])
+        cache = self.load(ALLOWED_HOSTS='api.example.com', CACHE_URL='locmem://').CACHES['default']
+        self.assertEqual(cache['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+
+    def test_lean_profile(self):
+        production = self.load(ALLOWED_HOSTS='api.example.com', ADMIN_ENABLED='0')
+        self.assertFalse(production.DEBUG)
+        self.assertTrue(production.DATABASES['default']['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('django.contrib.admin', production.INSTALLED_APPS)
+        self.assertNotIn('django.middleware.csrf.CsrfViewMiddleware', production.MIDDLEWARE)
+        # The base settings are copied, not modified
+        self.assertIn('django.contrib.admin', base_settings.INSTALLED_APPS)
+        self.assertFalse(base_settings.DATABASES['default'].get('CONN_HEALTH_CHECKS'))
+
+        user = make_user()
+        token = RefreshToken.for_user(user).access_token
+        with override_settings(
+            MIDDLEWARE=production.MIDDLEWARE, REST_FRAMEWORK=production.REST_FRAMEWORK
+        ):
+            response = self.client.get('/api/auth/me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            response = self.client.post(
+                '/api/auth/token/', {'email': user.email, 'password': 'pass12345'}, format='json'
+            )
+            self.assertEqual(response.status_code, 200)
+
+    def test_admin_profile_keeps_full_stack(self):
+        production = self.load(ALLOWED_HOSTS='admin.example.com', ADMIN_ENABLED='1')
+        self.assertIn('django.contrib.admin', production.INSTALLED_APPS)
+        self.assertIn('django.contrib.sessions.middleware.SessionMiddleware', production.MIDDLEWARE)
+
+
+class FastReadPathTests(APITestCase):
+    """The fast read path renders the same bytes as the DRF serializers."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_user(
+            email='fast@example.com', password='pass12345', name='Zoë "Q"', address='Line two\x0b'
+        )
+        self.client.force_authenticate(self.user)
+        waste_type = WasteType.objects.create(
+            name='Plastic é ', description='Tabs\tand\nnewlines', price_per_kg=Decimal('12.5')
+        )
+        center = make_center('Center \U0001f600', 12.971599, 77.594566)
+        for i in range(7):
+            make_booking(
+                self.user, waste_type, center if i % 2 else None,
+                quantity_kg=Decimal(i) + Decimal('0.25'), latitude=Decimal('12.9') if i % 3 else None,
+            )
+        with_image = Booking.objects.filter(user=self.user).first()
+        Booking.objects.filter(pk=with_image.pk).update(
+            waste_image='waste_images/a.jpg', waste_image_thumbnail='waste_images/thumbnails/a.jpg'
+        )
+        Booking.objects.exclude(pk=with_image.pk).filter(selected_center=center).update(
+            waste_image='waste_images/b.jpg'
+        )
+
+    def assertSameBytes(self, path, params=None):
+        with override_settings(FAST_READ_PATH=False):
+            cache.clear()
+            expected = self.client.get(path, params)
+        cache.clear()
+        actual = self.client.get(path, params)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        return actual
+
+    def test_booking_history(self):
+        self.assertIsNotNone(fastread.read_plan(BookingSerializer))
+        first = self.assertSameBytes('/api/waste/booking/history/', {'page_size': 3})
+        next_page = json.loads(first.content)['next']
+        self.assertSameBytes(next_page.replace('http://testserver', ''))
+        for params in (
+            {'fields': 'id,waste_image,total_price'},
+            {'expand': 'waste_type'},
+            {'expand': ''},
+            {'fields': 'id,user,selected_center', 'expand': 'selected_center'},
+        ):
+            with self.subTest(params=params):
+                self.assertSameBytes('/api/waste/booking/history/', params)
+
+    def test_catalogs(self):
+        self.assertSameBytes('/api/waste/types/')
+        self.assertSameBytes('/api/waste/centers/')
+
+    def test_indented_and_html_responses_use_drf(self):
+        response = self.client.get(
+            '/api/waste/booking/history/', HTTP_ACCEPT='application/json; indent=2'
+        )
+        self.assertIn(b'\n  ', response.content)
+
+    def test_render_without_orjson(self):
+        data = [{'name': 'Zoë ', 'n': 1, 'ok': True, 'none': None, 'x': 'a"\\\x01'}]
+        with mock.patch.object(fastread, 'orjson', None):
+            self.assertEqual(fastread.render(data), JSONRenderer().render(data))
+        self.assertEqual(fastread.render(data), JSONRenderer().render(data))
+
+    def test_plan_cache_is_bounded(self):
+        fastread._plan.cache_clear()
+        self.addCleanup(fastread._plan.cache_clear)
+        names = sorted(BookingSerializer().fields)
+        plan = fastread.read_plan(BookingSerializer, fields=['id', 'status'])
+        self.assertIs(fastread.read_plan(BookingSerializer, fields=('status', 'id')), plan)
+        for count in range(1, len(names) + 1):
+            for start in range(len(names)):
+                fastread.read_plan(BookingSerializer, fields=names[start:start + count])
+        self.assertLessEqual(fastread._plan.cache_info().currsize, fastread.PLAN_CACHE_SIZE)
+
+    def test_unsupported_serializer_has_no_plan(self):
+        # UUID primary key
+        self.assertIsNone(fastread.read_plan(ImageUploadSerializer))
+
+
+class BookingHistoryETagTests(APITestCase):
+    url = '/api/waste/booking/history/'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        self.waste_type = WasteType.objects.create(name='Plastic', price_per_kg=Decimal('12.50'))
+        self.bookings = [make_booking(self.user, self.waste_type) for _ in range(3)]
+
+    def assertChanged(self, etag, params=None):
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response['ETag']
+
+    def test_unchanged_history_is_not_modified_after_one_query(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIn('private', response['Cache-Control'])
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        booking = self.bookings[0]
+        booking.status = 'completed'
+        booking.save()
+        etag = self.assertChanged(etag)
+
+        self.bookings[1].delete()
+        etag = self.assertChanged(etag)
+
+        make_booking(self.user, self.waste_type)
+        etag = self.assertChanged(etag)
+
+        self.waste_type.price_per_kg = Decimal('14.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.waste_type.save()
+        self.assertChanged(etag)
+
+    def test_etag_depends_on_the_request(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertChanged(etag, {'fields': 'id,status'})
+        self.assertChanged(etag, {'page_size': 1})
+        make_booking(make_user('other@example.com'), self.waste_type)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class CompressionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        center_coordinates.invalidate()
+        self.addCleanup(center_coordinates.invalidate)
+        for i in range(40):
+            make_center(f'Center {i}', 12.9 + i / 100, 77.6 + i / 100)
+
+    def test_negotiation(self):
+        with override_settings(COMPRESSION_ENCODINGS=['zstd', 'br', 'gzip']):
+            self.assertEqual(compression.negotiate('gzip, deflate'), 'gzip')
+            self.assertEqual(compression.negotiate('GZIP;q=0.5, *;q=0.1'), 'gzip')
+            self.assertIsNone(compression.negotiate('gzip;q=0, identity'))
+            self.assertIsNone(compression.negotiate(''))
+            self.assertEqual(compression.negotiate('*'), compression.available_encodings()[0])
+        with override_settings(COMPRESSION_ENCODINGS=['br']):
+            self.assertEqual(compression.negotiate('gzip, br'), 'br' if 'br' in compression.ENCODERS else None)
+
+    def test_json_is_compressed(self):
+        plain = self.client.get('/api/waste/centers/')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get('/api/waste/centers/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+        not_modified = self.client.get(
+            '/api/waste/centers/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_small_bodies_are_sent_as_is(self):
+        with override_settings(COMPRESSION_MIN_BYTES=10 ** 6):
+            response = self.client.get('/api/waste/centers/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_streamed_response(self):
+        points = [{'latitude': 12.9 + i / 1000, 'longitude': 77.6} for i in range(200)]
+        url = '/api/waste/centers/nearest/batch/'
+        plain = self.client.post(url, {'points': points}, format='json')
+        response = self.client.post(url, {'points': points}, format='json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response)
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)),
+            b''.join(plain.streaming_content)
+        )
+
+    def test_encoders_round_trip(self):
+        data = b'{"results": [' + b'{"id": 1, "name": "Center"},' * 200 + b']}'
+        decoders = {'gzip': gzip.decompress}
+        if compression.brotli is not None:
+            decoders['br'] = compression.brotli.decompress
+        if compression.zstd is not None:
+            decoders['zstd'] = compression.zstd.decompress
+        elif compression.zstandard is not None:
+            # Streamed frames carry no content size, which one-shot decompress() needs
+            decoders['zstd'] = lambda body: (
+                compression.zstandard.ZstdDecompressor().decompressobj().decompress(body)
+            )
+        for encoding, decompress in decoders.items():
+            with self.subTest(encoding=encoding):
+                self.assertEqual(decompress(compression.compress(encoding, data)), data)
+                streamed = b''.join(compression.compress_stream(encoding, [data[:100], data[100:]]))
+                self.assertEqual(decompress(streamed), data)
+
+
+class CatalogImportExportTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        center_index.invalidate()
+        self.addCleanup(center_index.invalidate)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(text)
+        return path
+
+    def run_import(self, *args):
+        out = StringIO()
+        # Caches are refreshed when the import commits
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_catalog', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_csv_upserts_on_natural_key(self):
+        WasteType.objects.create(name='Glass', description='Bottles', price_per_kg=Decimal('3.00'))
+        path = self.write('types.csv', 'name,price_per_kg\nGlass,4.25\nMetal,8\nMetal,9.5\n')
+        output = self.run_import('waste_types', path, '--batch-size', '2')
+        self.assertIn('rows/s', output)
+        self.assertEqual(
+            list(WasteType.objects.order_by('name').values_list('name', 'description', 'price_per_kg')),
+            [('Glass', 'Bottles', Decimal('4.25')), ('Metal', '', Decimal('9.50'))]
+        )
+
+    def test_jsonl_rows_only_update_their_own_fields(self):
+        WasteType.objects.create(name='Glass', description='Bottles and jars', price_per_kg=Decimal('2'))
+        WasteType.objects.create(name='Metal', description='Cans', price_per_kg=Decimal('5'))
+        rows = [
+            {'name': 'Glass', 'price_per_kg': '3.00'},
+            {'name': 'Metal', 'description': 'Cans and foil', 'price_per_kg': '6'},
+            {'name': 'Paper'},
+        ]
+        path = self.write('types.jsonl', ''.join(json.dumps(row) + '\n' for row in rows))
+        with self.assertRaisesMessage(CommandError, 'price_per_kg'):
+            self.run_import('waste_types', path)
+        path = self.write('types.jsonl', ''.join(json.dumps(row) + '\n' for row in rows[:2]))
+        self.run_import('waste_types', path)
+        self.assertEqual(
+            list(WasteType.objects.order_by('name').values_list('name', 'description', 'price_per_kg')),
+            [('Glass', 'Bottles and jars', Decimal('3.00')), ('Metal', 'Cans and foil', Decimal('6.00'))]
+        )
+
+    def test_jsonl_centers_refresh_caches(self):
+        make_center('Indiranagar', 12.9784, 77.6408)
+        self.assertEqual(len(self.client.get('/api/waste/centers/').json()), 1)
+        self.client.post(
+            '/api/waste/centers/nearest/', {'latitude': 12.3, 'longitude': 76.6}, format='json'
+        )
+        rows = [
+            {'name': 'Indiranagar', 'address': 'Indiranagar address', 'latitude': 12.97,
+             'longitude': 77.64, 'contact_info': '080 1234'},
+            {'name': 'Mysuru', 'address': 'Sayyaji Rao Road', 'latitude': '12.2958',
+             'longitude': '76.6394'},
+        ]
+        path = self.write('centers.jsonl', ''.join(json.dumps(row) + '\n' for row in rows))
+        self.run_import('centers', path)
+
+        self.assertEqual(Center.objects.count(), 2)
+        updated = Center.objects.get(name='Indiranagar')
+        self.assertEqual((updated.latitude, updated.contact_info), (Decimal('12.97'), '080 1234'))
+        self.assertEqual(len(self.client.get('/api/waste/centers/').json()), 2)
+        nearest = self.client.post(
+            '/api/waste/centers/nearest/', {'latitude': 12.3, 'longitude': 76.6}, format='json'
+        )
+        self.assertEqual(nearest.json()['center']['name'], 'Mysuru')
+
+    def test_invalid_rows(self):
+        path = self.write('types.csv', 'name,price_per_kg\nGlass,4\nMetal,lots\n')
+        with self.assertRaisesMessage(CommandError, 'line 3: price_per_kg'):
+            self.run_import('waste_types', path)
+        self.assertFalse(WasteType.objects.exists())
+
+        self.run_import('waste_types', path, '--skip-invalid')
+        self.assertEqual(list(WasteType.objects.values_list('name', flat=True)), ['Glass'])
+
+        path = self.write('centers.csv', 'name,address,latitude,longitude\nPole,North,95,0\n')
+        with self.assertRaisesMessage(CommandError, 'latitude'):
+            self.run_import('centers', path)
+        with self.assertRaisesMessage(CommandError, 'Unknown columns: colour'):
+            self.run_import('waste_types', self.write('x.csv', 'name,colour\nGlass,green\n'))
+
+    def test_export_round_trip(self):
+        make_center('Indiranagar', 12.9784, 77.6408)
+        Center.objects.create(
+            name='Mysuru, "Main"', address='Line one\nLine two', latitude=Decimal('12.2958'),
+            longitude=Decimal('76.6394'), contact_info=None
+        )
+        WasteType.objects.create(name='Plastic é', price_per_kg=Decimal('12.50'))
+        for catalog, fields in (
+            ('centers', ('name', 'address', 'latitude', 'longitude', 'contact_info')),
+            ('waste_types', ('name', 'description', 'price_per_kg')),
+        ):
+            model = Center if catalog == 'centers' else WasteType
+            expected = list(model.objects.order_by('pk').values_list(*fields))
+            for extension in ('csv', 'jsonl'):
+                with self.subTest(catalog=catalog, format=extension):
+                    path = os.path.join(self.directory, f'{catalog}.{extension}')
+                    call_command('export_catalog', catalog, path, stderr=StringIO())
+                    model.objects.all().delete()
+                    self.run_import(catalog, path)
+                    self.assertEqual(list(model.objects.order_by('pk').values_list(*fields)), expected)
+
+        out = StringIO()
+        call_command('export_catalog', 'waste_types', '--format', 'jsonl', stdout=out)
+        self.assertEqual(
+            out.getvalue(), '{"name": "Plastic é", "description": "", "price_per_kg": "12.50"}\n'
+        )
@@ -0,0 +1,125 @@
+"""
+Resumable chunked image uploads.
+
+Chunks are read from the request stream in small pieces, so neither a whole
+chunk nor the whole file is ever held in memory. Each chunk is first staged in
+a file of its own, without holding any lock while the client sends it, and
+then appended to the partial file under ``MEDIA_ROOT/uploads/partial`` by the
+request that claims its offset on the upload row. Finalizing verifies the SHA-256 of the
+assembled file, checks that it is an image and moves it into the booking's
+``waste_image`` storage. Uploads left unfinished for ``UPLOAD_STALE_HOURS``
+are removed with their partial files by ``purge_stale``.
+"""
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+from PIL import Image
+
+from .models import Booking, ImageUpload
+
+PIECE_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+def partial_path(upload):
+    return os.path.join(settings.MEDIA_ROOT, 'uploads', 'partial', str(upload.pk))
+
+
+def append_chunk(upload, stream, length):
+    """Append ``length`` bytes read from ``stream``; return the bytes written."""
+    path = partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as target:
+        target.seek(upload.received)
+        target.truncate()
+        while written < length:
+            piece = stream.read(min(PIECE_SIZE, length - written))
+            if not piece:
+                break
+            target.write(piece)
+            written += len(piece)
+    return written
+
+
+def stage_chunk(upload, stream, length):
+    """Copy up to ``length`` bytes of ``stream`` to a new file; return its path and size."""
+    path = f'{partial_path(upload)}.{uuid.uuid4().hex}'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    with open(path, 'wb') as target:
+        while written < length:
+            piece = stream.read(min(PIECE_SIZE, length - written))
+            if not piece:
+                break
+            target.write(piece)
+            written += len(piece)
+    return path, written
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for piece in iter(lambda: source.read(PIECE_SIZE), b''):
+            digest.update(piece)
+    return digest.hexdigest()
+
+
+def attach_to_booking(upload, booking, sha256):
+    """Verify the finished upload and store it as ``booking.waste_image``."""
+    path = partial_path(upload)
+    if upload.received != upload.size or not os.path.exists(path):
+        raise UploadError('Upload is incomplete')
+    if file_sha256(path) != sha256.lower():
+        raise UploadError('Checksum mismatch')
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        raise UploadError('Upload is not a valid image')
+
+    with open(path, 'rb') as source:
+        name = booking.waste_image.field.generate_filename(booking, upload.filename)
+        name = booking.waste_image.storage.save(name, File(source), max_length=100)
+    Booking.objects.filter(pk=booking.pk).update(
+        waste_image=name, waste_image_thumbnail=None, updated_at=timezone.now()
+    )
+    booking.waste_image.name = name
+    booking.waste_image_thumbnail = None
+    os.remove(path)
+
+
+def discard(upload):
+    path = partial_path(upload)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def stale_cutoff():
+    return timezone.now() - timedelta(hours=settings.UPLOAD_STALE_HOURS)
+
+
+def in_progress(user):
+    """The user's unfinished uploads that received a chunk recently enough to count."""
+    return ImageUpload.objects.filter(
+        user=user, status='uploading', updated_at__gte=stale_cutoff()
+    )
+
+
+def purge_stale():
+    """Delete unfinished uploads idle past ``UPLOAD_STALE_HOURS``; returns the number removed."""
+    deleted = 0
+    stale = ImageUpload.objects.filter(status='uploading', updated_at__lt=stale_cutoff())
+    for upload in stale.iterator():
+        discard(upload)
+        upload.delete()
+        deleted += 1
+    return deleted
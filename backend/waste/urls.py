@@ -1,17 +1,42 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     WasteTypeListView, CenterListView, NearestCenterView,
-    BookingCreateView, BookingListView, BookingDetailView,
-    PaymentCreateView, PaymentVerifyView
+    NearestCenterBatchView, CenterSearchView, PriceQuoteView, SlotAvailabilityView,
+    RoutePlanView, DailyRollupView,
+    BookingCreateView, BookingBulkCreateView, BookingListView, BookingSummaryView,
+    BookingDetailView,
+    ImageUploadCreateView, ImageUploadView, ImageUploadCompleteView,
+    PaymentCreateView, PaymentVerifyView, PaymentWebhookView
 )
 
+if settings.ASYNC_VIEWS:
+    from .async_views import (
+        AsyncWasteTypeListView as WasteTypeListView,
+        AsyncCenterListView as CenterListView,
+        AsyncNearestCenterView as NearestCenterView,
+        AsyncBookingListView as BookingListView,
+    )
+
 urlpatterns = [
     path("types/", WasteTypeListView.as_view(), name="waste_types"),
     path("centers/", CenterListView.as_view(), name="centers"),
     path("centers/nearest/", NearestCenterView.as_view(), name="nearest_center"),
+    path("centers/nearest/batch/", NearestCenterBatchView.as_view(), name="nearest_center_batch"),
+    path("centers/search/", CenterSearchView.as_view(), name="center_search"),
+    path("pricing/quote/", PriceQuoteView.as_view(), name="price_quote"),
+    path("slots/availability/", SlotAvailabilityView.as_view(), name="slot_availability"),
+    path("routes/", RoutePlanView.as_view(), name="route_plan"),
+    path("analytics/daily/", DailyRollupView.as_view(), name="analytics_daily"),
     path("booking/create/", BookingCreateView.as_view(), name="booking_create"),
+    path("booking/bulk_create/", BookingBulkCreateView.as_view(), name="booking_bulk_create"),
     path("booking/history/", BookingListView.as_view(), name="booking_history"),
+    path("booking/summary/", BookingSummaryView.as_view(), name="booking_summary"),
     path("booking/<int:pk>/", BookingDetailView.as_view(), name="booking_detail"),
+    path("uploads/", ImageUploadCreateView.as_view(), name="image_upload_create"),
+    path("uploads/<uuid:pk>/", ImageUploadView.as_view(), name="image_upload"),
+    path("uploads/<uuid:pk>/complete/", ImageUploadCompleteView.as_view(), name="image_upload_complete"),
     path("payment/create/", PaymentCreateView.as_view(), name="payment_create"),
     path("payment/verify/", PaymentVerifyView.as_view(), name="payment_verify"),
+    path("payment/webhook/", PaymentWebhookView.as_view(), name="payment_webhook"),
 ]
@@ -1,24 +1,102 @@
 from rest_framework import generics, status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import Q
-from math import radians, cos, sin, asin, sqrt
+from django.db.models import Count, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from math import radians, cos, sin, asin, sqrt, isfinite
 from decimal import Decimal
-from .models import WasteType, Center, Booking, Payment
-from .serializers import WasteTypeSerializer, CenterSerializer, BookingSerializer, PaymentSerializer
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from .models import (
+    WasteType, Center, PickupSlot, Booking, BookingDailyRollup, ImageUpload, Payment
+)
+from .serializers import (
+    WasteTypeSerializer, CenterSerializer, CenterSearchSerializer,
+    PriceQuoteSerializer, SlotAvailabilitySerializer, RoutePlanRequestSerializer,
+    RollupQuerySerializer, BookingDailyRollupSerializer, BookingSerializer,
+    ImageUploadSerializer, PaymentSerializer
+)
+from .catalog import (
+    CENTERS, WASTE_TYPES, catalog_version, get_catalog_body, version_timestamp
+)
+from .fastread import FastJSONResponse, read_plan, render as render_rows, renders_plain_json
+from .idempotency import idempotent
+from .imaging import enqueue_image_job
+from .pagination import BookingCursorPagination
+from .pricing import line_total
+from .rollups import record_bookings
+from .routing import plan_center_day
+from .uploads import (
+    UploadError, append_chunk, attach_to_booking, discard, in_progress, stage_chunk
+)
+from .webhooks import ingest, verify_signature
+from .slots import SlotUnavailable, default_capacity, reserve_slot
+from .spatial import (
+    bounding_box_filter, center_coordinates, center_index, nearest_for_points,
+    rank_centers, rows_to_arrays
+)
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from garbage_management.metrics import serializing
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+import hashlib
+import json
+import os
+import numpy as np
+from users.serializers import UserSerializer
 
 
-class WasteTypeListView(generics.ListAPIView):
+class CatalogListView(generics.ListAPIView):
+    """List view served from the versioned catalog cache.
+
+    Responses carry ``ETag`` and ``Last-Modified`` derived from the catalog
+    version; matching conditional requests get a 304 without touching the
+    database, and full responses reuse the cached JSON body.
+    """
+    permission_classes = [AllowAny]
+    catalog_name = None
+
+    def list(self, request, *args, **kwargs):
+        version = catalog_version(self.catalog_name)
+        etag = f'"{self.catalog_name}-{version}"'
+        last_modified = version_timestamp(version)
+
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified)
+        )
+        if not_modified is not None:
+            return not_modified
+
+        body = get_catalog_body(self.catalog_name, version, self.render_catalog)
+        response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def render_catalog(self):
+        plan = read_plan(self.get_serializer_class())
+        if plan is not None:
+            return render_rows(plan.represent(plan.values(self.get_queryset()), self.request))
+        serializer = self.get_serializer(list(self.get_queryset()), many=True)
+        with serializing():
+            return JSONRenderer().render(serializer.data)
+
+
+class WasteTypeListView(CatalogListView):
     queryset = WasteType.objects.all()
     serializer_class = WasteTypeSerializer
-    permission_classes = [AllowAny]
+    catalog_name = WASTE_TYPES
 
 
-class CenterListView(generics.ListAPIView):
+class CenterListView(CatalogListView):
     queryset = Center.objects.all()
     serializer_class = CenterSerializer
-    permission_classes = [AllowAny]
+    catalog_name = CENTERS
 
 
 class NearestCenterView(APIView):
@@ -47,23 +125,58 @@ class NearestCenterView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        centers = Center.objects.all()
+        try:
+            latitude, longitude = float(latitude), float(longitude)
+        except (TypeError, ValueError):
+            latitude = longitude = float('nan')
+        # float() accepts "nan" and "inf", which every range comparison lets through
+        if not (isfinite(latitude) and isfinite(longitude)):
+            return Response(
+                {'error': 'Latitude and longitude must be numbers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if abs(latitude) > 90 or abs(longitude) > 180:
+            return Response(
+                {'error': 'Coordinates out of range'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        matches = center_index.nearest(latitude, longitude)
+
         nearest_center = None
         min_distance = float('inf')
-        
-        for center in centers:
-            distance = self.haversine(
-                latitude, longitude,
-                center.latitude, center.longitude
-            )
-            if distance < min_distance:
-                min_distance = distance
-                nearest_center = center
-        
+
+        if matches:
+            center_id, min_distance = matches[0]
+            nearest_center = Center.objects.filter(pk=center_id).first()
+            if nearest_center is None:
+                # Deleted by another process since the index was built
+                center_index.invalidate()
+                matches = None
+                min_distance = float('inf')
+
+        if matches is None:
+            # Index is cold: scan once and warm it from the same rows
+            generation = center_index.generation
+            centers = list(Center.objects.all())
+            center_index.build(
+                ((c.id, c.latitude, c.longitude) for c in centers), generation
+            )
+
+            for center in centers:
+                distance = self.haversine(
+                    latitude, longitude,
+                    center.latitude, center.longitude
+                )
+                if distance < min_distance:
+                    min_distance = distance
+                    nearest_center = center
+
         if nearest_center:
-            serializer = CenterSerializer(nearest_center)
+            with serializing():
+                center = CenterSerializer(nearest_center).data
             return Response({
-                'center': serializer.data,
+                'center': center,
                 'distance_km': round(min_distance, 2)
             })
         
@@ -73,61 +186,663 @@ class NearestCenterView(APIView):
         )
 
 
+class CenterSearchView(APIView):
+    """Rank centers around a point by ``k`` nearest and/or ``radius_km``.
+
+    Radius searches prefilter rows in SQL with a bounding box; pure k-nearest
+    searches rank the cached coordinate array of all centers.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        params = CenterSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        latitude = params.validated_data['latitude']
+        longitude = params.validated_data['longitude']
+        k = params.validated_data['k']
+        radius_km = params.validated_data.get('radius_km')
+
+        if radius_km is not None:
+            rows = Center.objects.filter(
+                bounding_box_filter(latitude, longitude, radius_km)
+            ).order_by('id').values_list('id', 'latitude', 'longitude')
+            arrays = rows_to_arrays(list(rows))
+        else:
+            arrays = center_coordinates.get()
+
+        ranked = rank_centers(latitude, longitude, arrays, k=k, radius_km=radius_km)
+        centers = Center.objects.in_bulk([pk for pk, _ in ranked])
+        with serializing():
+            results = [
+                {
+                    'center': CenterSerializer(centers[pk]).data,
+                    'distance_km': round(distance, 2)
+                }
+                for pk, distance in ranked if pk in centers
+            ]
+        return Response({'count': len(results), 'results': results})
+
+
+class NearestCenterBatchView(APIView):
+    """Resolve the nearest center for many points in one request.
+
+    Accepts ``{"points": [{"latitude": ..., "longitude": ...}, ...]}`` with at
+    most ``NEAREST_BATCH_MAX_POINTS`` points and streams
+    ``{"count": n, "results": [{"index", "center", "distance_km"}, ...]}`` in
+    input order, computing distances chunk by chunk against the cached
+    center coordinates.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        points = request.data.get('points')
+        max_points = settings.NEAREST_BATCH_MAX_POINTS
+
+        if not isinstance(points, list) or not points:
+            return Response(
+                {'error': 'points must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(points) > max_points:
+            return Response(
+                {'error': f'At most {max_points} points are allowed per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            coords = np.array(
+                [(float(p['latitude']), float(p['longitude'])) for p in points],
+                dtype=float
+            )
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {'error': 'Each point needs numeric latitude and longitude'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # float() accepts "nan" and "inf", which every range comparison lets through
+        if not np.isfinite(coords).all():
+            return Response(
+                {'error': 'Each point needs numeric latitude and longitude'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if (np.abs(coords[:, 0]) > 90).any() or (np.abs(coords[:, 1]) > 180).any():
+            return Response(
+                {'error': 'Coordinates out of range'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        arrays = center_coordinates.get()
+        if not len(arrays[0]):
+            return Response(
+                {'error': 'No centers found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return StreamingHttpResponse(
+            self.stream(coords, arrays),
+            content_type='application/json'
+        )
+
+    def stream(self, coords, arrays):
+        encoded_centers = {}
+        index = 0
+        yield f'{{"count":{len(coords)},"results":['
+        for ids, distances in nearest_for_points(coords, arrays):
+            missing = set(ids.tolist()) - encoded_centers.keys()
+            for pk, center in Center.objects.in_bulk(missing).items():
+                encoded_centers[pk] = json.dumps(
+                    CenterSerializer(center).data, cls=JSONEncoder, separators=(',', ':')
+                )
+            rows = []
+            for pk, distance in zip(ids.tolist(), distances.tolist()):
+                center = encoded_centers.get(pk, 'null')
+                rows.append(
+                    f'{{"index":{index},"center":{center},"distance_km":{round(distance, 2)}}}'
+                )
+                index += 1
+            yield (',' if index > len(rows) else '') + ','.join(rows)
+        yield ']}'
+
+
+class PriceQuoteView(APIView):
+    """Price many ``(waste_type_id, quantity_kg)`` line items with one waste type query."""
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = PriceQuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        prices = serializer.validated_data['prices']
+        items = []
+        grand_total = Decimal('0.00')
+        for item in serializer.validated_data['items']:
+            price = prices[item['waste_type_id']]
+            total = line_total(price, item['quantity_kg'])
+            grand_total += total
+            items.append({
+                'waste_type_id': item['waste_type_id'],
+                'quantity_kg': str(item['quantity_kg']),
+                'price_per_kg': str(price),
+                'total_price': str(total),
+            })
+
+        return Response({'items': items, 'total_price': str(grand_total)})
+
+
 class BookingCreateView(generics.CreateAPIView):
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        data = serializer.validated_data
+        center = data.get('selected_center')
+        with transaction.atomic():
+            if center is not None:
+                try:
+                    reserve_slot(center.id, data['pickup_date'], data['pickup_time'])
+                except SlotUnavailable as exc:
+                    raise ValidationError({'pickup_time': [str(exc)]})
+            booking = serializer.save(user=self.request.user)
+            if booking.waste_image:
+                enqueue_image_job(booking)
 
 
-class BookingListView(generics.ListAPIView):
-    serializer_class = BookingSerializer
+class BookingBulkCreateView(APIView):
+    """Create many bookings in one request and one transaction.
+
+    Accepts ``{"bookings": [...], "partial": false}`` with at most
+    ``BOOKING_BULK_MAX_ITEMS`` items in the ``BookingSerializer`` input format.
+    Referenced waste types and centers are fetched once for the whole batch
+    and the rows are written with ``bulk_create``. By default any invalid item
+    rejects the batch; with ``"partial": true`` the valid items are created
+    and the invalid ones reported by index.
+    """
     permission_classes = [IsAuthenticated]
-    
+
+    def post(self, request):
+        items = request.data.get('bookings')
+        partial = request.data.get('partial') is True
+        max_items = settings.BOOKING_BULK_MAX_ITEMS
+
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'bookings must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > max_items:
+            return Response(
+                {'error': f'At most {max_items} bookings are allowed per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        context = {
+            'request': request,
+            'prefetched': {
+                WasteType: WasteType.objects.in_bulk(self.referenced_ids(items, 'waste_type_id')),
+                Center: Center.objects.in_bulk(self.referenced_ids(items, 'selected_center_id')),
+            },
+        }
+
+        bookings, errors = [], []
+        for index, item in enumerate(items):
+            serializer = BookingSerializer(data=item, context=context)
+            if not serializer.is_valid():
+                errors.append({'index': index, 'errors': serializer.errors})
+                continue
+            data = serializer.validated_data
+            price = data['waste_type'].price_per_kg
+            bookings.append((index, Booking(
+                user=request.user,
+                unit_price=price,
+                total_price=line_total(price, data['quantity_kg']),
+                **data
+            )))
+
+        if not bookings or (errors and not partial):
+            return Response({'created': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            bookings = self.reserve_slots(bookings, errors)
+            if not bookings or (errors and not partial):
+                transaction.set_rollback(True)
+                errors.sort(key=lambda error: error['index'])
+                return Response({'created': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+            created = Booking.objects.bulk_create([booking for _, booking in bookings])
+            record_bookings(created)
+
+        errors.sort(key=lambda error: error['index'])
+        with serializing():
+            created = BookingSerializer(created, many=True, context=context).data
+        return Response({'created': created, 'errors': errors}, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def reserve_slots(bookings, errors):
+        """Reserve pickup places per slot; drop the bookings of full slots.
+
+        Places are taken with one conditional UPDATE per distinct slot, so a
+        slot without room for all of its bookings in the batch rejects them
+        all.
+        """
+        groups = {}
+        for index, booking in bookings:
+            if booking.selected_center_id is not None:
+                key = (booking.selected_center_id, booking.pickup_date, booking.pickup_time)
+                groups.setdefault(key, []).append(index)
+
+        rejected = set()
+        for key, indexes in groups.items():
+            try:
+                reserve_slot(*key, count=len(indexes))
+            except SlotUnavailable as exc:
+                rejected.update(indexes)
+                errors.extend(
+                    {'index': index, 'errors': {'pickup_time': [str(exc)]}} for index in indexes
+                )
+        return [(index, booking) for index, booking in bookings if index not in rejected]
+
+    @staticmethod
+    def referenced_ids(items, field):
+        ids = set()
+        for item in items:
+            try:
+                ids.add(int(item.get(field)))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        return ids
+
+
+class SlotAvailabilityView(APIView):
+    """Pickup slot counters of a center between two dates.
+
+    Times without a configured slot have ``default_capacity`` free places.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        params = SlotAvailabilitySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        slots = PickupSlot.objects.filter(
+            center_id=data['center'], date__range=(data['start'], data['end'])
+        ).order_by('date', 'time').values_list('date', 'time', 'capacity', 'reserved')
+
+        return Response({
+            'center': data['center'],
+            'default_capacity': default_capacity(),
+            'slots': [
+                {
+                    'date': slot_date,
+                    'time': slot_time,
+                    'capacity': capacity,
+                    'available': capacity - reserved,
+                }
+                for slot_date, slot_time, capacity, reserved in slots
+            ],
+        })
+
+
+class RoutePlanView(APIView):
+    """Optimized visit order of a center's bookings for one day (staff only)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        params = RoutePlanRequestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        try:
+            center = Center.objects.get(pk=data['center'])
+        except Center.DoesNotExist:
+            return Response(
+                {'error': 'Center not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        plan = plan_center_day(center, data['date'], data.get('capacity_kg'))
+        return Response({
+            'center': center.id,
+            'date': data['date'],
+            'distance_km': round(plan.distance_km, 2),
+            'trips': [
+                {
+                    'booking_ids': trip.booking_ids,
+                    'load_kg': round(trip.load_kg, 2),
+                    'distance_km': round(trip.distance_km, 2),
+                }
+                for trip in plan.trips
+            ],
+            'unrouted': plan.unrouted,
+        })
+
+
+class DailyRollupView(APIView):
+    """Booking totals per day, center, waste type and status (staff only).
+
+    Served from ``BookingDailyRollup``, so the cost depends on the number of
+    buckets in the range rather than the number of bookings.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        params = RollupQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        # Buckets emptied by status changes and deletions stay behind with a zero count
+        rollups = BookingDailyRollup.objects.filter(
+            day__range=(data['start'], data['end']), booking_count__gt=0
+        )
+        for name in ('center', 'waste_type', 'status'):
+            if name in data:
+                rollups = rollups.filter(**{name: data[name]})
+        rows = BookingDailyRollupSerializer(
+            rollups.order_by('day', 'center_id', 'waste_type_id', 'status'), many=True
+        ).data
+
+        return Response({
+            'results': rows,
+            'totals': {
+                'booking_count': sum(row['booking_count'] for row in rows),
+                'quantity_kg': str(sum((Decimal(row['quantity_kg']) for row in rows), Decimal('0.00'))),
+                'total_price': str(sum((Decimal(row['total_price']) for row in rows), Decimal('0.00'))),
+            },
+        })
+
+
+class BookingFieldSelectionMixin:
+    """Apply the ``fields`` and ``expand`` query parameters to booking reads.
+
+    Both take comma-separated names, e.g.
+    ``?fields=id,status,total_price&expand=waste_type``. Only expanded
+    relations are joined in the query.
+    """
+
+    def get_field_selection(self):
+        params = self.request.query_params
+        fields = expand = None
+        known = set(BookingSerializer.Meta.fields)
+        if 'fields' in params:
+            fields = {name for name in params['fields'].split(',') if name}
+            unknown = fields - known
+            if unknown:
+                raise ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}"})
+        if 'expand' in params:
+            expand = {name for name in params['expand'].split(',') if name}
+            unknown = expand - set(BookingSerializer.EXPANDABLE_FIELDS)
+            if unknown:
+                raise ValidationError({'expand': f"Cannot expand: {', '.join(sorted(unknown))}"})
+        return fields, expand
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['fields'], kwargs['expand'] = self.get_field_selection()
+        return super().get_serializer(*args, **kwargs)
+
+    def get_related(self):
+        fields, expand = self.get_field_selection()
+        related = BookingSerializer.EXPANDABLE_FIELDS if expand is None else expand
+        return [name for name in related if fields is None or name in fields]
+
     def get_queryset(self):
-        return Booking.objects.filter(user=self.request.user).order_by('-created_at')
+        return Booking.objects.filter(user=self.request.user).select_related(
+            *self.get_related()
+        )
+
 
+class BookingListView(BookingFieldSelectionMixin, generics.ListAPIView):
+    """The user's bookings, newest first, with a weak ``ETag`` per page.
 
-class BookingDetailView(generics.RetrieveAPIView):
+    The tag covers the user's booking count and latest ``updated_at`` (every
+    write to a booking sets it, ``update()`` calls included), the nested user,
+    the catalog versions of nested waste types and centers, the URL and the
+    media type, so a matching ``If-None-Match`` costs one aggregate query.
+    There is no ``Last-Modified``: deleting a booking does not move it.
+    """
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
-    
-    def get_queryset(self):
-        return Booking.objects.filter(user=self.request.user)
+    pagination_class = BookingCursorPagination
 
+    HISTORY_STATE = {'count': Count('id'), 'latest': Max('updated_at')}
 
-class PaymentCreateView(APIView):
+    def get_read_plan(self):
+        fields, expand = self.get_field_selection()
+        return read_plan(BookingSerializer, fields=fields, expand=expand)
+
+    def get_history_state(self):
+        return Booking.objects.filter(user=self.request.user).aggregate(**self.HISTORY_STATE)
+
+    def get_etag(self, state, catalog_versions, media_type):
+        key = repr((
+            state['count'], state['latest'], tuple(UserSerializer(self.request.user).data.values()),
+            catalog_versions, self.request.get_full_path(), media_type
+        ))
+        return f'W/"history-{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_etag(
+            self.get_history_state(),
+            (catalog_version(WASTE_TYPES), catalog_version(CENTERS)),
+            request.accepted_media_type
+        )
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = self.list_page(request, *args, **kwargs)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list_page(self, request, *args, **kwargs):
+        # Pages are built from value rows when the response is plain JSON
+        plan = self.get_read_plan()
+        if plan is None or not renders_plain_json(request):
+            page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+            with serializing():
+                data = self.get_serializer(page, many=True).data
+            return self.get_paginated_response(data)
+        rows = plan.values(self.get_queryset(), extra=self.paginator.ordering_columns())
+        page = self.paginate_queryset(rows)
+        data = plan.represent(page, request)
+        return FastJSONResponse(self.paginator.get_paginated_response(data).data)
+
+
+class BookingSummaryView(APIView):
+    """The user's booking totals for the dashboard, in one aggregate query."""
     permission_classes = [IsAuthenticated]
-    
+
+    ACTIVE_STATUSES = ('pending', 'accepted', 'in_progress')
+
+    def get(self, request):
+        totals = Booking.objects.filter(user=request.user).aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(status__in=self.ACTIVE_STATUSES)),
+            completed=Count('id', filter=Q(status='completed')),
+            total_spent=Coalesce(
+                Sum('total_price', filter=Q(payment_status='paid')), Value(Decimal('0.00'))
+            ),
+        )
+        totals['total_spent'] = str(totals['total_spent'].quantize(Decimal('0.01')))
+        return Response(totals)
+
+
+class BookingDetailView(BookingFieldSelectionMixin, generics.RetrieveAPIView):
+    serializer_class = BookingSerializer
+    permission_classes = [IsAuthenticated]
+
+    def retrieve(self, request, *args, **kwargs):
+        booking = self.get_object()
+        with serializing():
+            data = self.get_serializer(booking).data
+        return Response(data)
+
+
+class ImageUploadCreateView(APIView):
+    """Start a resumable upload: ``{"filename", "size"}`` -> upload id.
+
+    A user may have at most ``UPLOAD_MAX_IN_PROGRESS`` unfinished uploads that
+    are not yet stale, which bounds the partial files one account can leave
+    on disk.
+    """
+    permission_classes = [IsAuthenticated]
+
     def post(self, request):
-        booking_id = request.data.get('booking_id')
-        amount = request.data.get('amount')
-        
+        serializer = ImageUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if in_progress(request.user).count() >= settings.UPLOAD_MAX_IN_PROGRESS:
+            return Response(
+                {'error': f'At most {settings.UPLOAD_MAX_IN_PROGRESS} uploads may be in progress'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+        serializer.save(user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ImageUploadView(APIView):
+    """Upload progress (GET) and chunk append (PUT).
+
+    PUT takes the raw chunk as the request body and ``?offset=`` equal to the
+    bytes already received; the body is streamed to disk without parsing.
+    No row lock is held while the client sends it: the offset is claimed
+    afterwards with an UPDATE conditioned on ``received``.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = []
+
+    def get(self, request, pk):
+        upload = generics.get_object_or_404(ImageUpload, pk=pk, user=request.user)
+        return Response(ImageUploadSerializer(upload).data)
+
+    def put(self, request, pk):
         try:
-            booking = Booking.objects.get(id=booking_id, user=request.user)
-        except Booking.DoesNotExist:
+            offset = int(request.query_params.get('offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
             return Response(
-                {'error': 'Booking not found'},
-                status=status.HTTP_404_NOT_FOUND
+                {'error': 'offset must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        
-        # Create payment record
-        payment, created = Payment.objects.get_or_create(
-            booking=booking,
-            defaults={'amount': amount or booking.total_price}
+        if length > settings.UPLOAD_CHUNK_MAX_BYTES:
+            return Response(
+                {'error': f'Chunks are limited to {settings.UPLOAD_CHUNK_MAX_BYTES} bytes'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        upload = generics.get_object_or_404(ImageUpload, pk=pk, user=request.user)
+        if upload.status != 'uploading' or offset != upload.received:
+            return self.offset_conflict(upload)
+        if upload.received + length > upload.size:
+            return Response(
+                {'error': 'Chunk exceeds the declared size'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        staged, written = stage_chunk(upload, request.stream, length)
+        try:
+            with transaction.atomic():
+                now = timezone.now()
+                claimed = ImageUpload.objects.filter(
+                    pk=upload.pk, status='uploading', received=offset
+                ).update(received=offset + written, updated_at=now)
+                if not claimed:
+                    # Another request appended at this offset first
+                    upload = generics.get_object_or_404(ImageUpload, pk=pk, user=request.user)
+                    return self.offset_conflict(upload)
+                with open(staged, 'rb') as source:
+                    append_chunk(upload, source, written)
+        finally:
+            os.remove(staged)
+
+        upload.received = offset + written
+        upload.updated_at = now
+        return Response(ImageUploadSerializer(upload).data)
+
+    def offset_conflict(self, upload):
+        return Response(
+            {'error': 'Offset does not match received bytes', 'received': upload.received},
+            status=status.HTTP_409_CONFLICT
         )
-        
-        # For Razorpay integration, you would create an order here
-        # This is a placeholder - you'll need to integrate Razorpay SDK
-        razorpay_order_id = f"order_{payment.id}_{booking.id}"
-        payment.razorpay_order_id = razorpay_order_id
-        payment.save()
-        
+
+
+class ImageUploadCompleteView(APIView):
+    """Finish an upload: ``{"sha256", "booking_id"}`` attaches it to a booking."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        sha256 = request.data.get('sha256')
+        booking_id = request.data.get('booking_id')
+        if not sha256 or not booking_id:
+            return Response(
+                {'error': 'sha256 and booking_id are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            upload = generics.get_object_or_404(
+                ImageUpload.objects.select_for_update(), pk=pk, user=request.user
+            )
+            booking = generics.get_object_or_404(Booking, pk=booking_id, user=request.user)
+            if upload.status != 'uploading':
+                return Response(
+                    {'error': 'Upload already completed'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            try:
+                attach_to_booking(upload, booking, str(sha256))
+            except UploadError as exc:
+                if upload.received == upload.size:
+                    # Complete but corrupt: the client has to start over
+                    discard(upload)
+                    upload.delete()
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+            upload.status = 'complete'
+            upload.booking = booking
+            upload.save(update_fields=['status', 'booking', 'updated_at'])
+            enqueue_image_job(booking)
+
+        return Response(ImageUploadSerializer(upload).data)
+
+
+class PaymentCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return idempotent(request, 'payment.create', lambda: self.create_payment(request))
+
+    def create_payment(self, request):
+        booking_id = request.data.get('booking_id')
+        amount = request.data.get('amount')
+
+        with transaction.atomic():
+            try:
+                # Lock the booking so concurrent calls cannot create two payments
+                booking = Booking.objects.select_related(
+                    'user', 'waste_type', 'selected_center'
+                ).select_for_update(of=('self',)).get(id=booking_id, user=request.user)
+            except Booking.DoesNotExist:
+                return Response(
+                    {'error': 'Booking not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            payment = Payment.objects.filter(booking=booking).first()
+            if payment is None:
+                payment = Payment.objects.create(
+                    booking=booking, amount=amount or booking.total_price
+                )
+            payment.booking = booking
+
+            if not payment.razorpay_order_id:
+                # For Razorpay integration, you would create an order here
+                # This is a placeholder - you'll need to integrate Razorpay SDK
+                payment.razorpay_order_id = f"order_{payment.id}_{booking.id}"
+                Payment.objects.filter(pk=payment.pk, razorpay_order_id__isnull=True).update(
+                    razorpay_order_id=payment.razorpay_order_id
+                )
+
         serializer = PaymentSerializer(payment)
         return Response({
             'payment': serializer.data,
-            'razorpay_order_id': razorpay_order_id,
+            'razorpay_order_id': payment.razorpay_order_id,
             'amount': float(payment.amount),
             # Add Razorpay key_id from settings
         })
@@ -135,37 +850,78 @@ class PaymentCreateView(APIView):
 
 class PaymentVerifyView(APIView):
     permission_classes = [IsAuthenticated]
-    
+
     def post(self, request):
+        return idempotent(request, 'payment.verify', lambda: self.verify_payment(request))
+
+    def verify_payment(self, request):
         razorpay_order_id = request.data.get('razorpay_order_id')
         razorpay_payment_id = request.data.get('razorpay_payment_id')
         razorpay_signature = request.data.get('razorpay_signature')
-        
-        try:
-            payment = Payment.objects.get(
-                razorpay_order_id=razorpay_order_id,
-                booking__user=request.user
-            )
-        except Payment.DoesNotExist:
-            return Response(
-                {'error': 'Payment not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Verify Razorpay signature here
-        # This is a placeholder - implement actual Razorpay verification
-        payment.razorpay_payment_id = razorpay_payment_id
-        payment.razorpay_signature = razorpay_signature
-        payment.status = 'paid'
-        payment.save()
-        
-        # Update booking payment status
-        booking = payment.booking
-        booking.payment_status = 'paid'
-        booking.save()
-        
+
+        with transaction.atomic():
+            try:
+                payment = Payment.objects.select_related(
+                    'booking__user', 'booking__waste_type', 'booking__selected_center'
+                ).select_for_update(of=('self',)).get(
+                    razorpay_order_id=razorpay_order_id,
+                    booking__user=request.user
+                )
+            except Payment.DoesNotExist:
+                return Response(
+                    {'error': 'Payment not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            # Verify Razorpay signature here
+            # This is a placeholder - implement actual Razorpay verification
+            if payment.status != 'paid':
+                now = timezone.now()
+                Payment.objects.filter(pk=payment.pk).exclude(status='paid').update(
+                    razorpay_payment_id=razorpay_payment_id,
+                    razorpay_signature=razorpay_signature,
+                    status='paid',
+                    paid_at=now
+                )
+                Booking.objects.filter(pk=payment.booking_id).exclude(payment_status='paid').update(
+                    payment_status='paid', updated_at=now
+                )
+                payment.razorpay_payment_id = razorpay_payment_id
+                payment.razorpay_signature = razorpay_signature
+                payment.status = 'paid'
+                payment.paid_at = now
+                payment.booking.payment_status = 'paid'
+                payment.booking.updated_at = now
+
         serializer = PaymentSerializer(payment)
         return Response({
             'success': True,
             'payment': serializer.data
         })
+
+
+class PaymentWebhookView(APIView):
+    """Queue a signed payment gateway webhook for ``process_payment_events``.
+
+    The body is stored as received and reconciled later, so the gateway is
+    answered without touching payments or bookings.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    parser_classes = []
+
+    def post(self, request):
+        secret = settings.RAZORPAY_WEBHOOK_SECRET
+        if not secret:
+            return Response(
+                {'error': 'Webhook secret is not configured'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        body = request.body
+        if not verify_signature(body, request.headers.get('X-Razorpay-Signature', ''), secret):
+            return Response(
+                {'error': 'Invalid signature'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ingest(body, request.headers.get('X-Razorpay-Event-Id'))
+        return Response({'status': 'queued'})
@@ -0,0 +1,155 @@
+"""
+Payment gateway webhook ingestion and reconciliation.
+
+The webhook endpoint only verifies the delivery signature and appends the raw
+body to ``PaymentEvent``, so the gateway gets its answer immediately. The
+``process_payment_events`` worker then reconciles pending events in batches:
+each batch is parsed, deduplicated by ``razorpay_payment_id`` (a captured
+payment wins over a failed one, and any captured payment marks its order paid)
+and applied to ``Payment`` and ``Booking`` with a bulk update per status, all
+in one transaction.
+"""
+import hashlib
+import hmac
+import json
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Booking, Payment, PaymentEvent
+
+PAID_EVENTS = {'payment.captured', 'order.paid'}
+FAILED_EVENTS = {'payment.failed'}
+
+
+def sign(body, secret):
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body, signature, secret):
+    return bool(signature) and hmac.compare_digest(sign(body, secret), signature)
+
+
+def ingest(body, event_id=None):
+    """Queue a verified delivery. Returns ``False`` for a redelivered event id."""
+    try:
+        with transaction.atomic():
+            PaymentEvent.objects.create(event_id=event_id or None, body=body.decode())
+    except IntegrityError:
+        return False
+    return True
+
+
+def parse_event(body):
+    """Return ``(outcome, order_id, payment_id)``, or ``None`` for other event types.
+
+    Raises ``ValueError`` for bodies that are not gateway events.
+    """
+    data = json.loads(body)
+    if not isinstance(data, dict):
+        raise ValueError('event is not an object')
+    event = data.get('event')
+    if event in PAID_EVENTS:
+        outcome = 'paid'
+    elif event in FAILED_EVENTS:
+        outcome = 'failed'
+    else:
+        return None
+
+    entities = data.get('payload') or {}
+    payment = (entities.get('payment') or {}).get('entity') or {}
+    order = (entities.get('order') or {}).get('entity') or {}
+    order_id = payment.get('order_id') or order.get('id')
+    if not order_id:
+        raise ValueError('event has no order id')
+    return outcome, order_id, payment.get('id')
+
+
+def collapse(results):
+    """Reduce ``(outcome, order_id, payment_id)`` results to one outcome per order.
+
+    Returns ``{order_id: (outcome, payment_id)}``.
+    """
+    by_payment = {}
+    for outcome, order_id, payment_id in results:
+        key = payment_id or ('order', order_id)
+        if by_payment.get(key, (None,))[0] != 'paid':
+            by_payment[key] = (outcome, order_id, payment_id)
+
+    outcomes = {}
+    for outcome, order_id, payment_id in by_payment.values():
+        if outcomes.get(order_id, (None,))[0] != 'paid':
+            outcomes[order_id] = (outcome, payment_id)
+    return outcomes
+
+
+def reconcile(outcomes):
+    """Apply ``{order_id: (outcome, payment_id)}``; returns the order ids found."""
+    now = timezone.now()
+    payments = list(
+        Payment.objects.select_for_update().filter(razorpay_order_id__in=list(outcomes))
+    )
+    paid, failed = [], []
+    for payment in payments:
+        outcome, payment_id = outcomes[payment.razorpay_order_id]
+        if payment.status == 'paid' or (outcome == 'failed' and payment.status == 'failed'):
+            continue
+        payment.status = outcome
+        payment.razorpay_payment_id = payment_id or payment.razorpay_payment_id
+        if outcome == 'paid':
+            payment.paid_at = now
+            paid.append(payment)
+        else:
+            failed.append(payment)
+
+    Payment.objects.bulk_update(paid + failed, ['status', 'razorpay_payment_id', 'paid_at'])
+    if paid:
+        Booking.objects.filter(pk__in=[p.booking_id for p in paid]).exclude(
+            payment_status='paid'
+        ).update(payment_status='paid', updated_at=now)
+    if failed:
+        Booking.objects.filter(
+            pk__in=[p.booking_id for p in failed], payment_status='pending'
+        ).update(payment_status='failed', updated_at=now)
+    return {payment.razorpay_order_id for payment in payments}
+
+
+def process_batch(batch_size=500):
+    """Reconcile up to ``batch_size`` pending events. Returns how many were handled."""
+    with transaction.atomic():
+        events = list(
+            PaymentEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='pending').order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        results, orders, ignored = [], {}, defaultdict(list)
+        for event in events:
+            try:
+                result = parse_event(event.body)
+            except (ValueError, AttributeError) as exc:
+                ignored[f'Unreadable event: {exc}'].append(event.pk)
+                continue
+            if result is None:
+                ignored['Event type not handled'].append(event.pk)
+                continue
+            results.append(result)
+            orders[event.pk] = result[1]
+
+        found = reconcile(collapse(results)) if results else set()
+
+        now = timezone.now()
+        processed = []
+        for pk, order_id in orders.items():
+            if order_id in found:
+                processed.append(pk)
+            else:
+                ignored['Unknown order'].append(pk)
+        PaymentEvent.objects.filter(pk__in=processed).update(status='processed', processed_at=now)
+        for error, pks in ignored.items():
+            PaymentEvent.objects.filter(pk__in=pks).update(
+                status='ignored', error=error, processed_at=now
+            )
+    return len(events)
@@ -115,6 +115,10 @@ function BookingCreate() {
     if (selectedCenter) {
       submitData.append("selected_center_id", selectedCenter);
     }
+    if (userLocation) {
+      submitData.append("latitude", userLocation.lat.toFixed(6));
+      submitData.append("longitude", userLocation.lng.toFixed(6));
+    }
     if (formData.waste_image) {
       submitData.append("waste_image", formData.waste_image);
     }
@@ -5,6 +5,8 @@ import api from "../services/api";
 function BookingHistory() {
   const [bookings, setBookings] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const { bookingId } = useParams();
 
   useEffect(() => {
@@ -18,7 +20,8 @@ function BookingHistory() {
   const fetchBookings = async () => {
     try {
       const res = await api.get("waste/booking/history/");
-      setBookings(res.data);
+      setBookings(res.data.results);
+      setNextPage(res.data.next);
       setLoading(false);
     } catch (err) {
       console.error("Error fetching bookings:", err);
@@ -26,10 +29,24 @@ function BookingHistory() {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      // The history is cursor-paginated; "next" is the full URL of the next page
+      const res = await api.get(nextPage);
+      setBookings((current) => [...current, ...res.data.results]);
+      setNextPage(res.data.next);
+    } catch (err) {
+      console.error("Error fetching bookings:", err);
+    }
+    setLoadingMore(false);
+  };
+
   const fetchBookingDetail = async () => {
     try {
       const res = await api.get(`waste/booking/${bookingId}/`);
       setBookings([res.data]);
+      setNextPage(null);
       setLoading(false);
     } catch (err) {
       console.error("Error fetching booking:", err);
@@ -254,6 +271,25 @@ function BookingHistory() {
           </div>
         ))}
       </div>
+
+      {!bookingId && nextPage && (
+        <div style={{ textAlign: "center", marginTop: "30px" }}>
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            style={{
+              padding: "12px 30px",
+              backgroundColor: "#2196F3",
+              color: "white",
+              border: "none",
+              borderRadius: "5px",
+              cursor: loadingMore ? "default" : "pointer",
+            }}
+          >
+            {loadingMore ? "Loading..." : "Load More"}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
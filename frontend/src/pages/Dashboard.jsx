@@ -18,18 +18,18 @@ function Dashboard() {
 
   const fetchBookings = async () => {
     try {
-      const res = await api.get("waste/booking/history/");
-      setBookings(res.data);
-      
-      // Calculate stats
-      const total = res.data.length;
-      const pending = res.data.filter((b) => b.status === "pending" || b.status === "accepted" || b.status === "in_progress").length;
-      const completed = res.data.filter((b) => b.status === "completed").length;
-      const totalSpent = res.data
-        .filter((b) => b.payment_status === "paid")
-        .reduce((sum, b) => sum + parseFloat(b.total_price || 0), 0);
-
-      setStats({ total, pending, completed, totalSpent });
+      // Totals come from the server, so they cover bookings beyond the first page
+      const [res, summary] = await Promise.all([
+        api.get("waste/booking/history/", { params: { page_size: 6 } }),
+        api.get("waste/booking/summary/"),
+      ]);
+      setBookings(res.data.results);
+      setStats({
+        total: summary.data.total,
+        pending: summary.data.active,
+        completed: summary.data.completed,
+        totalSpent: parseFloat(summary.data.total_spent),
+      });
       setLoading(false);
     } catch (err) {
       console.error("Error fetching bookings:", err);
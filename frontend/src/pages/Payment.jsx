@@ -61,11 +61,16 @@ function Payment() {
         handler: async function (response) {
           // Verify payment
           try {
-            await api.post("waste/payment/verify/", {
-              razorpay_order_id: response.razorpay_order_id,
-              razorpay_payment_id: response.razorpay_payment_id,
-              razorpay_signature: response.razorpay_signature,
-            });
+            await api.post(
+              "waste/payment/verify/",
+              {
+                razorpay_order_id: response.razorpay_order_id,
+                razorpay_payment_id: response.razorpay_payment_id,
+                razorpay_signature: response.razorpay_signature,
+              },
+              // A retried verification is answered from the server's stored response
+              { headers: { "Idempotency-Key": response.razorpay_payment_id } }
+            );
             navigate(`/booking/${booking.id}/success`);
           } catch (err) {
             console.error("Payment verification failed:", err);